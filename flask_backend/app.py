@@ -1,22 +1,87 @@
-from flask import Flask, jsonify, send_file, request, g
+from flask import Flask, Blueprint, current_app, jsonify, request, send_file, g
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import or_
+from sqlalchemy import or_, and_, func, select, literal, case, Integer
 import os
-from urllib.parse import unquote
-import bcrypt
 import jwt
+import click
 import datetime
+import base64
+import json
+import time
+import shutil
+import tempfile
+import hmac
+import threading
+import zlib
+
+import fastjson
+import search
+import migrations
+import storage
+import cache
+import assets
+import includes
+import passwords
+import inventory
+import recommend
+import categories
+import facets
+import catalog
+import metrics
+import images
 
 # ===================== 全局配置 =====================
-app = Flask(__name__)
-app.config['JSON_AS_ASCII'] = False
-app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
-app.config['JSON_SORT_KEYS'] = False
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///yougou.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = 'yougou_2025_secret_key'
-app.config['JWT_EXPIRY_HOURS'] = 24
-db = SQLAlchemy(app)
+def load_config(config):
+    """默认配置，大部分可以通过 YOUGOU_* 环境变量覆盖"""
+    config['JSON_AS_ASCII'] = False
+    config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
+    config['JSON_SORT_KEYS'] = False
+    config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    config['SECRET_KEY'] = 'yougou_2025_secret_key'
+    config['JWT_EXPIRY_HOURS'] = 24
+    config['TOKEN_CACHE_SIZE'] = 10000  # 已验证 Token 的 LRU 容量
+    config['TOKEN_VERSION_TTL'] = 30  # 进程内 token_version 缓存秒数（多进程部署时吊销的最大延迟）
+    config['APPROX_COUNT_TTL'] = 60  # 游标分页近似总数的缓存秒数
+    # 购物车 / 订单列表 ETag 的最长有效秒数（列表中的商品名称、价格、图片不计入版本号，最多延迟这么久）
+    config['VERSION_ETAG_TTL'] = 60
+    config['CACHE_TTL'] = 300  # 接口缓存秒数
+    config['CACHE_MAX_ENTRIES'] = 1024
+    config['CACHE_BACKEND'] = os.environ.get('YOUGOU_CACHE_BACKEND', '')  # '' / 'local' / 'redis'
+    config['CACHE_REDIS_URL'] = os.environ.get('YOUGOU_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    config['BCRYPT_ROUNDS'] = int(os.environ.get('YOUGOU_BCRYPT_ROUNDS', 12))
+    config['BCRYPT_POOL_SIZE'] = int(os.environ.get('YOUGOU_BCRYPT_POOL_SIZE', os.cpu_count() or 2))
+    config['BCRYPT_QUEUE_LIMIT'] = int(os.environ.get('YOUGOU_BCRYPT_QUEUE_LIMIT', 32))
+    config['ORDER_PAY_TIMEOUT_MINUTES'] = int(os.environ.get('YOUGOU_ORDER_PAY_TIMEOUT', 15))  # 未支付订单自动取消
+    config['ORDER_SWEEP_INTERVAL'] = 30  # 超时订单扫描间隔（秒）
+    # 秒杀热门商品ID（逗号分隔），这些商品的库存在进程内存中预留、批量写回数据库
+    config['HOT_PRODUCT_IDS'] = [int(i) for i in os.environ.get('YOUGOU_HOT_PRODUCT_IDS', '').split(',') if i.strip()]
+    config['CART_BATCH_MAX_OPS'] = 100  # 购物车批量接口单次最多操作数
+    config['BATCH_MAX_REQUESTS'] = 20  # /api/batch 单次最多子请求数
+    config['RECOMMEND_HALF_LIFE_HOURS'] = float(os.environ.get('YOUGOU_RECOMMEND_HALF_LIFE_HOURS', 72))  # 热度分半衰期
+    config['RECOMMEND_TOP_N'] = 50  # 每个榜单保留的商品数
+    config['CATEGORY_TREE_TTL'] = 60  # 分类树最长缓存秒数（多进程部署时其他进程看到分类修改的最大延迟）
+    config['PRICE_FACET_EDGES'] = (100, 500, 1000, 3000, 5000, 10000)  # 商品列表价格区间的分界点
+    config['FACET_INDEX_TTL'] = 600  # 分面计数索引整体重建间隔（多进程部署时其他进程看到商品修改的最大延迟）
+    config['ADMIN_USERNAMES'] = [u.strip() for u in os.environ.get('YOUGOU_ADMIN_USERS', 'admin').split(',') if u.strip()]
+    config['IMPORT_BATCH_SIZE'] = 1000  # 商品导入每批写入行数
+    config['METRICS_ENABLED'] = os.environ.get('YOUGOU_METRICS', '1') != '0'  # 请求耗时 / SQL 统计
+    config['METRICS_TOKEN'] = os.environ.get('YOUGOU_METRICS_TOKEN', '')  # /metrics 的抓取令牌，空表示只允许管理员
+    config['SLOW_REQUEST_MS'] = float(os.environ.get('YOUGOU_SLOW_REQUEST_MS', 500))  # 超过即记慢请求日志
+    config['SLOW_REQUEST_QUERIES'] = int(os.environ.get('YOUGOU_SLOW_REQUEST_QUERIES', 20))  # SQL 条数超过即记日志
+    # Server-Timing 响应头是否包含 SQL 条数与各阶段耗时（debug 模式下总是包含）
+    config['SERVER_TIMING_DETAIL'] = os.environ.get('YOUGOU_SERVER_TIMING_DETAIL', '0') == '1'
+    config['JSON_ENCODER_BACKEND'] = os.environ.get('YOUGOU_JSON_ENCODER', '')  # '' 自动 / 'orjson' / 'stdlib'
+    # 图片变体（需要 Pillow，未安装时返回原图）：缓存目录默认为 instance/images
+    config['IMAGE_CACHE_DIR'] = os.environ.get('YOUGOU_IMAGE_CACHE_DIR', '')
+    config['IMAGE_CACHE_MAX_MB'] = int(os.environ.get('YOUGOU_IMAGE_CACHE_MAX_MB', 512))  # 超过后按最近使用淘汰
+    config['IMAGE_WIDTHS'] = (160, 320, 480, 640, 960, 1280, 1920)  # 请求的宽度向上取整到这些档位
+    config['IMAGE_POOL_SIZE'] = int(os.environ.get('YOUGOU_IMAGE_POOL_SIZE', min(4, os.cpu_count() or 2)))
+    config['IMAGE_QUEUE_LIMIT'] = int(os.environ.get('YOUGOU_IMAGE_QUEUE_LIMIT', 16))
+    config['IMAGE_MAX_AGE'] = 86400  # src 不带内容哈希时变体的缓存秒数（带哈希时为 immutable）
+
+db = SQLAlchemy()
+# 全部页面与接口注册在蓝图上，由 create_app() 挂到应用
+bp = Blueprint('yougou', __name__)
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
 FRONTEND_ROOT = os.path.join(PROJECT_ROOT, 'frontend')
@@ -47,6 +112,13 @@ class Product(db.Model):
     stock = db.Column(db.Integer, default=100)
     is_recommend = db.Column(db.Integer, default=1)
     is_sale = db.Column(db.Integer, default=1)
+    sales = db.Column(db.Integer, default=0, server_default='0', nullable=False)  # 累计销量，支付时累加
+    __table_args__ = (
+        db.Index('ix_product_sale_category', 'is_sale', 'category_id'),
+        db.Index('ix_product_sale_category_price', 'is_sale', 'category_id', 'price', 'id'),
+        db.Index('ix_product_sale_price', 'is_sale', 'price', 'id'),
+        db.Index('ix_product_sale_sales', 'is_sale', 'sales', 'id'),
+    )
 
 class User(db.Model):
     __tablename__ = 'user'
@@ -54,13 +126,26 @@ class User(db.Model):
     username = db.Column(db.String(50), unique=True, nullable=False)
     password = db.Column(db.String(100), nullable=False)
     phone = db.Column(db.String(20), default='')
+    token_version = db.Column(db.Integer, default=0, nullable=False)  # 修改密码时递增，使旧 Token 失效
+    # 购物车 / 订单有修改时递增，作为购物车、订单列表接口的 ETag
+    cart_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    order_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
 
 class Order(db.Model):
     __tablename__ = 'order'
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, default=1)
     total_price = db.Column(db.Float, default=0.0)
-    status = db.Column(db.Integer, default=0)
+    status = db.Column(db.Integer, default=0)  # 0 待付款 1 待发货 2 待收货 3 已完成 4 已取消
+    expire_at = db.Column(db.DateTime, nullable=True)  # 支付截止时间，超时后释放库存
+    created_at = db.Column(db.DateTime, default=datetime.datetime.now)  # 下单时间
+    paid_at = db.Column(db.DateTime, nullable=True)  # 支付时间
+    __table_args__ = (
+        # 订单列表：按用户（+ 状态）筛选、按下单时间倒序
+        db.Index('ix_order_user_created', 'user_id', db.desc('created_at'), db.desc('id')),
+        db.Index('ix_order_user_status_created', 'user_id', 'status', db.desc('created_at'), db.desc('id')),
+        db.Index('ix_order_status_expire_at', 'status', 'expire_at'),
+    )
 
 class Cart(db.Model):
     __tablename__ = 'cart'
@@ -68,6 +153,7 @@ class Cart(db.Model):
     user_id = db.Column(db.Integer, default=1)
     product_id = db.Column(db.Integer, default=1)
     quantity = db.Column(db.Integer, default=1)
+    __table_args__ = (db.Index('uq_cart_user_product', 'user_id', 'product_id', unique=True),)
 
 class OrderItem(db.Model):
     __tablename__ = 'order_item'
@@ -77,32 +163,78 @@ class OrderItem(db.Model):
     product_name = db.Column(db.String(200), nullable=False)
     product_price = db.Column(db.Float, nullable=False)
     quantity = db.Column(db.Integer, default=1)
+    __table_args__ = (db.Index('ix_order_item_order_id', 'order_id'),)
 
 # ===================== 工具函数 =====================
+# 以下组件由 create_app() 按配置创建（init_components），一个进程只有一个应用
+# bcrypt 在独立的有界线程池中执行，排队满时抛出 passwords.HasherBusy
+password_hasher = None
+# 每个接口的耗时直方图、SQL 条数与耗时、响应大小，/metrics 输出
+request_metrics = None
+
 def encrypt_password(password):
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+    with request_metrics.phase('bcrypt'):
+        return password_hasher.hash(password)
 
 def check_password(plain_pwd, hashed_pwd):
-    return bcrypt.checkpw(plain_pwd.encode('utf-8'), hashed_pwd.encode('utf-8'))
+    with request_metrics.phase('bcrypt'):
+        return password_hasher.verify(plain_pwd, hashed_pwd)
+
+def busy_response(e):
+    response = jsonify({'code': 503, 'data': {}, 'msg': str(e)})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+# 已验证 Token -> (user_id, token_version)，条目在 Token 过期时失效
+token_cache = None
+# user_id -> 当前 token_version，短 TTL，避免每个请求查库
+token_versions = None
 
-def generate_token(user_id):
+def generate_token(user_id, token_version=0):
     payload = {
         'user_id': user_id,
-        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=app.config['JWT_EXPIRY_HOURS'])
+        'ver': token_version,
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=current_app.config['JWT_EXPIRY_HOURS'])
     }
-    return jwt.encode(payload, app.config['SECRET_KEY'], algorithm='HS256')
+    return jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm='HS256')
+
+def get_token_version(user_id):
+    version = token_versions.get(user_id)
+    if version is None:
+        # 顺带把用户行放入 g，本次请求内 get_current_user() 不再查询
+        user = User.query.get(user_id)
+        g.current_user = user
+        version = user.token_version if user else -1
+        token_versions.set(user_id, version)
+    return version
 
 def verify_token(token):
-    try:
-        # 去掉 'Bearer ' 前缀
-        if token.startswith('Bearer '):
-            token = token.split(' ')[1]
-
-        payload = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-        return payload['user_id']
-    except:
+    # 去掉 'Bearer ' 前缀
+    if token.startswith('Bearer '):
+        token = token.split(' ')[1]
+
+    claims = token_cache.get(token)
+    if claims is None:
+        try:
+            payload = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+        except Exception:
+            return None
+        claims = (payload['user_id'], payload.get('ver', 0))
+        ttl = payload['exp'] - time.time()
+        if ttl > 0:
+            token_cache.set(token, claims, ttl)
+
+    user_id, version = claims
+    if version != get_token_version(user_id):
         return None
+    return user_id
+
+def get_current_user():
+    """当前登录用户，每个请求最多加载一次"""
+    if 'current_user' not in g:
+        g.current_user = User.query.get(g.user_id)
+    return g.current_user
 
 def login_required(f):
     def wrapper(*args, **kwargs):
@@ -124,8 +256,61 @@ def login_required(f):
     wrapper.__name__ = f.__name__
     return wrapper
 
-def get_pagination_data(query, page, size):
-    total = query.count()
+def admin_required(f):
+    """在 login_required 的基础上要求用户名在 ADMIN_USERNAMES 中"""
+    def wrapper(*args, **kwargs):
+        user = get_current_user()
+        if not user or user.username not in current_app.config['ADMIN_USERNAMES']:
+            return jsonify({'code': 403, 'data': {}, 'msg': '没有管理权限'})
+        return f(*args, **kwargs)
+    wrapper.__name__ = f.__name__
+    return login_required(wrapper)
+
+# 购物车 / 订单列表的条件请求：ETag 由用户的 cart_version / order_version 得出。
+# 版本号存在 user 表中，与购物车、订单的修改在同一事务中递增，多进程部署时各进程看到的版本一致；
+# If-None-Match 命中时只按主键查询一次版本号，不加载购物车与订单
+VERSION_COLUMNS = {'cart': User.cart_version, 'order': User.order_version}
+
+def bump_versions(user_id, *kinds):
+    """在当前事务中递增用户的购物车 / 订单版本号，随修改一起提交"""
+    User.query.filter_by(id=user_id) \
+        .update({VERSION_COLUMNS[kind]: VERSION_COLUMNS[kind] + 1 for kind in kinds}, synchronize_session=False)
+
+def version_etag(kind):
+    column = VERSION_COLUMNS[kind]
+    user = g.get('current_user')  # Token 校验时可能已加载用户行
+    version = getattr(user, column.key) if user is not None \
+        else db.session.query(column).filter(User.id == g.user_id).scalar()
+    # 同一版本下不同查询参数（分页、筛选）的响应不同；按时段轮换，限制商品信息的延迟
+    epoch = int(time.time() // current_app.config['VERSION_ETAG_TTL'])
+    return f'{kind}-{g.user_id}-{version}-{zlib.crc32(request.query_string):08x}-{epoch}'
+
+def conditional_on_version(kind):
+    """放在 login_required 之后：If-None-Match 与当前版本一致时返回 304，否则执行视图并附上弱 ETag"""
+    def decorator(f):
+        def wrapper(*args, **kwargs):
+            # 先读版本再读数据：读取期间有修改时响应比 ETag 新，下次请求不会误判为未变化
+            etag = version_etag(kind)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(f(*args, **kwargs))
+                body = response.get_json(silent=True) if response.is_json else None
+                if not body or body.get('code') != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Authorization')
+            return response
+        wrapper.__name__ = f.__name__
+        return wrapper
+    return decorator
+
+def get_pagination_data(query, page, size, total=None):
+    """total 为 None 时执行 COUNT 查询"""
+    page, size = max(1, page), max(1, size)
+    if total is None:
+        total = query.count()
     total_pages = (total + size - 1) // size
     offset = (page - 1) * size
     items = query.limit(size).offset(offset).all()
@@ -137,51 +322,408 @@ def get_pagination_data(query, page, size):
         'totalPages': total_pages
     }
 
-# ===================== 静态资源托管 =====================
-def get_real_file_path(url_path):
-    cleaned_path = url_path.replace('', '').lstrip('/')
-    real_path = os.path.join(FRONTEND_ROOT, cleaned_path)
-    real_path = unquote(real_path)
-
-    if os.path.exists(real_path) and os.path.isfile(real_path):
-        return real_path
-    elif os.path.isdir(real_path):
-        index_path = os.path.join(real_path, 'index.html')
-        list_path = os.path.join(real_path, 'list.html')
-        if os.path.exists(index_path):
-            return index_path
-        elif os.path.exists(list_path):
-            return list_path
-    elif not real_path.endswith('.html'):
-        html_path = real_path + '.html'
-        if os.path.exists(html_path):
-            return html_path
-    return None
-
-@app.route('/<path:path>', methods=['GET'])
-@app.route('/', methods=['GET'])
-def serve_frontend(path=''):
-    if path == '':
-        file_path = os.path.join(FRONTEND_ROOT, 'public', 'index.html')
+# 近似总数缓存：{key: (total, 过期时间)}
+_approx_count_cache = {}
+
+def get_approx_count(key, query):
+    """按筛选条件缓存 COUNT 结果，TTL 内不再重复扫描"""
+    now = time.time()
+    cached = _approx_count_cache.get(key)
+    if cached and cached[1] > now:
+        return cached[0]
+    total = query.order_by(None).count()
+    if len(_approx_count_cache) >= 1024:
+        _approx_count_cache.clear()
+    _approx_count_cache[key] = (total, now + current_app.config['APPROX_COUNT_TTL'])
+    return total
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """解析游标，格式错误时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except Exception:
+        raise ValueError('无效的游标')
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValueError('无效的游标')
+    return values
+
+def is_cursor_value(column, value):
+    """游标中的排序值必须是与列类型一致的标量：时间列为 ISO 字符串，整数列为整数，浮点列为数字"""
+    if value is None:
+        return True
+    if isinstance(value, bool):
+        return False
+    if isinstance(column.type, (db.DateTime, db.String)):
+        return isinstance(value, str)
+    if isinstance(column.type, db.Integer):
+        return isinstance(value, int)
+    return isinstance(value, (int, float))
+
+def get_cursor_pagination_data(query, sort_column, id_column, cursor, size,
+                               descending=False, with_total=False, count_key=None):
+    """
+    游标（keyset）分页：按 (sort_column, id_column) 定位，不使用 OFFSET。
+    cursor 为空表示第一页；with_total 为真时返回精确总数，否则返回缓存的近似总数。
+    """
+    base_query = query
+    size = max(1, size)
+    is_datetime = isinstance(sort_column.type, db.DateTime)
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor)
+        if not is_positive_int(last_id) or not is_cursor_value(sort_column, sort_value):
+            raise ValueError('无效的游标')
+        if is_datetime:
+            # 时间列在游标中保存为 ISO 格式字符串
+            try:
+                sort_value = datetime.datetime.fromisoformat(sort_value)
+            except (TypeError, ValueError):
+                raise ValueError('无效的游标')
+        if sort_column is id_column:
+            query = query.filter(id_column < last_id if descending else id_column > last_id)
+        elif descending:
+            query = query.filter(or_(sort_column < sort_value,
+                                     and_(sort_column == sort_value, id_column < last_id)))
+        else:
+            query = query.filter(or_(sort_column > sort_value,
+                                     and_(sort_column == sort_value, id_column > last_id)))
+
+    columns = [id_column] if sort_column is id_column else [sort_column, id_column]
+    query = query.order_by(None).order_by(*[c.desc() if descending else c.asc() for c in columns])
+
+    # 多取一条用于判断是否还有下一页
+    items = query.limit(size + 1).all()
+    next_cursor = None
+    if len(items) > size:
+        items = items[:size]
+        last = items[-1]
+        sort_value = getattr(last, sort_column.key)
+        if is_datetime and sort_value is not None:
+            sort_value = sort_value.isoformat()
+        next_cursor = encode_cursor([sort_value, getattr(last, id_column.key)])
+
+    if with_total or count_key is None:
+        total = base_query.order_by(None).count()
     else:
-        file_path = get_real_file_path('/' + path)
+        total = get_approx_count(count_key, base_query)
+
+    return {
+        'list': items,
+        'size': size,
+        'total': total,
+        'totalExact': with_total or count_key is None,
+        'totalPages': (total + size - 1) // size,
+        'next_cursor': next_cursor
+    }
 
-    if file_path and os.path.exists(file_path):
-        return send_file(file_path)
+def upsert_cart_item(user_id, product_id, quantity):
+    """
+    加入购物车：单条 INSERT ... SELECT ... ON CONFLICT (user_id, product_id) DO UPDATE 累加数量，
+    并发重复点击也不会产生重复行。商品不存在时不插入，返回 False。
+    """
+    columns = ['user_id', 'product_id', 'quantity']
+    source = select(literal(user_id, Integer), Product.id, literal(quantity, Integer)) \
+        .where(Product.id == product_id)
+    # 方言模块按需导入，启动时不加载用不到的 MySQL / PostgreSQL 方言
+    dialect = db.engine.dialect.name
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(Cart).from_select(columns, source)
+        stmt = stmt.on_duplicate_key_update(quantity=Cart.quantity + stmt.inserted.quantity)
     else:
-        return f"""
-        <h1>404 页面未找到</h1>
-        <p>请求路径：{path}</p>
-        <p>后端查找路径：{file_path}</p>
-        <p>前端根目录：{FRONTEND_ROOT}</p>
-        """, 404
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(Cart).from_select(columns, source)
+        stmt = stmt.on_conflict_do_update(index_elements=['user_id', 'product_id'],
+                                          set_={'quantity': Cart.quantity + stmt.excluded.quantity})
+    return db.session.execute(stmt).rowcount > 0
+
+def is_positive_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 1
+
+def load_cart_lines(*criteria):
+    """
+    购物车行与商品一次性联表加载（LEFT JOIN，单条 SQL，只查询用到的列），并在内存中计算总价。
+    criteria 为 Cart 上的筛选条件。返回 {'lines': [行], 'missing': [商品ID], 'total_price': 总价}，
+    行为轻量元组，字段为 id、quantity、product_id、name、price、main_image
+    """
+    rows = db.session.query(Cart.id, Cart.quantity, Cart.product_id, Product.name, Product.price,
+                            Product.main_image) \
+        .outerjoin(Product, Product.id == Cart.product_id) \
+        .filter(*criteria).order_by(Cart.id).all()
+
+    lines = []
+    missing = []
+    total_price = 0
+    for line in rows:
+        # 商品名非空，为 None 表示商品已删除
+        if line.name is None:
+            missing.append(line.product_id)
+            continue
+        total_price += line.price * line.quantity
+        lines.append(line)
+    return {'lines': lines, 'missing': missing, 'total_price': total_price}
+
+# ===================== 接口缓存 =====================
+response_cache = None
+
+def cached_json(key, build):
+    """
+    读穿缓存：build() 返回响应字典，code 为 200 时把序列化后的 JSON 字节写入缓存，
+    命中时直接返回字节，不再查询数据库与序列化
+    """
+    def loader():
+        payload = build()
+        return jsonify(payload).get_data(), payload.get('code') == 200
+
+    body = response_cache.get_or_load(key, loader)
+    return current_app.response_class(body, mimetype='application/json')
+
+def _invalidate_products(ids):
+    """商品有写入后调用：ORM 提交（on_model_change）、批量导入、热门库存写回"""
+    # 推荐列表包含商品名称、价格、图片，任何商品变化都让其失效
+    response_cache.delete_prefix('product:recommend:')
+    # 分面计数索引登记变更，下次读取时按主键重新读取这些商品（ids 为 None 时整体重建）
+    facet_index.mark_changed(ids)
+    if ids is None:
+        response_cache.delete_prefix('product:detail:')
+    else:
+        response_cache.delete(*[f'product:detail:{product_id}' for product_id in ids])
+
+# 模型提交后自动失效对应缓存
+cache.on_model_change(Banner, lambda ids: response_cache.delete('banner:list'))
+cache.on_model_change(Product, _invalidate_products)
+
+def _invalidate_imported(ids):
+    """批量导入每批提交后调用：ids 只含更新的已有商品，新插入的商品没有 ID，分面计数索引整体重建"""
+    _invalidate_products(ids)
+    facet_index.mark_changed(None)
+
+# ===================== 分类树 =====================
+# 分类层级与每个分类的全部后代 ID 常驻内存，分类写入后重建
+category_tree = None
+
+def load_category_rows():
+    return db.session.query(Category.id, Category.name, Category.icon, Category.parent_id, Category.is_show) \
+        .order_by(Category.id).all()
+
+def category_filter(column, category_id):
+    """按分类筛选并包含全部子分类：叶子分类为等值条件，父分类展开为 IN (后代分类)"""
+    ids = category_tree.descendants(category_id)
+    return column == ids[0] if len(ids) == 1 else column.in_(ids)
+
+def _invalidate_categories(ids):
+    category_tree.invalidate()
+    response_cache.delete('category:list', 'category:tree')
+    # 按父分类取的推荐榜单依赖分类层级
+    response_cache.delete_prefix('product:recommend:')
+
+cache.on_model_change(Category, _invalidate_categories)
+
+# ===================== 商品分面 =====================
+# 商品列表各分类 / 各价格区间的商品数：无关键字时由常驻内存的 FacetIndex 计算，
+# 有关键字时对匹配的商品执行一次 GROUP BY (分类, 价格区间)
+facet_index = None
+
+# 商品列表的排序方式：(排序列, 是否降序)，缺省按商品ID升序
+PRODUCT_SORTS = {
+    'price_asc': (Product.price, False),
+    'price_desc': (Product.price, True),
+    'sales': (Product.sales, True),
+    'newest': (Product.id, True),
+}
+
+def load_facet_rows(ids):
+    if ids is None:
+        return db.session.query(Product.id, Product.category_id, Product.price).filter(Product.is_sale == 1).all()
+    # 按主键读取后在内存中过滤在售，避免 is_sale 条件让查询改走 (is_sale, ...) 索引扫描全部在售商品
+    rows = db.session.query(Product.id, Product.category_id, Product.price, Product.is_sale) \
+        .filter(Product.id.in_(ids)).all()
+    return [row[:3] for row in rows if row.is_sale == 1]
+
+def count_facets_sql(query, category_ids, min_price, max_price):
+    """
+    query 为只带在售与关键字条件的商品查询。一次 GROUP BY (分类, 价格区间) 同时得到两组计数，
+    口径与 FacetIndex.counts() 相同：分类计数受价格范围限制，价格区间计数受分类条件限制
+    """
+    edges = facet_index.edges
+    bucket = case(*[(Product.price < edge, i) for i, edge in enumerate(edges)], else_=len(edges))
+    in_range = []
+    if min_price is not None:
+        in_range.append(Product.price >= min_price)
+    if max_price is not None:
+        in_range.append(Product.price < max_price)
+    matched = func.sum(case((and_(*in_range), 1), else_=0)) if in_range else func.count()
+    rows = query.order_by(None) \
+        .with_entities(Product.category_id, bucket, func.count(), matched) \
+        .group_by(Product.category_id, bucket).all()
+
+    by_category, buckets = {}, [0] * (len(edges) + 1)
+    selected = None if category_ids is None else set(category_ids)
+    for category_id, index, count, matched in rows:
+        if matched:
+            by_category[category_id] = by_category.get(category_id, 0) + int(matched)
+        if selected is None or category_id in selected:
+            buckets[index] += count
+    return by_category, buckets
+
+def product_facets(query, category_id, min_price, max_price, keyword):
+    category_ids = category_tree.descendants(category_id) if category_id > 0 else None
+    if keyword:
+        by_category, buckets = count_facets_sql(query, category_ids, min_price, max_price)
+    else:
+        by_category, buckets = facet_index.counts(category_ids, min_price, max_price)
+    return {
+        'category': [{'id': cid, 'count': count} for cid, count in category_tree.rollup(by_category).items()],
+        'price': [{'min': low, 'max': high, 'count': count}
+                  for (low, high), count in zip(facet_index.ranges(), buckets)]
+    }
+
+# ===================== 库存 =====================
+hot_stock = None
+
+def split_hot_quantities(quantities):
+    """把 {商品ID: 数量} 拆分为 (热门商品, 普通商品) 两部分"""
+    hot = {pid: q for pid, q in quantities.items() if hot_stock.is_hot(pid)}
+    normal = {pid: q for pid, q in quantities.items() if pid not in hot}
+    return hot, normal
+
+def release_expired_orders(limit=200):
+    """取消超时未支付的订单并归还库存，返回取消的订单数"""
+    now = datetime.datetime.now()
+    expired = db.session.query(Order.id, Order.user_id) \
+        .filter(Order.status == 0, Order.expire_at < now) \
+        .order_by(Order.expire_at).limit(limit).all()
+
+    released = 0
+    for order_id, user_id in expired:
+        # 条件更新抢占订单，避免与支付或其他进程的扫描重复处理
+        claimed = Order.query.filter_by(id=order_id, status=0) \
+            .update({'status': 4}, synchronize_session=False)
+        if not claimed:
+            db.session.rollback()
+            continue
+
+        rows = db.session.query(OrderItem.product_id, func.sum(OrderItem.quantity)) \
+            .filter_by(order_id=order_id).group_by(OrderItem.product_id).all()
+        hot, normal = split_hot_quantities(dict(rows))
+        inventory.restore_stock(db.session, normal)
+        cache.mark_changed(db.session, Product, normal)
+        bump_versions(user_id, 'order')
+        db.session.commit()
+        hot_stock.release(hot)
+        released += 1
+    return released
+
+# ===================== 商品推荐 =====================
+# 热度分在支付时增量更新，全站与各分类的前 N 名常驻内存
+recommender = None
+
+def paid_hour(column):
+    """支付时间截断到整点，按方言生成 SQL 表达式（SQLite / MySQL 返回字符串，PostgreSQL 返回时间）"""
+    dialect = db.engine.dialect.name
+    if dialect == 'mysql':
+        return func.date_format(column, '%Y-%m-%d %H:00:00')
+    if dialect == 'postgresql':
+        return func.date_trunc('hour', column)
+    return func.strftime('%Y-%m-%d %H:00:00', column)
+
+def load_recommendations():
+    """
+    用已支付订单的销量重建热度分：在数据库中按商品、支付时间所在的小时汇总，每个小时只衰减一次
+    （没有支付时间的按当前时间计）。重建完成后失效推荐缓存，重建期间缓存的是旧榜单或补齐的推荐商品
+    """
+    hour = paid_hour(Order.paid_at).label('paid_hour')
+    rows = db.session.query(OrderItem.product_id, Product.category_id, func.sum(OrderItem.quantity), hour) \
+        .join(Order, Order.id == OrderItem.order_id) \
+        .join(Product, Product.id == OrderItem.product_id) \
+        .filter(Order.status.in_([1, 2, 3])) \
+        .group_by(OrderItem.product_id, Product.category_id, hour).all()
+
+    def timestamp(value):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = datetime.datetime.fromisoformat(value)
+        # paid_at 为本地时间（datetime.now()），timestamp() 按本地时区换算，与 recommender 的 time.time 一致
+        return value.timestamp()
+
+    recommender.load([(pid, cid, int(quantity), timestamp(paid)) for pid, cid, quantity, paid in rows])
+    response_cache.delete_prefix('product:recommend:')
+
+def record_order_sales(order_id):
+    """订单支付后把销量计入热度分，榜单变化时失效推荐缓存"""
+    rows = db.session.query(OrderItem.product_id, Product.category_id, OrderItem.quantity) \
+        .join(Product, Product.id == OrderItem.product_id) \
+        .filter(OrderItem.order_id == order_id).all()
+    if recommender.record(rows):
+        response_cache.delete_prefix('product:recommend:')
+
+_background_started = threading.Event()
+
+def _order_sweeper(app):
+    while True:
+        time.sleep(app.config['ORDER_SWEEP_INTERVAL'])
+        with app.app_context():
+            try:
+                release_expired_orders()
+            except Exception as e:
+                db.session.rollback()
+                app.logger.warning('超时订单扫描失败：%s', e)
+
+def _recommendation_loader(app):
+    with app.app_context():
+        try:
+            load_recommendations()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.warning('加载商品热度分失败：%s', e)
+
+@bp.before_app_request
+def start_background_jobs():
+    # 只在实际处理请求的进程中启动（避开 debug reloader 的父进程与 fork 之前的预加载进程）
+    if _background_started.is_set():
+        return
+    _background_started.set()
+    hot_stock.start(db.engine)
+    app = current_app._get_current_object()
+    # 热度分在后台重建，不阻塞首个请求；完成前推荐接口用 is_recommend 商品补齐
+    threading.Thread(target=_recommendation_loader, args=(app,), name='recommend-load', daemon=True).start()
+    threading.Thread(target=_order_sweeper, args=(app,), name='order-sweeper', daemon=True).start()
+
+# ===================== 静态资源托管 =====================
+# 启动时一次性建立 URL -> 资源 查找表（ETag、预压缩、带哈希的 assets/ URL）
+asset_store = None
+
+@bp.route('/<path:path>', methods=['GET'])
+@bp.route('/', methods=['GET'])
+def serve_frontend(path=''):
+    asset = asset_store.lookup(path)
+    if asset is None:
+        return '<h1>404 页面未找到</h1>', 404
+    return asset_store.make_response(asset)
+
+# ===================== 图片变体 =====================
+# 按宽度与格式生成缩放后的图片，编码在有界线程池中执行，结果缓存在磁盘上
+image_variants = None
+
+def image_error(code, msg):
+    response = jsonify({'code': code, 'data': {}, 'msg': msg})
+    response.status_code = code
+    return response
 
 # ===================== 接口实现 =====================
 
 # 1. 轮播图接口
-@app.route('/api/banner/list', methods=['GET'])
+@bp.route('/api/banner/list', methods=['GET'])
 def get_banners():
-    try:
+    def build():
         banners = Banner.query.order_by(Banner.id).all()
         data = [{
             'id': b.id,
@@ -189,14 +731,17 @@ def get_banners():
             'image_url': b.image_url,
             'jump_url': b.jump_url
         } for b in banners]
-        return jsonify({'code': 200, 'data': data, 'msg': '成功'})
+        return {'code': 200, 'data': data, 'msg': '成功'}
+
+    try:
+        return cached_json('banner:list', build)
     except Exception as e:
         return jsonify({'code': 500, 'data': [], 'msg': f'失败：{str(e)}'})
 
 # 2. 分类接口
-@app.route('/api/category/list', methods=['GET'])
+@bp.route('/api/category/list', methods=['GET'])
 def get_categories():
-    try:
+    def build():
         categories = Category.query.filter_by(is_show=1).all()
         data = [{
             'id': c.id,
@@ -204,73 +749,172 @@ def get_categories():
             'icon': c.icon,
             'parent_id': c.parent_id
         } for c in categories]
-        return jsonify({'code': 200, 'data': data, 'msg': '成功'})
+        return {'code': 200, 'data': data, 'msg': '成功'}
+
+    try:
+        return cached_json('category:list', build)
+    except Exception as e:
+        return jsonify({'code': 500, 'data': [], 'msg': f'失败：{str(e)}'})
+
+# 2.1 分类树接口（嵌套结构，只含显示中的分类，客户端不再自行拼装）
+@bp.route('/api/category/tree', methods=['GET'])
+def get_category_tree():
+    try:
+        return cached_json('category:tree', lambda: {'code': 200, 'data': category_tree.tree(), 'msg': '成功'})
     except Exception as e:
         return jsonify({'code': 500, 'data': [], 'msg': f'失败：{str(e)}'})
 
 # 3. 商品列表接口
-@app.route('/api/product/list', methods=['GET'])
+@bp.route('/api/product/list', methods=['GET'])
 def get_product_list():
     try:
         category_id = request.args.get('category_id', 0, type=int)
         keyword = request.args.get('keyword', type=str)
         page = request.args.get('page', 1, type=int)
         size = request.args.get('size', 10, type=int)
-
-        query = Product.query.filter_by(is_sale=1)
-        if category_id > 0:
-            query = query.filter_by(category_id=category_id)
-
+        # 价格范围 min_price <= price < max_price，与价格区间分面的划分一致
+        min_price = request.args.get('min_price', type=float)
+        max_price = request.args.get('max_price', type=float)
+        sort = request.args.get('sort', '')
+        if sort and sort not in PRODUCT_SORTS:
+            return jsonify({'code': 400, 'data': {}, 'msg': f'不支持的排序方式：{sort}'})
+
+        # 只查询返回的列，得到轻量的行元组而不是完整 ORM 对象
+        query = db.session.query(Product.id, Product.name, Product.price, Product.main_image, Product.stock,
+                                 Product.sales) \
+            .filter(Product.is_sale == 1)
+
+        # 关键字优先走 FTS5 全文索引并按相关度排序，不可用时回退到 LIKE
+        fts = None
         if keyword:
-            query = query.filter(or_(Product.name.like(f'%{keyword}%')))
+            fts = search.search_subquery(keyword) if search.enabled(db.engine) else None
+            if fts is not None:
+                query = query.join(fts, fts.c.product_id == Product.id)
+            else:
+                query = query.filter(or_(Product.name.like(f'%{keyword}%')))
+        # 分面计数不受分类与价格条件本身的限制，在加上这两个条件之前留一份查询
+        facet_query = query
 
-        pagination = get_pagination_data(query, page, size)
+        if category_id > 0:
+            query = query.filter(category_filter(Product.category_id, category_id))
+        if min_price is not None:
+            query = query.filter(Product.price >= min_price)
+        if max_price is not None:
+            query = query.filter(Product.price < max_price)
+
+        sort_column, descending = PRODUCT_SORTS.get(sort, (Product.id, False))
+        # 传入 cursor 参数（可为空，表示第一页）即启用游标分页
+        if 'cursor' in request.args:
+            pagination = get_cursor_pagination_data(
+                query, sort_column, Product.id, request.args.get('cursor'), size, descending=descending,
+                with_total=request.args.get('with_total', 0, type=int) == 1,
+                count_key=('product', category_id, keyword or '', min_price, max_price)
+            )
+        elif fts is not None and not sort:
+            pagination = get_pagination_data(query.order_by(fts.c.score, Product.id), page, size)
+        else:
+            order = [sort_column.desc() if descending else sort_column.asc()]
+            if sort_column is not Product.id:
+                order.append(Product.id.desc() if descending else Product.id.asc())
+            # 总数用 COUNT(*)：分面索引只收到本进程的写入，其他进程的修改最多延迟 FACET_INDEX_TTL 秒，
+            # 用它计算总数会让分页（totalPages）与实际结果不一致
+            pagination = get_pagination_data(query.order_by(*order), page, size)
 
-        data = [{
-            'id': p.id,
-            'name': p.name,
-            'price': p.price,
-            'main_image': p.main_image,
-            'stock': p.stock
-        } for p in pagination['list']]
+        data = [row._asdict() for row in pagination['list']]
 
-        return jsonify({
-            'code': 200,
-            'data': {
+        if 'cursor' in request.args:
+            result = {
+                'list': data,
+                'total': pagination['total'],
+                'totalExact': pagination['totalExact'],
+                'pageSize': pagination['size'],
+                'totalPages': pagination['totalPages'],
+                'next_cursor': pagination['next_cursor']
+            }
+        else:
+            result = {
                 'list': data,
                 'total': pagination['total'],
                 'page': pagination['page'],
                 'pageSize': pagination['size'],
                 'totalPages': pagination['totalPages']
-            },
-            'msg': '成功'
-        })
+            }
+        # facets=1 时附带各分类、各价格区间的商品数（切换筛选条件时请求，翻页时不需要）
+        if request.args.get('facets', 0, type=int) == 1:
+            result['facets'] = product_facets(facet_query, category_id, min_price, max_price, keyword)
+
+        return jsonify({'code': 200, 'data': result, 'msg': '成功'})
+    except ValueError as e:
+        return jsonify({'code': 400, 'data': {}, 'msg': str(e)})
     except Exception as e:
         return jsonify({'code': 500, 'data': {}, 'msg': f'失败：{str(e)}'})
 
 # 4. 商品详情接口
-@app.route('/api/product/detail', methods=['GET'])
+@bp.route('/api/product/detail', methods=['GET'])
 def get_product_detail():
     try:
         product_id = request.args.get('id', 0, type=int)
-        product = Product.query.get(product_id)
-        if not product:
-            return jsonify({'code': 404, 'data': {}, 'msg': '商品不存在'})
 
-        data = {
-            'id': product.id,
-            'name': product.name,
-            'price': product.price,
-            'main_image': product.main_image,
-            'stock': product.stock,
-            'category_id': product.category_id
-        }
-        return jsonify({'code': 200, 'data': data, 'msg': '成功'})
+        def build():
+            product = Product.query.get(product_id)
+            if not product:
+                return {'code': 404, 'data': {}, 'msg': '商品不存在'}
+
+            data = {
+                'id': product.id,
+                'name': product.name,
+                'price': product.price,
+                'main_image': product.main_image,
+                'stock': product.stock,
+                'category_id': product.category_id
+            }
+            return {'code': 200, 'data': data, 'msg': '成功'}
+
+        return cached_json(f'product:detail:{product_id}', build)
     except Exception as e:
         return jsonify({'code': 500, 'data': {}, 'msg': f'失败：{str(e)}'})
 
+# 4.1 推荐商品接口（按衰减后的销量热度排序，销量不足时用 is_recommend 商品补齐）
+@bp.route('/api/product/recommend', methods=['GET'])
+def get_recommend_products():
+    try:
+        category_id = request.args.get('category_id', type=int)
+        size = max(1, min(request.args.get('size', 8, type=int), current_app.config['RECOMMEND_TOP_N']))
+
+        def build():
+            if category_id:
+                ranked = recommender.top_in(category_tree.descendants(category_id), size)
+            else:
+                ranked = recommender.top(None, size)
+            scores = dict(ranked)
+            products = {p.id: p for p in Product.query.filter(
+                Product.id.in_(list(scores)), Product.is_sale == 1).all()} if scores else {}
+            items = [products[pid] for pid, _ in ranked if pid in products]
+
+            if len(items) < size:
+                query = Product.query.filter(Product.is_sale == 1, Product.is_recommend == 1)
+                if category_id:
+                    query = query.filter(category_filter(Product.category_id, category_id))
+                if items:
+                    query = query.filter(~Product.id.in_([p.id for p in items]))
+                items += query.order_by(Product.id).limit(size - len(items)).all()
+
+            data = [{
+                'id': p.id,
+                'name': p.name,
+                'price': p.price,
+                'main_image': p.main_image,
+                'category_id': p.category_id,
+                'score': round(scores.get(p.id, 0.0), 4)
+            } for p in items]
+            return {'code': 200, 'data': data, 'msg': '成功'}
+
+        return cached_json(f'product:recommend:{category_id or 0}:{size}', build)
+    except Exception as e:
+        return jsonify({'code': 500, 'data': [], 'msg': f'失败：{str(e)}'})
+
 # 5.1 用户注册接口
-@app.route('/api/user/register', methods=['POST'])
+@bp.route('/api/user/register', methods=['POST'])
 def user_register():
     try:
         data = request.get_json()
@@ -296,7 +940,7 @@ def user_register():
         db.session.commit()
 
         # 2. 立即生成 Token (实现自动登录)
-        token = generate_token(new_user.id) # 调用工具函数生成 Token
+        token = generate_token(new_user.id, new_user.token_version) # 调用工具函数生成 Token
 
         # 3. 注册成功后，返回 Token
         return jsonify({
@@ -304,12 +948,15 @@ def user_register():
             'data': {'username': username, 'token': token},
             'msg': '注册成功，已自动登录'
         })
+    except passwords.HasherBusy as e:
+        db.session.rollback()
+        return busy_response(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({'code': 500, 'data': {}, 'msg': f'失败：{str(e)}'})
 
 # 5.2 用户登录接口
-@app.route('/api/user/login', methods=['POST'])
+@bp.route('/api/user/login', methods=['POST'])
 def user_login():
     try:
         data = request.get_json()
@@ -323,21 +970,33 @@ def user_login():
         if not user or not check_password(password, user.password):
             return jsonify({'code': 401, 'data': {}, 'msg': '用户名或密码错误'})
 
-        token = generate_token(user.id)
+        # 旧哈希的 cost 低于当前配置时，借登录成功的机会透明升级；哈希线程池繁忙时跳过，下次登录再升级
+        if password_hasher.needs_rehash(user.password):
+            try:
+                user.password = encrypt_password(password)
+                db.session.commit()
+            except passwords.HasherBusy:
+                pass
+
+        token = generate_token(user.id, user.token_version)
         return jsonify({
             'code': 200,
             'data': {'token': token, 'username': user.username},
             'msg': '登录成功'
         })
+    except passwords.HasherBusy as e:
+        db.session.rollback()
+        return busy_response(e)
     except Exception as e:
+        db.session.rollback()
         return jsonify({'code': 500, 'data': {}, 'msg': f'失败：{str(e)}'})
 
 # 5.3 获取用户信息接口
-@app.route('/api/user/info', methods=['GET'])
+@bp.route('/api/user/info', methods=['GET'])
 @login_required
 def get_user_info():
     try:
-        user = User.query.get(g.user_id)
+        user = get_current_user()
         if not user:
             return jsonify({'code': 404, 'data': {}, 'msg': '用户不存在'})
 
@@ -356,7 +1015,7 @@ def get_user_info():
         return jsonify({'code': 500, 'data': {}, 'msg': f'失败：{str(e)}'})
 
 # 5.4 更新用户信息接口 (新增)
-@app.route('/api/user/update', methods=['POST'])
+@bp.route('/api/user/update', methods=['POST'])
 @login_required # 必须登录才能修改
 def update_user_info():
     try:
@@ -364,7 +1023,7 @@ def update_user_info():
         new_password = data.get('password')
         new_phone = data.get('phone')
 
-        user = User.query.get(g.user_id)
+        user = get_current_user()
         if not user:
             return jsonify({'code': 404, 'data': {}, 'msg': '用户不存在'})
 
@@ -375,6 +1034,8 @@ def update_user_info():
             if len(new_password) < 6:
                 return jsonify({'code': 400, 'data': {}, 'msg': '新密码至少6位'})
             user.password = encrypt_password(new_password)
+            # 递增版本号，已签发的旧 Token 全部失效
+            user.token_version = (user.token_version or 0) + 1
             has_changed = True
 
         # 2. 更新手机号
@@ -389,7 +1050,8 @@ def update_user_info():
 
             # 如果更新了密码，则返回新的 Token
             if new_password:
-                new_token = generate_token(user.id)
+                token_versions.set(user.id, user.token_version)
+                new_token = generate_token(user.id, user.token_version)
                 return jsonify({
                     'code': 200,
                     'data': {'token': new_token},
@@ -400,37 +1062,38 @@ def update_user_info():
         else:
             return jsonify({'code': 200, 'data': {}, 'msg': '没有检测到信息更新'})
 
+    except passwords.HasherBusy as e:
+        db.session.rollback()
+        return busy_response(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({'code': 500, 'data': {}, 'msg': f'失败：{str(e)}'})
 
 
 # 6.1 购物车列表接口
-@app.route('/api/cart/list', methods=['GET'])
+@bp.route('/api/cart/list', methods=['GET'])
 @login_required
+@conditional_on_version('cart')
 def get_cart_list():
     try:
-        cart_items = Cart.query.filter_by(user_id=g.user_id).all()
-        data = []
-        for item in cart_items:
-            product = Product.query.get(item.product_id)
-            if product:
-                data.append({
-                    'id': item.id,
-                    'product': {
-                        'id': product.id,
-                        'name': product.name,
-                        'price': product.price,
-                        'main_image': product.main_image
-                    },
-                    'quantity': item.quantity
-                })
+        # 与下单共用同一个查询；商品已删除的购物车行不返回
+        cart = load_cart_lines(Cart.user_id == g.user_id)
+        data = [{
+            'id': line.id,
+            'product': {
+                'id': line.product_id,
+                'name': line.name,
+                'price': line.price,
+                'main_image': line.main_image
+            },
+            'quantity': line.quantity
+        } for line in cart['lines']]
         return jsonify({'code': 200, 'data': data, 'msg': '成功'})
     except Exception as e:
         return jsonify({'code': 500, 'data': [], 'msg': f'失败：{str(e)}'})
 
 # 6.2 加入购物车接口
-@app.route('/api/cart/add', methods=['POST'])
+@bp.route('/api/cart/add', methods=['POST'])
 @login_required
 def add_cart():
     try:
@@ -440,21 +1103,13 @@ def add_cart():
 
         if not product_id:
             return jsonify({'code': 400, 'data': {}, 'msg': '商品ID不能为空'})
+        if not is_positive_int(quantity):
+            return jsonify({'code': 400, 'data': {}, 'msg': '数量必须为正整数'})
 
-        product = Product.query.get(product_id)
-        if not product:
+        if not upsert_cart_item(g.user_id, product_id, quantity):
+            db.session.rollback()
             return jsonify({'code': 404, 'data': {}, 'msg': '商品不存在'})
-
-        cart_item = Cart.query.filter_by(user_id=g.user_id, product_id=product_id).first()
-        if cart_item:
-            cart_item.quantity += quantity
-        else:
-            cart_item = Cart(
-                user_id=g.user_id,
-                product_id=product_id,
-                quantity=quantity
-            )
-            db.session.add(cart_item)
+        bump_versions(g.user_id, 'cart')
         db.session.commit()
         return jsonify({'code': 200, 'data': {}, 'msg': '加入购物车成功'})
     except Exception as e:
@@ -462,7 +1117,7 @@ def add_cart():
         return jsonify({'code': 500, 'data': {}, 'msg': f'失败：{str(e)}'})
 
 # 6.3 更新购物车数量接口
-@app.route('/api/cart/update', methods=['POST'])
+@bp.route('/api/cart/update', methods=['POST'])
 @login_required
 def update_cart():
     try:
@@ -478,64 +1133,179 @@ def update_cart():
             return jsonify({'code': 404, 'data': {}, 'msg': '购物车项不存在'})
 
         cart_item.quantity = max(1, quantity)
+        bump_versions(g.user_id, 'cart')
         db.session.commit()
         return jsonify({'code': 200, 'data': {}, 'msg': '更新成功'})
     except Exception as e:
         db.session.rollback()
         return jsonify({'code': 500, 'data': {}, 'msg': f'失败：{str(e)}'})
 
+# 6.4 购物车批量操作接口
+# 请求体 {"ops": [{"op": "add", "product_id": 1, "quantity": 2},
+#                 {"op": "set", "id": 5, "quantity": 3},
+#                 {"op": "remove", "id": 6}]}
+# 所有操作按顺序在同一个事务中执行，任一操作失败则全部回滚
+@bp.route('/api/cart/batch', methods=['POST'])
+@login_required
+def batch_cart():
+    try:
+        data = request.get_json() or {}
+        ops = data.get('ops')
+
+        if not isinstance(ops, list) or not ops:
+            return jsonify({'code': 400, 'data': {}, 'msg': '操作列表不能为空'})
+        if len(ops) > current_app.config['CART_BATCH_MAX_OPS']:
+            return jsonify({'code': 400, 'data': {}, 'msg': f'单次最多{current_app.config["CART_BATCH_MAX_OPS"]}个操作'})
+
+        # 先校验全部操作，任何一个参数错误都不执行（ID 与数量必须是正整数）
+        for index, op in enumerate(ops):
+            kind = op.get('op') if isinstance(op, dict) else None
+            if kind == 'add':
+                valid = is_positive_int(op.get('product_id')) and is_positive_int(op.get('quantity', 1))
+            elif kind == 'set':
+                valid = is_positive_int(op.get('id')) and is_positive_int(op.get('quantity'))
+            elif kind == 'remove':
+                valid = is_positive_int(op.get('id'))
+            else:
+                raise ValueError(f'第{index + 1}个操作类型错误')
+            if not valid:
+                raise ValueError(f'第{index + 1}个操作参数错误')
+
+        for op in ops:
+            if op['op'] == 'add':
+                if not upsert_cart_item(g.user_id, op['product_id'], op.get('quantity', 1)):
+                    db.session.rollback()
+                    return jsonify({'code': 404, 'data': {}, 'msg': f'商品ID{op["product_id"]}不存在'})
+            else:
+                line = Cart.query.filter_by(id=op['id'], user_id=g.user_id)
+                changed = line.update({'quantity': op['quantity']}, synchronize_session=False) if op['op'] == 'set' \
+                    else line.delete(synchronize_session=False)
+                if not changed:
+                    db.session.rollback()
+                    return jsonify({'code': 404, 'data': {}, 'msg': f'购物车项{op["id"]}不存在'})
+
+        bump_versions(g.user_id, 'cart')
+        db.session.commit()
+        return jsonify({'code': 200, 'data': {'applied': len(ops)}, 'msg': '更新成功'})
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'code': 400, 'data': {}, 'msg': str(e)})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'code': 500, 'data': {}, 'msg': f'失败：{str(e)}'})
+
 # 7.1 订单列表接口
-@app.route('/api/order/list', methods=['GET'])
+# 可选参数：status（0待付款 1待发货 2待收货 3已完成 4已取消）、start_date / end_date（YYYY-MM-DD，含当天）
+ORDER_STATUSES = (0, 1, 2, 3, 4)
+
+def parse_order_date(value):
+    """解析 YYYY-MM-DD 格式的日期，空值返回 None，格式错误时抛出 ValueError"""
+    if not value:
+        return None
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError('日期格式应为YYYY-MM-DD')
+
+def format_order_time(value):
+    return value.strftime('%Y-%m-%d %H:%M') if value else ''
+
+@bp.route('/api/order/list', methods=['GET'])
 @login_required
+@conditional_on_version('order')
 def get_order_list():
     try:
         page = request.args.get('page', 1, type=int)
         size = request.args.get('size', 5, type=int)
+        status = request.args.get('status', type=int)
+        start_date = parse_order_date(request.args.get('start_date'))
+        end_date = parse_order_date(request.args.get('end_date'))
+        if status is not None and status not in ORDER_STATUSES:
+            return jsonify({'code': 400, 'data': {}, 'msg': '无效的订单状态'})
+
+        # 按下单时间倒序（同一时间再按ID倒序），用户 + 状态 + 时间范围都落在
+        # (user_id, status, created_at DESC, id DESC) 索引上，不限状态时走 (user_id, created_at DESC, id DESC)
+        query = db.session.query(Order.id, Order.total_price, Order.status, Order.created_at, Order.paid_at) \
+            .filter(Order.user_id == g.user_id)
+        if status is not None:
+            query = query.filter(Order.status == status)
+        if start_date:
+            query = query.filter(Order.created_at >= start_date)
+        if end_date:
+            # 结束日期当天的订单也包含在内
+            query = query.filter(Order.created_at < end_date + datetime.timedelta(days=1))
+        if 'cursor' in request.args:
+            pagination = get_cursor_pagination_data(
+                query, Order.created_at, Order.id, request.args.get('cursor'), size, descending=True,
+                with_total=request.args.get('with_total', 0, type=int) == 1,
+                count_key=('order', g.user_id, status, start_date, end_date)
+            )
+        else:
+            pagination = get_pagination_data(query.order_by(Order.created_at.desc(), Order.id.desc()), page, size)
+        orders = pagination['list']
 
-        query = Order.query.filter_by(user_id=g.user_id)
-        pagination = get_pagination_data(query, page, size)
+        # 批量加载：一次 IN 查询取出本页所有订单项，并联表带出商品图片（商品已删除时为空）
+        order_ids = [order.id for order in orders]
+        order_items = []
+        if order_ids:
+            order_items = db.session.query(OrderItem.id, OrderItem.order_id, OrderItem.product_id,
+                                           OrderItem.product_name, OrderItem.product_price,
+                                           OrderItem.quantity, Product.main_image) \
+                .outerjoin(Product, Product.id == OrderItem.product_id) \
+                .filter(OrderItem.order_id.in_(order_ids)) \
+                .order_by(OrderItem.order_id, OrderItem.id).all()
+
+        items_map = {}
+        for item in order_items:
+            items_map.setdefault(item.order_id, []).append({
+                'id': item.id,
+                'product': {
+                    'id': item.product_id,
+                    'name': item.product_name,
+                    'price': item.product_price,
+                    'main_image': item.main_image or ''
+                },
+                'quantity': item.quantity
+            })
 
         data = []
-        for order in pagination['list']:
-            order_items = OrderItem.query.filter_by(order_id=order.id).all()
-            items = []
-            for item in order_items:
-                product = Product.query.get(item.product_id)
-                items.append({
-                    'id': item.id,
-                    'product': {
-                        'id': item.product_id,
-                        'name': item.product_name,
-                        'price': item.product_price,
-                        'main_image': product.main_image if product else ''
-                    },
-                    'quantity': item.quantity
-                })
-
+        for order in orders:
+            items = items_map.get(order.id, [])
             data.append({
                 'id': order.id,
                 'total_price': order.total_price,
                 'status': order.status,
-                'create_time': datetime.datetime.now().strftime('%Y-%m-%d %H:%M'),
+                'create_time': format_order_time(order.created_at),
+                'paid_time': format_order_time(order.paid_at),
                 'items': items
             })
 
-        return jsonify({
-            'code': 200,
-            'data': {
+        if 'cursor' in request.args:
+            result = {
+                'list': data,
+                'pageSize': pagination['size'],
+                'total': pagination['total'],
+                'totalExact': pagination['totalExact'],
+                'totalPages': pagination['totalPages'],
+                'next_cursor': pagination['next_cursor']
+            }
+        else:
+            result = {
                 'list': data,
                 'page': pagination['page'],
                 'pageSize': pagination['size'],
                 'total': pagination['total'],
                 'totalPages': pagination['totalPages']
-            },
-            'msg': '成功'
-        })
+            }
+
+        return jsonify({'code': 200, 'data': result, 'msg': '成功'})
+    except ValueError as e:
+        return jsonify({'code': 400, 'data': {}, 'msg': str(e)})
     except Exception as e:
         return jsonify({'code': 500, 'data': {}, 'msg': f'失败：{str(e)}'})
 
 # 7.2 创建订单接口
-@app.route('/api/order/create', methods=['POST'])
+@bp.route('/api/order/create', methods=['POST'])
 @login_required
 def create_order():
     try:
@@ -545,58 +1315,67 @@ def create_order():
         if not cart_ids:
             return jsonify({'code': 400, 'data': {}, 'msg': '请选择购物车商品'})
 
-        cart_items = Cart.query.filter(Cart.id.in_(cart_ids), Cart.user_id == g.user_id).all()
-        if not cart_items:
+        cart = load_cart_lines(Cart.id.in_(cart_ids), Cart.user_id == g.user_id)
+        if cart['missing']:
+            return jsonify({'code': 404, 'data': {}, 'msg': f'商品ID{cart["missing"][0]}不存在'})
+        if not cart['lines']:
             return jsonify({'code': 400, 'data': {}, 'msg': '购物车商品不存在'})
 
-        total_price = 0
-        order_items = []
-        for item in cart_items:
-            product = Product.query.get(item.product_id)
-            if not product:
-                return jsonify({'code': 404, 'data': {}, 'msg': f'商品ID{item.product_id}不存在'})
-
-            total_price += product.price * item.quantity
+        quantities = {}
+        for line in cart['lines']:
+            quantities[line.product_id] = quantities.get(line.product_id, 0) + line.quantity
+        hot, normal = split_hot_quantities(quantities)
 
-            order_items.append({
-                'product_id': product.id,
-                'product_name': product.name,
-                'product_price': product.price,
-                'quantity': item.quantity
-            })
-
-        order = Order(
-            user_id=g.user_id,
-            total_price=total_price,
-            status=0
-        )
-        db.session.add(order)
-        db.session.flush()
-
-        for item in order_items:
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=item['product_id'],
-                product_name=item['product_name'],
-                product_price=item['product_price'],
-                quantity=item['quantity']
+        # 热门商品先在内存计数器上预留，失败时不进入数据库事务
+        hot_stock.reserve(hot)
+        try:
+            now = datetime.datetime.now()
+            order = Order(
+                user_id=g.user_id,
+                total_price=cart['total_price'],
+                status=0,
+                created_at=now,
+                expire_at=now + datetime.timedelta(minutes=current_app.config['ORDER_PAY_TIMEOUT_MINUTES'])
             )
-            db.session.add(order_item)
+            db.session.add(order)
+            db.session.flush()
 
-        Cart.query.filter(Cart.id.in_(cart_ids)).delete(synchronize_session=False)
-        db.session.commit()
+            # 普通商品一条条件 UPDATE 扣减（stock >= 数量），任一不足则整单回滚
+            inventory.deduct_stock(db.session, normal)
+            cache.mark_changed(db.session, Product, normal)
+
+            # 订单项一次 executemany 批量写入
+            db.session.execute(OrderItem.__table__.insert(), [{
+                'order_id': order.id,
+                'product_id': line.product_id,
+                'product_name': line.name,
+                'product_price': line.price,
+                'quantity': line.quantity
+            } for line in cart['lines']])
+
+            # 只删除本人、本次结算的购物车行
+            line_ids = [line.id for line in cart['lines']]
+            Cart.query.filter(Cart.id.in_(line_ids)).delete(synchronize_session=False)
+            bump_versions(g.user_id, 'cart', 'order')
+            db.session.commit()
+        except Exception:
+            hot_stock.release(hot)
+            raise
 
         return jsonify({
             'code': 200,
             'data': {'order_id': order.id},
             'msg': '订单创建成功'
         })
+    except inventory.OutOfStock:
+        db.session.rollback()
+        return jsonify({'code': 409, 'data': {}, 'msg': '商品库存不足'})
     except Exception as e:
         db.session.rollback()
         return jsonify({'code': 500, 'data': {}, 'msg': f'失败：{str(e)}'})
 
 # 7.3 模拟支付接口
-@app.route('/api/order/pay', methods=['POST'])
+@bp.route('/api/order/pay', methods=['POST'])
 @login_required
 def pay_order():
     try:
@@ -609,98 +1388,460 @@ def pay_order():
         order = Order.query.filter_by(id=order_id, user_id=g.user_id, status=0).first()
         if not order:
             return jsonify({'code': 404, 'data': {}, 'msg': '待付款订单不存在'})
-
-        order.status = 1
+        if order.expire_at and order.expire_at < datetime.datetime.now():
+            return jsonify({'code': 400, 'data': {}, 'msg': '订单已超时，请重新下单'})
+
+        # 条件更新，避免与超时取消并发时把已取消的订单改为已支付
+        paid = Order.query.filter_by(id=order.id, status=0) \
+            .update({'status': 1, 'paid_at': datetime.datetime.now()}, synchronize_session=False)
+        if not paid:
+            db.session.rollback()
+            return jsonify({'code': 404, 'data': {}, 'msg': '待付款订单不存在'})
+        # 累计销量（商品列表按销量排序），与订单状态在同一事务中提交；
+        # 销量不出现在缓存的接口里，也不影响分面计数，因此不登记商品变更
+        sold = db.session.query(OrderItem.product_id, func.sum(OrderItem.quantity)) \
+            .filter_by(order_id=order.id).group_by(OrderItem.product_id).all()
+        inventory.add_sales(db.session, dict(sold))
+        bump_versions(g.user_id, 'order')
         db.session.commit()
+
+        try:
+            record_order_sales(order.id)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning('更新推荐热度失败：%s', e)
         return jsonify({'code': 200, 'data': {}, 'msg': '支付成功'})
     except Exception as e:
         db.session.rollback()
         return jsonify({'code': 500, 'data': {}, 'msg': f'失败：{str(e)}'})
 
-# ===================== 初始化 + 启动服务 =====================
-if __name__ == '__main__':
-    if os.path.exists('yougou.db'):
-        os.remove('yougou.db')
+# 8. 缓存统计接口（管理员，下同）
+@bp.route('/api/cache/stats', methods=['GET'])
+@admin_required
+def get_cache_stats():
+    return jsonify({'code': 200, 'data': response_cache.stats(), 'msg': '成功'})
+
+# 9. 密码哈希线程池统计接口
+@bp.route('/api/password/stats', methods=['GET'])
+@admin_required
+def get_password_stats():
+    return jsonify({'code': 200, 'data': password_hasher.stats(), 'msg': '成功'})
+
+# 10. 库存预留统计接口
+@bp.route('/api/inventory/stats', methods=['GET'])
+@admin_required
+def get_inventory_stats():
+    return jsonify({'code': 200, 'data': hot_stock.stats(), 'msg': '成功'})
+
+# 11. 批量请求接口
+# 请求体 {"requests": [{"path": "/api/banner/list"}, {"path": "/api/product/list?page=1&size=8"}]}
+# 子请求在进程内依次分发给对应的视图函数（只支持 GET /api/...），携带本次请求的 Authorization，
+# 各自经过 login_required；返回 [{"path", "status", "elapsed_ms", "body"}]，顺序与请求一致
+def dispatch_subrequest(path, headers):
+    """在独立的应用上下文中执行子请求（g、数据库会话互不共享），返回 (状态码, JSON 字节)"""
+    app = current_app._get_current_object()
+    with app.app_context(), app.test_request_context(path, method='GET', headers=headers):
+        try:
+            response = app.full_dispatch_request()
+        except Exception as e:
+            return 500, app.json.dumps_compact({'code': 500, 'data': {}, 'msg': f'失败：{str(e)}'})
+        if response.is_json:
+            return response.status_code, response.get_data()
+        return response.status_code, app.json.dumps_compact(response.get_data(as_text=True))
+
+@bp.route('/api/batch', methods=['POST'])
+def batch_requests():
+    data = request.get_json(silent=True) or {}
+    subrequests = data.get('requests')
+    if not isinstance(subrequests, list) or not subrequests:
+        return jsonify({'code': 400, 'data': [], 'msg': '请求列表不能为空'})
+    if len(subrequests) > current_app.config['BATCH_MAX_REQUESTS']:
+        return jsonify({'code': 400, 'data': [], 'msg': f'单次最多{current_app.config["BATCH_MAX_REQUESTS"]}个请求'})
+
+    headers = {}
+    if request.headers.get('Authorization'):
+        headers['Authorization'] = request.headers['Authorization']
+
+    # 子请求的响应体已是 JSON 字节，直接拼接进结果，不再解析后重新序列化
+    rejected = current_app.json.dumps_compact({'code': 400, 'data': {}, 'msg': '只支持 /api/ 下的 GET 请求'})
+    parts = []
+    for item in subrequests:
+        path = item.get('path') if isinstance(item, dict) else None
+        if not isinstance(path, str) or not path.startswith('/api/') or path.split('?')[0] == '/api/batch':
+            status, body, elapsed = 400, rejected, 0.0
+        else:
+            started = time.perf_counter()
+            status, body = dispatch_subrequest(path, headers)
+            elapsed = (time.perf_counter() - started) * 1000
+        meta = current_app.json.dumps_compact({'path': path, 'status': status, 'elapsed_ms': round(elapsed, 3)})
+        parts.append(meta[:-1] + b',"body":' + body.strip() + b'}')
+
+    payload = b'{"code":200,"data":[' + b','.join(parts) + b'],"msg":"' + '成功'.encode('utf-8') + b'"}\n'
+    return current_app.response_class(payload, mimetype='application/json')
+
+# 11.1 图片变体接口
+# GET /api/image?src=/assets/image/banner/banner1.png&w=640&fmt=auto
+# src 为前端目录下的图片 URL（也可以是带内容哈希的 assets/ URL），w 向上取整到 IMAGE_WIDTHS 中的档位；
+# fmt 为 auto（按 Accept 在 avif / webp / jpeg 中选择）或指定格式。
+# 首次请求时编码并写入磁盘缓存，之后直接发送文件；src 带内容哈希时响应为 immutable，否则缓存 IMAGE_MAX_AGE 秒。
+# 未安装 Pillow 或源图无法解码时返回原图
+@bp.route('/api/image', methods=['GET'])
+def get_image_variant():
+    src = request.args.get('src', '')
+    width = request.args.get('w', 0, type=int)
+    requested = request.args.get('fmt', 'auto')
+    if width <= 0:
+        return image_error(400, '宽度必须为正整数')
+
+    asset = asset_store.lookup(src) if src.startswith('/') else None
+    if asset is None or asset.mimetype not in images.SOURCE_TYPES:
+        return image_error(404, '图片不存在')
+    if not image_variants.available():
+        return asset_store.make_response(asset)
 
-    with app.app_context():
-        db.create_all()
-
-        if not Banner.query.first():
-            banners = [
-                Banner(title='iPhone 15 新品上市', image_url='/assets/image/banner/banner1.png', jump_url='/pages/product/list.html?category_id=1'),
-                Banner(title='MacBook Pro 限时优惠', image_url='/assets/image/banner/banner2.png', jump_url='/pages/product/list.html?category_id=2'),
-                Banner(title='华为Mate60 现货抢购', image_url='/assets/image/banner/banner3.png', jump_url='/pages/product/list.html?category_id=1'),
-                Banner(title='平板专区 满减活动', image_url='/assets/image/banner/banner4.png', jump_url='/pages/product/list.html?category_id=3')
-            ]
-            db.session.add_all(banners)
-
-        if not Category.query.first():
-            categories = [
-                Category(name='手机', icon='fa-mobile', parent_id=0),
-                Category(name='电脑', icon='fa-laptop', parent_id=0),
-                Category(name='平板', icon='fa-tablet', parent_id=0),
-                Category(name='配件', icon='fa-headphones', parent_id=0),
-                Category(name='苹果手机', icon='fa-apple', parent_id=1),
-                Category(name='安卓手机', icon='fa-android', parent_id=1)
-            ]
-            db.session.add_all(categories)
-
-        if not Product.query.first():
-            products = [
-                Product(name='iPhone 15 Pro', price=5999.0, main_image='/assets/image/product/iphone15.png', category_id=1, stock=50, is_recommend=1),
-                Product(name='华为Mate60 Pro', price=6999.0, main_image='/assets/image/product/huawei_mate60.png', category_id=1, stock=30, is_recommend=1),
-                Product(name='小米14 Ultra', price=4999.0, main_image='/assets/image/product/mi14.png', category_id=1, stock=80, is_recommend=1),
-                Product(name='vivo X100 Pro', price=4599.0, main_image='/assets/image/product/vivo_x100.png', category_id=1, stock=60, is_recommend=0),
-                Product(name='MacBook Pro 2025', price=9999.0, main_image='/assets/image/product/macbook.png', category_id=2, stock=20, is_recommend=1),
-                Product(name='联想拯救者Y9000P', price=8999.0, main_image='/assets/image/product/lenovo_y9000p.png', category_id=2, stock=15, is_recommend=1),
-                Product(name='戴尔XPS 13', price=7999.0, main_image='/assets/image/product/dell_xps.png', category_id=2, stock=25, is_recommend=0),
-                Product(name='iPad Pro 2025', price=7999.0, main_image='/assets/image/product/ipad_pro.png', category_id=3, stock=18, is_recommend=1),
-                Product(name='华为MatePad Pro', price=4299.0, main_image='/assets/image/product/huawei_pad.png', category_id=3, stock=40, is_recommend=0),
-                Product(name='AirPods Pro 2', price=1999.0, main_image='/assets/image/product/airpods.png', category_id=4, stock=100, is_recommend=1),
-                Product(name='苹果原装充电器', price=299.0, main_image='/assets/image/product/charger.png', category_id=4, stock=200, is_recommend=0)
-            ]
-            db.session.add_all(products)
-
-        if not User.query.first():
-            users = [
-                User(username='test', password=encrypt_password('123456'), phone='13800138000'),
-                User(username='admin', password=encrypt_password('admin123'), phone='13900139000'),
-                User(username='user1', password=encrypt_password('123456'), phone='13700137000')
-            ]
-            db.session.add_all(users)
-
-        if not Cart.query.first():
-            carts = [
-                Cart(user_id=1, product_id=1, quantity=1),
-                Cart(user_id=1, product_id=5, quantity=1),
-                Cart(user_id=1, product_id=10, quantity=2),
-                Cart(user_id=3, product_id=2, quantity=1)
-            ]
-            db.session.add_all(carts)
-
-        if not Order.query.first():
-            orders = [
-                Order(user_id=1, total_price=5999.0, status=0),
-                Order(user_id=1, total_price=9999.0, status=1),
-                Order(user_id=1, total_price=1999.0*2, status=2),
-                Order(user_id=1, total_price=6999.0, status=3)
-            ]
-            db.session.add_all(orders)
-            db.session.flush()
+    try:
+        fmt = image_variants.choose_format(requested, request.accept_mimetypes)
+        path, name = image_variants.get(asset.path, asset.etag, image_variants.snap_width(width), fmt)
+    except ValueError as e:
+        return image_error(400, str(e))
+    except images.ImageBusy as e:
+        return busy_response(e)
+    except images.ImageError as e:
+        current_app.logger.warning('图片变体生成失败（%s）：%s', src, e)
+        return asset_store.make_response(asset)
+
+    response = send_file(path, mimetype=images.MIMETYPES[fmt], etag=name, conditional=True, max_age=None)
+    response.headers['Cache-Control'] = assets.IMMUTABLE_CACHE_CONTROL if asset.immutable \
+        else f'public, max-age={current_app.config["IMAGE_MAX_AGE"]}'
+    if requested == 'auto':
+        response.vary.add('Accept')
+    return response
+
+# 11.2 图片变体统计接口
+@bp.route('/api/image/stats', methods=['GET'])
+@admin_required
+def get_image_stats():
+    return jsonify({'code': 200, 'data': image_variants.stats(), 'msg': '成功'})
+
+# 12. 推荐热度统计接口
+@bp.route('/api/recommend/stats', methods=['GET'])
+@admin_required
+def get_recommend_stats():
+    return jsonify({'code': 200, 'data': recommender.stats(), 'msg': '成功'})
+
+# 13.1 商品批量导入接口（管理员）
+# 上传 multipart 字段 file，或直接以请求体发送 CSV / JSONL；format、batch_size 可通过 query 指定。
+# 文件先流式写入临时文件，随后在后台分批导入，返回任务进度（含 job_id）
+@bp.route('/api/admin/product/import', methods=['POST'])
+@admin_required
+def import_products():
+    try:
+        upload = request.files.get('file')
+        if upload:
+            stream, filename, content_type = upload.stream, upload.filename, upload.mimetype
+        else:
+            stream, filename, content_type = request.stream, None, request.mimetype
+        fmt = request.args.get('format') or catalog.detect_format(filename, content_type)
+        if fmt not in ('csv', 'jsonl'):
+            return jsonify({'code': 400, 'data': {}, 'msg': '只支持 csv / jsonl 格式'})
+        batch_size = max(1, min(request.args.get('batch_size', current_app.config['IMPORT_BATCH_SIZE'], type=int), 10000))
+
+        fd, path = tempfile.mkstemp(prefix='yougou-import-', suffix=f'.{fmt}')
+        with os.fdopen(fd, 'wb') as out:
+            shutil.copyfileobj(stream, out, 1024 * 1024)
+        if os.path.getsize(path) == 0:
+            os.remove(path)
+            return jsonify({'code': 400, 'data': {}, 'msg': '导入文件为空'})
+
+        job = catalog.ImportJob.start(db.engine, path, fmt, batch_size, on_batch=_invalidate_imported)
+        return jsonify({'code': 200, 'data': job.progress(), 'msg': '导入任务已开始'})
+    except Exception as e:
+        return jsonify({'code': 500, 'data': {}, 'msg': f'失败：{str(e)}'})
 
-            order_items = [
-                OrderItem(order_id=1, product_id=1, product_name='iPhone 15 Pro', product_price=5999.0, quantity=1),
-                OrderItem(order_id=2, product_id=5, product_name='MacBook Pro 2025', product_price=9999.0, quantity=1),
-                OrderItem(order_id=3, product_id=10, product_name='AirPods Pro 2', product_price=1999.0, quantity=2),
-                OrderItem(order_id=4, product_id=2, product_name='华为Mate60 Pro', product_price=6999.0, quantity=1)
-            ]
-            db.session.add_all(order_items)
+# 13.2 导入进度接口（管理员）
+@bp.route('/api/admin/product/import/status', methods=['GET'])
+@admin_required
+def get_import_status():
+    job = catalog.ImportJob.get(request.args.get('job_id', ''))
+    if not job:
+        return jsonify({'code': 404, 'data': {}, 'msg': '导入任务不存在'})
+    return jsonify({'code': 200, 'data': job.progress(), 'msg': '成功'})
+
+# 13.3 商品导出接口（管理员，流式输出，不在内存中拼接完整文件）
+@bp.route('/api/admin/product/export', methods=['GET'])
+@admin_required
+def export_products():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'jsonl'):
+        return jsonify({'code': 400, 'data': {}, 'msg': '只支持 csv / jsonl 格式'})
+    rows = catalog.export_rows(db.engine, current_app.config['IMPORT_BATCH_SIZE'])
+    body = catalog.export_csv(rows) if fmt == 'csv' else catalog.export_jsonl(rows)
+    return current_app.response_class(
+        body,
+        mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename=products.{fmt}'}
+    )
+
+# 14. 监控指标接口（Prometheus 文本格式）
+def _component_metrics():
+    cache_stats = response_cache.stats()
+    hasher_stats = password_hasher.stats()
+    stock_stats = hot_stock.stats()
+    recommend_stats = recommender.stats()
+    category_stats = category_tree.stats()
+    facet_stats = facet_index.stats()
+    image_stats = image_variants.stats()
+    return [
+        ('yougou_cache_hits_total', 'counter', '接口缓存命中次数', [({}, cache_stats['hits'])]),
+        ('yougou_cache_misses_total', 'counter', '接口缓存未命中次数', [({}, cache_stats['misses'])]),
+        ('yougou_cache_entries', 'gauge', '接口缓存条数（Redis 后端不统计）',
+         [({}, cache_stats['size'])] if cache_stats['size'] is not None else []),
+        ('yougou_password_hash_seconds_total', 'counter', 'bcrypt 计算总耗时',
+         [({}, hasher_stats['hash_time']['total_seconds'])]),
+        ('yougou_password_hash_total', 'counter', 'bcrypt 计算次数', [({}, hasher_stats['hash_time']['count'])]),
+        ('yougou_password_queue_wait_seconds_total', 'counter', 'bcrypt 排队等待总耗时',
+         [({}, hasher_stats['queue_wait']['total_seconds'])]),
+        ('yougou_password_inflight', 'gauge', '正在执行与排队的 bcrypt 任务数', [({}, hasher_stats['inflight'])]),
+        ('yougou_password_rejected_total', 'counter', '线程池排队已满被拒绝的次数', [({}, hasher_stats['rejected'])]),
+        ('yougou_hot_stock_reserved_total', 'counter', '热门商品内存预留次数', [({}, stock_stats['reserved'])]),
+        ('yougou_hot_stock_rejected_total', 'counter', '热门商品库存不足次数', [({}, stock_stats['rejected'])]),
+        ('yougou_hot_stock_flushes_total', 'counter', '热门商品库存写回次数', [({}, stock_stats['flushes'])]),
+        ('yougou_recommend_updates_total', 'counter', '推荐热度更新次数', [({}, recommend_stats['updates'])]),
+        ('yougou_recommend_products', 'gauge', '有热度分的商品数', [({}, recommend_stats['products'])]),
+        ('yougou_category_tree_rebuilds_total', 'counter', '分类树重建次数', [({}, category_stats['rebuilds'])]),
+        ('yougou_facet_index_rebuilds_total', 'counter', '分面计数索引整体重建次数', [({}, facet_stats['rebuilds'])]),
+        ('yougou_facet_index_updates_total', 'counter', '分面计数索引增量更新的商品数', [({}, facet_stats['updates'])]),
+        ('yougou_image_variant_hits_total', 'counter', '图片变体磁盘缓存命中次数', [({}, image_stats['hits'])]),
+        ('yougou_image_variant_encodes_total', 'counter', '图片变体编码次数', [({}, image_stats['encodes'])]),
+        ('yougou_image_variant_coalesced_total', 'counter', '合并到进行中编码的请求数', [({}, image_stats['coalesced'])]),
+        ('yougou_image_variant_rejected_total', 'counter', '图片编码排队已满被拒绝的次数', [({}, image_stats['rejected'])]),
+        ('yougou_image_variant_encode_seconds_total', 'counter', '图片变体编码总耗时',
+         [({}, image_stats['encode_seconds'])]),
+        ('yougou_image_variant_cache_bytes', 'gauge', '图片变体磁盘缓存大小', [({}, image_stats['bytes'])]),
+    ]
+
+def render_metrics():
+    return current_app.response_class(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# 管理员登录后可访问；Prometheus 等抓取方配置 METRICS_TOKEN 后用 Authorization: Bearer <token> 访问
+@bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    token = current_app.config['METRICS_TOKEN']
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return render_metrics()
+    return admin_required(render_metrics)()
+
+# ===================== 初始化数据库 =====================
+def init_database():
+    """建表、执行迁移、建立全文索引（均可重复执行，不删除已有数据）。需在 app context 中调用"""
+    db.create_all()
+    migrations.upgrade(db.engine)
+    search.init_search(db)
+
+def seed_demo_data():
+    """写入演示数据：各表为空时才写入，已有数据的表保持不变"""
+    if not Banner.query.first():
+        banners = [
+            Banner(title='iPhone 15 新品上市', image_url='/assets/image/banner/banner1.png', jump_url='/pages/product/list.html?category_id=1'),
+            Banner(title='MacBook Pro 限时优惠', image_url='/assets/image/banner/banner2.png', jump_url='/pages/product/list.html?category_id=2'),
+            Banner(title='华为Mate60 现货抢购', image_url='/assets/image/banner/banner3.png', jump_url='/pages/product/list.html?category_id=1'),
+            Banner(title='平板专区 满减活动', image_url='/assets/image/banner/banner4.png', jump_url='/pages/product/list.html?category_id=3')
+        ]
+        db.session.add_all(banners)
+
+    if not Category.query.first():
+        categories = [
+            Category(name='手机', icon='fa-mobile', parent_id=0),
+            Category(name='电脑', icon='fa-laptop', parent_id=0),
+            Category(name='平板', icon='fa-tablet', parent_id=0),
+            Category(name='配件', icon='fa-headphones', parent_id=0),
+            Category(name='苹果手机', icon='fa-apple', parent_id=1),
+            Category(name='安卓手机', icon='fa-android', parent_id=1)
+        ]
+        db.session.add_all(categories)
+
+    if not Product.query.first():
+        products = [
+            Product(name='iPhone 15 Pro', price=5999.0, main_image='/assets/image/product/iphone15.png', category_id=1, stock=50, is_recommend=1),
+            Product(name='华为Mate60 Pro', price=6999.0, main_image='/assets/image/product/huawei_mate60.png', category_id=1, stock=30, is_recommend=1),
+            Product(name='小米14 Ultra', price=4999.0, main_image='/assets/image/product/mi14.png', category_id=1, stock=80, is_recommend=1),
+            Product(name='vivo X100 Pro', price=4599.0, main_image='/assets/image/product/vivo_x100.png', category_id=1, stock=60, is_recommend=0),
+            Product(name='MacBook Pro 2025', price=9999.0, main_image='/assets/image/product/macbook.png', category_id=2, stock=20, is_recommend=1),
+            Product(name='联想拯救者Y9000P', price=8999.0, main_image='/assets/image/product/lenovo_y9000p.png', category_id=2, stock=15, is_recommend=1),
+            Product(name='戴尔XPS 13', price=7999.0, main_image='/assets/image/product/dell_xps.png', category_id=2, stock=25, is_recommend=0),
+            Product(name='iPad Pro 2025', price=7999.0, main_image='/assets/image/product/ipad_pro.png', category_id=3, stock=18, is_recommend=1),
+            Product(name='华为MatePad Pro', price=4299.0, main_image='/assets/image/product/huawei_pad.png', category_id=3, stock=40, is_recommend=0),
+            Product(name='AirPods Pro 2', price=1999.0, main_image='/assets/image/product/airpods.png', category_id=4, stock=100, is_recommend=1),
+            Product(name='苹果原装充电器', price=299.0, main_image='/assets/image/product/charger.png', category_id=4, stock=200, is_recommend=0)
+        ]
+        db.session.add_all(products)
+
+    if not User.query.first():
+        users = [
+            User(username='test', password=encrypt_password('123456'), phone='13800138000'),
+            User(username='admin', password=encrypt_password('admin123'), phone='13900139000'),
+            User(username='user1', password=encrypt_password('123456'), phone='13700137000')
+        ]
+        db.session.add_all(users)
+
+    if not Cart.query.first():
+        carts = [
+            Cart(user_id=1, product_id=1, quantity=1),
+            Cart(user_id=1, product_id=5, quantity=1),
+            Cart(user_id=1, product_id=10, quantity=2),
+            Cart(user_id=3, product_id=2, quantity=1)
+        ]
+        db.session.add_all(carts)
+
+    if not Order.query.first():
+        # 下单时间依次间隔一天，已支付的订单在下单 5 分钟后支付
+        now = datetime.datetime.now()
+        orders = []
+        for i, (total_price, status) in enumerate([(5999.0, 0), (9999.0, 1), (1999.0*2, 2), (6999.0, 3)]):
+            created_at = now - datetime.timedelta(days=3 - i)
+            orders.append(Order(user_id=1, total_price=total_price, status=status, created_at=created_at,
+                                paid_at=created_at + datetime.timedelta(minutes=5) if status else None))
+        db.session.add_all(orders)
+        db.session.flush()
 
-        db.session.commit()
-        print('✅ 测试数据初始化完成！')
-        print('🔑 测试账号1：test / 123456')
-        print('🔑 测试账号2：admin / admin123')
-        print('🔑 测试账号3：user1 / 123456')
+        order_items = [
+            OrderItem(order_id=1, product_id=1, product_name='iPhone 15 Pro', product_price=5999.0, quantity=1),
+            OrderItem(order_id=2, product_id=5, product_name='MacBook Pro 2025', product_price=9999.0, quantity=1),
+            OrderItem(order_id=3, product_id=10, product_name='AirPods Pro 2', product_price=1999.0, quantity=2),
+            OrderItem(order_id=4, product_id=2, product_name='华为Mate60 Pro', product_price=6999.0, quantity=1)
+        ]
+        db.session.add_all(order_items)
+        db.session.flush()
+        # 演示订单中已支付的部分计入商品销量
+        migrations.backfill_product_sales(db.session.connection())
+
+    db.session.commit()
+
+# ===================== 应用工厂 =====================
+def init_components(app):
+    """按配置创建进程内组件（模块级单例，视图函数直接引用）"""
+    global password_hasher, request_metrics, token_cache, token_versions
+    global response_cache, hot_stock, recommender, category_tree, facet_index, asset_store, image_variants
+    config = app.config
+    password_hasher = passwords.PasswordHasher(
+        rounds=config['BCRYPT_ROUNDS'],
+        workers=config['BCRYPT_POOL_SIZE'],
+        max_queue=config['BCRYPT_QUEUE_LIMIT']
+    )
+    request_metrics = metrics.RequestMetrics(
+        slow_seconds=config['SLOW_REQUEST_MS'] / 1000,
+        slow_queries=config['SLOW_REQUEST_QUERIES'],
+        exclude=('yougou.get_metrics',),
+        detailed_timing=config['SERVER_TIMING_DETAIL']
+    )
+    request_metrics.add_collector(_component_metrics)
+    token_cache = cache.LRUCache(config['TOKEN_CACHE_SIZE'])
+    token_versions = cache.LRUCache(config['TOKEN_CACHE_SIZE'], config['TOKEN_VERSION_TTL'])
+    response_cache = cache.create_cache(config)
+    hot_stock = inventory.HotStockReserver(config['HOT_PRODUCT_IDS'], on_flush=_invalidate_products)
+    recommender = recommend.PopularityIndex(
+        half_life=config['RECOMMEND_HALF_LIFE_HOURS'] * 3600,
+        top_n=config['RECOMMEND_TOP_N']
+    )
+    category_tree = categories.CategoryTree(load_category_rows, ttl=config['CATEGORY_TREE_TTL'])
+    facet_index = facets.FacetIndex(load_facet_rows, config['PRICE_FACET_EDGES'], ttl=config['FACET_INDEX_TTL'],
+                                    context=app.app_context)
+    asset_store = assets.AssetStore(FRONTEND_ROOT, index='public/index.html')
+    # 页面中的 <!--#include virtual="..." --> 在服务端展开，组件修改后自动重建
+    asset_store.html_transforms.append(includes.IncludeExpander(FRONTEND_ROOT))
+    image_variants = images.ImageVariants(
+        config['IMAGE_CACHE_DIR'] or os.path.join(app.instance_path, 'images'),
+        max_bytes=config['IMAGE_CACHE_MAX_MB'] * 1024 * 1024,
+        widths=config['IMAGE_WIDTHS'],
+        workers=config['IMAGE_POOL_SIZE'],
+        max_queue=config['IMAGE_QUEUE_LIMIT']
+    )
+
+def create_app(overrides=None):
+    """
+    创建应用：加载配置、绑定数据库、创建组件、注册路由与命令行。
+    不建表、不写数据、不连接数据库、不启动后台线程（首个请求时才启动），
+    因此可以在 fork 多个 worker 之前预加载（见 serve.py）；fork 后子进程丢弃继承的连接池，各自重新连接。
+    """
+    app = Flask(__name__)
+    load_config(app.config)
+    # 数据库连接串与连接池参数由 YOUGOU_DB_PROFILE / YOUGOU_DATABASE_URL 等环境变量决定
+    storage.configure(app.config)
+    if overrides:
+        app.config.update(overrides)
+    # jsonify 统一走可替换的编码器：有 orjson 时用 orjson，输出与标准库逐字节一致
+    app.json = fastjson.FastJSONProvider(app, app.config['JSON_ENCODER_BACKEND'])
+    db.init_app(app)
+    init_components(app)
+    app.register_blueprint(bp)
+    register_commands(app)
+
+    with app.app_context():
+        engine = db.engine
+        storage.install(engine)
+        if app.config['METRICS_ENABLED']:
+            request_metrics.install(app, engine)
+
+    def after_fork():
+        # 父进程的连接不能跨进程共用：只丢弃连接池中的引用，不关闭父进程仍在使用的连接
+        engine.dispose(close=False)
+        # 后台线程不会被 fork 继承，子进程在首个请求时重新启动
+        _background_started.clear()
+    os.register_at_fork(after_in_child=after_fork)
+    return app
+
+def register_commands(app):
+    """
+    命令行（在 flask_backend 目录下执行）：
+        flask --app app init-db [--seed]    建表 + 迁移 + 全文索引，可选写入演示数据
+        flask --app app migrate             只执行待执行的迁移
+        flask --app app seed [--reset]      写入演示数据；--reset 先删除全部表再重建（会清空数据）
+    """
+    @app.cli.command('init-db')
+    @click.option('--seed', is_flag=True, help='同时写入演示数据')
+    def init_db_command(seed):
+        """建表、执行迁移并建立全文索引（不删除已有数据）"""
+        init_database()
+        click.echo('✅ 数据库已初始化')
+        if seed:
+            seed_demo_data()
+            print_demo_accounts()
+
+    @app.cli.command('migrate')
+    def migrate_command():
+        """执行待执行的数据库迁移"""
+        applied = migrations.upgrade(db.engine)
+        click.echo(f'✅ 已执行 {len(applied)} 个迁移' if applied else '✅ 没有待执行的迁移')
+
+    @app.cli.command('seed')
+    @click.option('--reset', is_flag=True, help='先删除全部表再重建（会清空数据）')
+    def seed_command(reset):
+        """写入演示数据（各表为空时才写入）"""
+        if reset:
+            db.drop_all()
+        init_database()
+        seed_demo_data()
+        print_demo_accounts()
+
+def print_demo_accounts():
+    print('✅ 测试数据初始化完成！')
+    print('🔑 测试账号1：test / 123456')
+    print('🔑 测试账号2：admin / admin123')
+    print('🔑 测试账号3：user1 / 123456')
+
+# ===================== 开发服务器 =====================
+# 生产环境请使用 serve.py（多进程 / 多线程 / gevent），这里只用于本地开发：
+# 不删除已有数据库；建表与迁移可重复执行，各表为空时才写入演示数据
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        init_database()
+        seed_demo_data()
+    print_demo_accounts()
+
+    # 开发模式：前端文件修改后自动重建资源表
+    asset_store.auto_reload = True
+    asset_store.build()
 
     print('=====================================')
     print('✅ 后端服务启动成功！')
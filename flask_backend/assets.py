@@ -0,0 +1,249 @@
+"""
+静态资源层：启动时一次性扫描前端目录，建立 URL -> 资源 的查找表
+
+- 每个 URL（含目录默认页、省略 .html 的写法、带内容哈希的 assets/ 文件名）只解析一次，
+  请求时不再做 os.path.exists / isdir 系统调用；
+- 每个资源带强 ETag，If-None-Match 命中返回 304；
+- 文本类资源在构建时预压缩 gzip（安装了 brotli 时还有 br），按 Accept-Encoding 选择；
+- assets/ 下的文件额外提供 name.<hash>.ext 形式的 URL，HTML 中的引用会被改写为该 URL，
+  可以长期缓存（immutable）；HTML 本身使用 no-cache + ETag 协商；
+- HTML 可经 html_transforms 改写（如服务端组件拼装），改写时引用的文件记为依赖，
+  依赖的 mtime 变化后页面会被重建。
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+
+from flask import Response, request, send_file
+
+try:
+    import brotli
+except ImportError:  # 可选依赖
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+_ASSET_REF_RE = re.compile(r'''((?:src|href)\s*=\s*["'])(/assets/[^"'?#]+)''')
+
+
+class Asset:
+    __slots__ = ('path', 'mtime', 'mimetype', 'etag', 'data', 'gzip', 'br', 'hashed_url', 'immutable',
+                 'deps', 'checked_at')
+
+    def __init__(self, path, mtime, mimetype):
+        self.path = path
+        self.mtime = mtime
+        self.mimetype = mimetype
+        self.etag = None
+        self.data = None   # 需要在内存中提供的内容（文本类或改写过的 HTML）
+        self.gzip = None
+        self.br = None
+        self.hashed_url = None
+        self.immutable = False
+        self.deps = ()       # [(依赖文件路径, mtime)]，HTML 拼装时引用的组件
+        self.checked_at = 0.0
+
+
+def _is_compressible(mimetype):
+    return mimetype is not None and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def _digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def _hashed_name(rel_url, digest):
+    base, ext = os.path.splitext(rel_url)
+    return f'{base}.{digest[:10]}{ext}'
+
+
+class AssetStore:
+    """
+    root 为前端根目录，index 为根路径（'/'）对应的文件（相对 root）。
+    auto_reload 为真时每次命中检查 mtime，未命中时最多每秒重扫一次（开发模式用）；
+    否则只有带依赖的 HTML 每隔 dep_check_interval 秒检查一次依赖文件的 mtime。
+    html_transforms 为 [fn(rel_path, text, deps) -> text]，在构建 HTML 时依次调用，
+    fn 把读取过的文件路径追加到 deps。
+    """
+
+    def __init__(self, root, index='public/index.html', hashed_prefix='assets/',
+                 compress_min_size=512, max_memory_size=2 * 1024 * 1024, auto_reload=False,
+                 dep_check_interval=1.0):
+        self.root = root
+        self.index = index
+        self.hashed_prefix = hashed_prefix
+        self.compress_min_size = compress_min_size
+        self.max_memory_size = max_memory_size
+        self.auto_reload = auto_reload
+        self.dep_check_interval = dep_check_interval
+        self.html_transforms = []
+        self._table = None
+        self._hashed = {}
+        self._lock = threading.Lock()
+        self._last_scan = 0.0
+
+    # ---------- 构建 ----------
+    def build(self):
+        """扫描 root，构建查找表（可重复调用，用于重新加载）"""
+        files = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                full = os.path.join(dirpath, filename)
+                rel = os.path.relpath(full, self.root).replace(os.sep, '/')
+                files[rel] = full
+
+        assets = {}
+        hashed = {}
+        # 先处理非 HTML 资源，得到 assets/ 的哈希 URL，再改写 HTML 中的引用
+        for rel, full in files.items():
+            if not rel.endswith('.html'):
+                asset = self._load(full)
+                if rel.startswith(self.hashed_prefix):
+                    asset.hashed_url = _hashed_name(rel, asset.etag)
+                    hashed['/' + rel] = '/' + asset.hashed_url
+                assets[rel] = asset
+        self._hashed = hashed
+        for rel, full in files.items():
+            if rel.endswith('.html'):
+                assets[rel] = self._load(full, rel)
+
+        table = {}
+        for rel, asset in assets.items():
+            table[rel] = asset
+            if asset.hashed_url:
+                immutable = self._immutable_copy(asset)
+                table[asset.hashed_url] = immutable
+        # 兼容原有的解析规则：目录 -> index.html / list.html，省略 .html 后缀
+        dirs = {rel.rsplit('/', 1)[0] for rel in files if '/' in rel}
+        for d in sorted(dirs):
+            for default in ('index.html', 'list.html'):
+                target = f'{d}/{default}'
+                if target in assets:
+                    table.setdefault(d, assets[target])
+                    table.setdefault(d + '/', assets[target])
+                    break
+        for rel in files:
+            if rel.endswith('.html'):
+                table.setdefault(rel[:-len('.html')], assets[rel])
+        if self.index in assets:
+            table[''] = assets[self.index]
+
+        with self._lock:
+            self._table = table
+            self._last_scan = time.monotonic()
+        return table
+
+    def _load(self, full, rel=None):
+        stat = os.stat(full)
+        mimetype = mimetypes.guess_type(full)[0] or 'application/octet-stream'
+        asset = Asset(full, stat.st_mtime, mimetype)
+
+        if rel is not None:
+            # HTML：应用改写后整体放入内存
+            with open(full, 'r', encoding='utf-8') as f:
+                text = f.read()
+            deps = []
+            for transform in self.html_transforms:
+                text = transform(rel, text, deps)
+            asset.deps = [(path, os.stat(path).st_mtime) for path in dict.fromkeys(deps)]
+            asset.checked_at = time.monotonic()
+            text = self.rewrite_asset_urls(text)
+            asset.data = text.encode('utf-8')
+            asset.mimetype = 'text/html; charset=utf-8'
+        elif _is_compressible(mimetype) and stat.st_size <= self.max_memory_size:
+            with open(full, 'rb') as f:
+                asset.data = f.read()
+        else:
+            digest = hashlib.sha1()
+            with open(full, 'rb') as f:
+                for chunk in iter(lambda: f.read(65536), b''):
+                    digest.update(chunk)
+            asset.etag = digest.hexdigest()
+            return asset
+
+        asset.etag = _digest(asset.data)
+        if len(asset.data) >= self.compress_min_size:
+            asset.gzip = gzip.compress(asset.data, compresslevel=9, mtime=0)
+            if brotli is not None:
+                asset.br = brotli.compress(asset.data)
+        return asset
+
+    @staticmethod
+    def _immutable_copy(asset):
+        copy = Asset(asset.path, asset.mtime, asset.mimetype)
+        for name in ('etag', 'data', 'gzip', 'br', 'hashed_url', 'deps'):
+            setattr(copy, name, getattr(asset, name))
+        copy.immutable = True
+        return copy
+
+    def rewrite_asset_urls(self, text):
+        """把 HTML 中 src/href 引用的 /assets/ 文件替换为带哈希的 URL"""
+        if not self._hashed:
+            return text
+        return _ASSET_REF_RE.sub(lambda m: m.group(1) + self._hashed.get(m.group(2), m.group(2)), text)
+
+    # ---------- 查找 ----------
+    def lookup(self, url_path):
+        table = self._table
+        if table is None:
+            with self._lock:
+                table = self._table
+            if table is None:
+                table = self.build()
+
+        key = url_path.lstrip('/')
+        asset = table.get(key)
+        if self.auto_reload:
+            if asset is not None and self._is_stale(asset):
+                asset = self.build().get(key)
+            elif asset is None and time.monotonic() - self._last_scan > 1:
+                asset = self.build().get(key)
+        elif asset is not None and asset.deps:
+            now = time.monotonic()
+            if now - asset.checked_at > self.dep_check_interval:
+                asset.checked_at = now
+                if self._is_stale(asset):
+                    asset = self.build().get(key)
+        return asset
+
+    def _is_stale(self, asset):
+        try:
+            if os.stat(asset.path).st_mtime != asset.mtime:
+                return True
+            return any(os.stat(path).st_mtime != mtime for path, mtime in asset.deps)
+        except OSError:
+            return True
+
+    # ---------- 响应 ----------
+    def make_response(self, asset):
+        cache_control = IMMUTABLE_CACHE_CONTROL if asset.immutable else REVALIDATE_CACHE_CONTROL
+
+        if asset.data is None:
+            response = send_file(asset.path, mimetype=asset.mimetype, etag=asset.etag,
+                                 conditional=True, max_age=None)
+            response.headers['Cache-Control'] = cache_control
+            return response
+
+        body, encoding, etag = asset.data, None, asset.etag
+        if asset.gzip is not None or asset.br is not None:
+            accept = request.accept_encodings
+            if asset.br is not None and accept['br']:
+                body, encoding, etag = asset.br, 'br', etag + '-br'
+            elif asset.gzip is not None and accept['gzip']:
+                body, encoding, etag = asset.gzip, 'gzip', etag + '-gz'
+
+        response = Response(body, mimetype=asset.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if asset.gzip is not None:
+            response.vary.add('Accept-Encoding')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = cache_control
+        return response.make_conditional(request)
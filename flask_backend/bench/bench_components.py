@@ -0,0 +1,83 @@
+"""
+服务端组件拼装的效果测量：请求数与首屏内容时间（time-to-content）
+
+模拟浏览器打开页面：先请求页面本身，再按页面脚本中的 loadComponent(...) 调用，
+对服务端未拼装（容器为空）的组件逐个发起请求。分别在关闭/开启拼装时统计：
+- 请求数与传输字节数；
+- 服务端处理总耗时；
+- 估算首屏内容时间 = 服务端耗时 + 往返次数 × RTT（组件请求在页面脚本执行后才开始，多一轮往返）。
+
+用法：
+    python bench/bench_components.py [--page /pages/product/list.html] [--rtt 80] [--rounds 50]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app as backend  # noqa: E402
+import assets  # noqa: E402
+import includes  # noqa: E402
+
+LOAD_RE = re.compile(r"loadComponent\(\s*'([^']+)'\s*,\s*'#([\w-]+)'")
+
+
+def container_filled(html, element_id):
+    match = re.search(rf'<(\w+)[^>]*id="{element_id}"[^>]*>(.*?)</\1>', html, re.S)
+    if not match:
+        return False
+    inner = re.sub(r'<!--.*?-->', '', match.group(2)).strip()
+    return bool(inner)
+
+
+def load_page(client, page):
+    """返回 (请求数, 字节数, 服务端耗时 ms, 往返轮数)"""
+    started = time.perf_counter()
+    response = client.get(page)
+    html = response.get_data(as_text=True)
+    requests, size, rounds = 1, len(response.data), 1
+
+    pending = [path for path, target in LOAD_RE.findall(html) if not container_filled(html, target)]
+    for path in pending:
+        size += len(client.get(f'/components/{path}').data)
+        requests += 1
+    if pending:
+        rounds += 1
+    return requests, size, (time.perf_counter() - started) * 1000, rounds
+
+
+def measure(app, store, page, rounds):
+    backend.asset_store = store
+    client = app.test_client()
+    store.build()
+    results = [load_page(client, page) for _ in range(rounds)]
+    server_ms = sorted(r[2] for r in results)[len(results) // 2]
+    return results[0][0], results[0][1], server_ms, results[0][3]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--page', default='/pages/product/list.html')
+    parser.add_argument('--rtt', type=float, default=80.0, help='模拟的网络往返时延（ms）')
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    app = backend.create_app()
+    with app.app_context():
+        backend.init_database()
+    plain = assets.AssetStore(backend.FRONTEND_ROOT, index='public/index.html')
+    assembled = assets.AssetStore(backend.FRONTEND_ROOT, index='public/index.html')
+    assembled.html_transforms.append(includes.IncludeExpander(backend.FRONTEND_ROOT))
+
+    print(f'页面：{args.page}  RTT={args.rtt:.0f}ms')
+    print(f'{"模式":<10}{"请求数":>8}{"字节数":>10}{"服务端(ms)":>12}{"往返":>6}{"估算TTC(ms)":>14}')
+    for label, store in (('客户端加载', plain), ('服务端拼装', assembled)):
+        requests, size, server_ms, trips = measure(app, store, args.page, args.rounds)
+        print(f'{label:<10}{requests:>8}{size:>10}{server_ms:>12.2f}{trips:>6}'
+              f'{server_ms + trips * args.rtt:>14.1f}')
+
+
+if __name__ == '__main__':
+    main()
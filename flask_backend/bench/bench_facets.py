@@ -0,0 +1,204 @@
+"""
+商品列表分面计数基准：各分类 / 各价格区间商品数的几种计算方式在 100 万商品上的 p50/p99
+
+- 两次聚合：按分类 GROUP BY 一次、按价格区间 GROUP BY 一次（朴素做法，每个请求两次扫描）；
+- 单次聚合：count_facets_sql()，一次 GROUP BY (分类, 价格区间) 同时得到两组计数（有关键字时的路径）；
+- 内存索引：FacetIndex.counts()（无关键字时的路径），另测整体构建耗时与增量更新耗时；
+- 总数：COUNT(*)（分页总数）与 FacetIndex.count() 对照；
+- 关键字：FTS5 匹配后的单次聚合；
+- 接口：/api/product/list 带价格范围、排序与 facets=1 的端到端耗时。
+
+筛选条件随机组合：不限 / 一级分类（含子分类）/ 二级分类，不限 / 随机价格范围。
+
+用法：
+    python bench/bench_facets.py                              # 临时库，默认 100 万商品
+    python bench/bench_facets.py --products 100000 --queries 100
+    python bench/bench_facets.py --db /tmp/yougou_1m.db       # 使用 gen_dataset.py 生成的库（不再写入商品）
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('--products', type=int, default=1000000)
+parser.add_argument('--categories', type=int, default=20)
+parser.add_argument('--queries', type=int, default=200)
+parser.add_argument('--db', help='已有的 SQLite 库；不指定时生成临时库')
+args = parser.parse_args()
+
+existing = bool(args.db)
+path = os.path.abspath(args.db) if args.db else os.path.join(tempfile.mkdtemp(), 'bench_facets.db')
+os.environ['YOUGOU_DATABASE_URL'] = f'sqlite:///{path}'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import case, func  # noqa: E402
+
+import app as backend  # noqa: E402
+import migrations  # noqa: E402
+import search  # noqa: E402
+from bench_search import product_name, QUERIES  # noqa: E402
+
+Product = backend.Product
+
+
+def build(conn, opts):
+    rng = random.Random(42)
+    tables = backend.db.metadata.tables
+    top_level = max(1, opts.categories // 4)
+    conn.execute(tables['category'].insert(), [
+        {'id': i, 'name': f'分类{i}', 'icon': 'fa-mobile', 'is_show': 1,
+         'parent_id': 0 if i <= top_level else rng.randint(1, top_level)}
+        for i in range(1, opts.categories + 1)])
+    started = time.perf_counter()
+    for start in range(0, opts.products, 50000):
+        conn.execute(tables['product'].insert(), [
+            {'name': product_name(rng), 'price': round(rng.uniform(9, 19999), 2),
+             'main_image': '/assets/image/product1.png', 'category_id': rng.randint(1, opts.categories),
+             'stock': 100, 'is_recommend': 0, 'is_sale': 1 if rng.random() < 0.95 else 0,
+             'sales': int(rng.paretovariate(1.2))}
+            for _ in range(min(50000, opts.products - start))])
+    print(f'写入 {opts.products} 条商品：{time.perf_counter() - started:.1f}s')
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(label, samples):
+    print(f'{label:<24}{percentile(samples, 50):>10.2f}{percentile(samples, 99):>10.2f}'
+          f'{sum(samples) / len(samples):>10.2f}')
+
+
+def timed(fn, cases):
+    samples = []
+    for case_args in cases:
+        started = time.perf_counter()
+        fn(*case_args)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def random_filters(rng, count, categories):
+    top_level = max(1, categories // 4)
+    cases = []
+    for _ in range(count):
+        category_id = rng.choice([0, rng.randint(1, top_level), rng.randint(top_level + 1, categories)])
+        if rng.random() < 0.5:
+            low = rng.choice([0, 100, 500, 1000, 3000])
+            price = (low, low + rng.choice([500, 2000, 8000]))
+        else:
+            price = (None, None)
+        cases.append((category_id,) + price)
+    return cases
+
+
+def main():
+    db = backend.db
+    app = backend.create_app()
+    with app.app_context():
+        if not existing:
+            db.create_all()
+            migrations.upgrade(db.engine)
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql('PRAGMA synchronous=OFF')
+                build(conn, args)
+            started = time.perf_counter()
+            search.init_search(db)
+            print(f'FTS 索引构建：{time.perf_counter() - started:.1f}s')
+        else:
+            migrations.upgrade(db.engine)
+        products = db.session.query(func.count(Product.id)).scalar()
+        categories = db.session.query(func.count(backend.Category.id)).scalar()
+
+        index = backend.facet_index
+        started = time.perf_counter()
+        index.counts()
+        build_seconds = time.perf_counter() - started
+        memory = index.stats()['memory_bytes']
+        print(f'商品 {products} 条，分类 {categories} 个')
+        print(f'内存索引整体构建：{build_seconds * 1000:.0f}ms，数组占用 {memory / 1e6:.1f}MB')
+
+        rng = random.Random(7)
+        cases = random_filters(rng, args.queries, categories)
+        base = db.session.query(Product.id).filter(Product.is_sale == 1)
+        edges = index.edges
+        bucket = case(*[(Product.price < edge, i) for i, edge in enumerate(edges)], else_=len(edges))
+
+        def descendants(category_id):
+            return backend.category_tree.descendants(category_id) if category_id else None
+
+        def two_queries(category_id, low, high):
+            by_category = base.with_entities(Product.category_id, func.count())
+            if low is not None:
+                by_category = by_category.filter(Product.price >= low, Product.price < high)
+            by_category.group_by(Product.category_id).all()
+            by_price = base.with_entities(bucket, func.count())
+            if category_id:
+                by_price = by_price.filter(backend.category_filter(Product.category_id, category_id))
+            by_price.group_by(bucket).all()
+
+        def single_query(category_id, low, high):
+            backend.count_facets_sql(base, descendants(category_id), low, high)
+
+        def in_memory(category_id, low, high):
+            index.counts(descendants(category_id), low, high)
+
+        print(f'\n{args.queries} 组随机筛选条件（ms）')
+        print(f'{"方式":<24}{"p50":>10}{"p99":>10}{"mean":>10}')
+        report('两次聚合查询', timed(two_queries, cases[:max(10, args.queries // 10)]))
+        report('单次聚合查询', timed(single_query, cases[:max(10, args.queries // 10)]))
+        report('内存索引', timed(in_memory, cases))
+
+        def count_sql(category_id, low, high):
+            query = base
+            if category_id:
+                query = query.filter(backend.category_filter(Product.category_id, category_id))
+            if low is not None:
+                query = query.filter(Product.price >= low, Product.price < high)
+            query.count()
+
+        def count_index(category_id, low, high):
+            index.count(descendants(category_id), low, high)
+
+        report('总数 COUNT(*)', timed(count_sql, cases[:max(10, args.queries // 10)]))
+        report('总数 内存索引', timed(count_index, cases))
+
+        # 增量更新：直接改 100 个商品的价格与分类（不经过 ORM 的变更登记），再登记并读取一次
+        changed = [row[0] for row in base.order_by(Product.id).limit(100).all()]
+        with db.engine.begin() as conn:
+            conn.execute(Product.__table__.update().where(Product.id.in_(changed))
+                         .values(price=Product.price + 1, category_id=1))
+        index.mark_changed(changed)
+        started = time.perf_counter()
+        index.counts()
+        print(f'{"增量更新 100 个商品":<24}{(time.perf_counter() - started) * 1000:>10.2f}')
+
+        def keyword_facets(keyword, category_id, low, high):
+            fts = search.search_subquery(keyword)
+            query = base.join(fts, fts.c.product_id == Product.id)
+            backend.count_facets_sql(query, descendants(category_id), low, high)
+
+        print('\n关键字 + 单次聚合（ms）')
+        for kind, pool in QUERIES.items():
+            keyword_cases = [(rng.choice(pool),) + cases[i % len(cases)] for i in range(max(10, args.queries // 4))]
+            report(kind, timed(keyword_facets, keyword_cases))
+
+    client = app.test_client()
+    print('\n/api/product/list 端到端（ms，每页 20 条）')
+    for label, query in (('默认排序', ''), ('价格升序+价格范围', '&sort=price_asc'),
+                         ('价格降序', '&sort=price_desc'), ('销量', '&sort=sales'), ('新品', '&sort=newest')):
+        def request_list(category_id, low, high, query=query):
+            url = f'/api/product/list?size=20&facets=1&category_id={category_id}{query}'
+            if low is not None and query == '&sort=price_asc':
+                url += f'&min_price={low}&max_price={high}'
+            body = client.get(url).get_json()
+            assert body['code'] == 200, body
+        report(label, timed(request_list, cases[:max(10, args.queries // 4)]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+图片变体的效果测量：各宽度 / 格式的字节数与首次编码耗时、磁盘缓存命中耗时、并发请求合并
+
+- 源图为 frontend/assets/image/banner/ 下的轮播图（原图直接发送时的字节数作为对照）；
+- 首次请求：编码并写入磁盘缓存（每个变体使用全新的缓存目录，避免命中）；
+- 再次请求：从磁盘缓存发送文件；
+- 并发：--concurrency 个线程同时请求同一个未生成的变体，统计实际编码次数。
+
+需要安装 Pillow。
+用法：
+    python bench/bench_images.py [--widths 320,640,1280] [--formats webp,avif,jpeg] [--rounds 50]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('--widths', default='320,640,1280')
+parser.add_argument('--formats', default='webp,avif,jpeg')
+parser.add_argument('--rounds', type=int, default=50, help='缓存命中的请求次数')
+parser.add_argument('--concurrency', type=int, default=16)
+args = parser.parse_args()
+
+workdir = tempfile.mkdtemp()
+cache_root = os.path.join(workdir, 'images')
+os.environ['YOUGOU_IMAGE_CACHE_DIR'] = cache_root
+# 首个请求会启动后台任务（需要表结构），使用空的临时库
+os.environ['YOUGOU_DATABASE_URL'] = f'sqlite:///{os.path.join(workdir, "bench_images.db")}'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app as backend  # noqa: E402
+import images  # noqa: E402
+import migrations  # noqa: E402
+
+BANNER_DIR = os.path.join(backend.FRONTEND_ROOT, 'assets', 'image', 'banner')
+
+
+def main():
+    app = backend.create_app({'METRICS_ENABLED': False})
+    with app.app_context():
+        backend.db.create_all()
+        migrations.upgrade(backend.db.engine)
+    client = app.test_client()
+    variants = backend.image_variants
+    if not variants.available():
+        sys.exit('未安装 Pillow')
+    sources = sorted(f'/assets/image/banner/{name}' for name in os.listdir(BANNER_DIR)
+                     if os.path.getsize(os.path.join(BANNER_DIR, name)) > 0)
+    widths = [int(w) for w in args.widths.split(',')]
+    formats = [f for f in args.formats.split(',') if f in variants.formats()]
+    original = sum(os.path.getsize(os.path.join(backend.FRONTEND_ROOT, src.lstrip('/'))) for src in sources)
+    print(f'源图 {len(sources)} 张，原图共 {original / 1024:.0f}KB；输出格式 {formats}')
+
+    print(f'\n{"变体":<14}{"总字节 KB":>12}{"占原图":>10}{"首次 ms/张":>14}{"命中 ms":>10}')
+    for fmt in formats:
+        for width in widths:
+            shutil.rmtree(cache_root, ignore_errors=True)
+            variants._files = None
+            size, encode = 0, 0.0
+            for src in sources:
+                started = time.perf_counter()
+                response = client.get(f'/api/image?src={src}&w={width}&fmt={fmt}')
+                encode += time.perf_counter() - started
+                assert response.status_code == 200 and response.mimetype == images.MIMETYPES[fmt], response
+                size += len(response.data)
+            started = time.perf_counter()
+            for i in range(args.rounds):
+                client.get(f'/api/image?src={sources[i % len(sources)]}&w={width}&fmt={fmt}').close()
+            hit = (time.perf_counter() - started) / args.rounds
+            print(f'{fmt + " " + str(width):<14}{size / 1024:>12.1f}{size / original:>10.1%}'
+                  f'{encode / len(sources) * 1000:>14.1f}{hit * 1000:>10.2f}')
+
+    # 并发请求同一个未生成的变体
+    shutil.rmtree(cache_root, ignore_errors=True)
+    variants._files = None
+    before = variants.stats()
+    statuses = []
+    barrier = threading.Barrier(args.concurrency)
+
+    def request_variant():
+        with app.test_client() as c:
+            barrier.wait()
+            statuses.append(c.get(f'/api/image?src={sources[0]}&w={widths[-1]}&fmt={formats[0]}').status_code)
+
+    threads = [threading.Thread(target=request_variant) for _ in range(args.concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    after = variants.stats()
+    print(f'\n{args.concurrency} 个并发请求同一变体：状态 {sorted(set(statuses))}，'
+          f'编码 {after["encodes"] - before["encodes"]} 次，合并 {after["coalesced"] - before["coalesced"]} 个请求，'
+          f'耗时 {(time.perf_counter() - started) * 1000:.0f}ms')
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+库存并发压测：多线程抢购同一个热门商品，验证零超卖并统计每秒下单数
+
+两种模式：
+- db  ：每单在事务中插入订单并执行条件 UPDATE（stock >= qty）扣减；
+- hot ：先在 HotStockReserver 内存计数器上预留，事务中只插入订单，库存由后台批量写回。
+
+结束后检查：成功订单数 == 初始库存（需求量大于库存时），数据库剩余库存 == 0，且没有负库存。
+
+用法：
+    python bench/bench_inventory.py [--threads 16] [--stock 2000] [--attempts 4000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import inventory  # noqa: E402
+
+HOT_PRODUCT = 1
+
+
+def setup(path, stock):
+    engine = create_engine(f'sqlite:///{path}', connect_args={'timeout': 30})
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE product (id INTEGER PRIMARY KEY, stock INTEGER)'))
+        conn.execute(text('CREATE TABLE "order" (id INTEGER PRIMARY KEY AUTOINCREMENT, product_id INTEGER)'))
+        conn.execute(text('INSERT INTO product (id, stock) VALUES (:id, :stock)'), {'id': HOT_PRODUCT, 'stock': stock})
+    return engine
+
+
+def run(mode, threads, stock, attempts):
+    path = os.path.join(tempfile.mkdtemp(), f'bench_inventory_{mode}.db')
+    engine = setup(path, stock)
+    reserver = inventory.HotStockReserver([HOT_PRODUCT], flush_interval=0.05)
+    if mode == 'hot':
+        reserver.start(engine)
+
+    remaining = [attempts]
+    counter_lock = threading.Lock()
+    results = {'ok': 0, 'rejected': 0, 'errors': 0}
+
+    def take():
+        with counter_lock:
+            if remaining[0] <= 0:
+                return False
+            remaining[0] -= 1
+            return True
+
+    def buyer():
+        while take():
+            quantities = {HOT_PRODUCT: 1}
+            try:
+                if mode == 'hot':
+                    reserver.reserve(quantities)
+                    try:
+                        with engine.begin() as conn:
+                            conn.execute(text('INSERT INTO "order" (product_id) VALUES (:p)'), {'p': HOT_PRODUCT})
+                    except Exception:
+                        reserver.release(quantities)
+                        raise
+                else:
+                    with engine.begin() as conn:
+                        conn.execute(text('INSERT INTO "order" (product_id) VALUES (:p)'), {'p': HOT_PRODUCT})
+                        inventory.deduct_stock(conn, quantities)
+                outcome = 'ok'
+            except inventory.OutOfStock:
+                outcome = 'rejected'
+            except Exception:
+                outcome = 'errors'
+            with counter_lock:
+                results[outcome] += 1
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=buyer) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    reserver.stop()
+
+    with engine.connect() as conn:
+        final_stock = conn.execute(text('SELECT stock FROM product WHERE id = :id'), {'id': HOT_PRODUCT}).scalar()
+        orders = conn.execute(text('SELECT COUNT(*) FROM "order"')).scalar()
+    engine.dispose()
+    os.remove(path)
+
+    oversold = orders - stock if orders > stock else 0
+    return {
+        'mode': mode,
+        'ok': results['ok'],
+        'rejected': results['rejected'],
+        'errors': results['errors'],
+        'orders': orders,
+        'final_stock': final_stock,
+        'oversold': oversold,
+        'consistent': final_stock == stock - orders and final_stock >= 0,
+        'orders_per_sec': results['ok'] / elapsed if elapsed else 0.0,
+        'elapsed': elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--stock', type=int, default=2000)
+    parser.add_argument('--attempts', type=int, default=4000, help='总下单尝试次数（大于库存才能验证超卖）')
+    args = parser.parse_args()
+
+    print(f'线程 {args.threads}，初始库存 {args.stock}，下单尝试 {args.attempts}')
+    print(f'{"模式":<6}{"成功":>8}{"售罄拒绝":>10}{"错误":>6}{"剩余库存":>10}{"超卖":>6}{"一致":>6}{"单/秒":>10}')
+    failed = False
+    for mode in ('db', 'hot'):
+        r = run(mode, args.threads, args.stock, args.attempts)
+        print(f'{r["mode"]:<6}{r["ok"]:>8}{r["rejected"]:>10}{r["errors"]:>6}{r["final_stock"]:>10}'
+              f'{r["oversold"]:>6}{str(r["consistent"]):>6}{r["orders_per_sec"]:>10.0f}')
+        failed = failed or r['oversold'] > 0 or not r['consistent']
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+请求监控（metrics.py）的开销测量
+
+分别在 YOUGOU_METRICS=0 / 1 的子进程中启动 app（临时 SQLite 库），用 test client 反复请求
+几个典型接口，比较每请求平均耗时（分 5 轮取最快一轮）。差值即为钩子 + 游标事件 + 直方图更新的开销。
+端到端差值容易被机器抖动淹没，因此另外直接计时一次完整的钩子调用（压帧、两条 SQL 的游标事件、
+写 Server-Timing、更新直方图、出帧）。
+
+用法：
+    python bench/bench_metrics.py [--requests 5000]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+PATHS = ['/api/product/detail?id=1', '/api/product/list?page=1&size=10', '/api/banner/list']
+
+
+def child(requests):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import app as backend
+
+    app = backend.create_app()
+    with app.app_context():
+        backend.db.create_all()
+        backend.db.session.add(backend.Product(name='测试商品', price=1.0, category_id=1))
+        backend.db.session.commit()
+    client = app.test_client()
+    results = []
+    for path in PATHS:
+        for _ in range(200):
+            client.get(path)
+        # 分 5 轮取最快一轮，减小机器抖动的影响
+        rounds = []
+        for _ in range(5):
+            started = time.perf_counter()
+            for _ in range(requests // 5):
+                client.get(path)
+            rounds.append((time.perf_counter() - started) / (requests // 5) * 1e6)
+        results.append(min(rounds))
+    print(' '.join(f'{r:.1f}' for r in results))
+
+
+def hook_cost(iterations=100000):
+    """单个请求的监控钩子耗时（us），不含视图与 SQL 本身"""
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import app as backend
+    import metrics
+
+    recorder = metrics.RequestMetrics(slow_seconds=3600, slow_queries=10 ** 6)
+    app = backend.create_app()
+    with app.test_request_context('/api/product/list?page=1'):
+        response = app.response_class(b'{}', mimetype='application/json')
+        started = time.perf_counter()
+        for _ in range(iterations):
+            recorder._before_request()
+            for _ in range(2):
+                recorder._before_cursor_execute(None, None, None, None, None, False)
+                recorder._after_cursor_execute(None, None, None, None, None, False)
+            recorder._after_request(response)
+            recorder._teardown_request()
+        return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.requests)
+        return
+
+    rows = {}
+    for enabled in ('0', '1'):
+        env = dict(os.environ, YOUGOU_METRICS=enabled,
+                   YOUGOU_DATABASE_URL=f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench_metrics.db")}')
+        output = subprocess.run([sys.executable, __file__, '--child', '--requests', str(args.requests)],
+                                env=env, check=True, capture_output=True, text=True).stdout
+        rows[enabled] = [float(v) for v in output.split()]
+
+    print(f'每请求平均耗时（us），{args.requests} 次/接口')
+    print(f'{"接口":<36}{"关闭":>10}{"开启":>10}{"开销":>10}')
+    for path, off, on in zip(PATHS, rows['0'], rows['1']):
+        print(f'{path:<36}{off:>10.1f}{on:>10.1f}{on - off:>+10.1f}')
+    os.environ['YOUGOU_DATABASE_URL'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench_metrics.db")}'
+    print(f'\n监控钩子单独计时（含 2 条 SQL 的游标事件）：{hook_cost():.2f} us/请求')
+
+
+if __name__ == '__main__':
+    main()
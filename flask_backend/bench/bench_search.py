@@ -0,0 +1,124 @@
+"""
+搜索基准：对比 LIKE '%kw%' 与 FTS5 全文索引在合成商品库上的 p50/p99 延迟
+
+每次查询都按 /api/product/list 的实际形态执行：COUNT 总数 + 取第一页（10 条）。
+
+用法：
+    python bench/bench_search.py                      # 默认 100 万商品
+    python bench/bench_search.py --products 100000 --queries 300
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import search  # noqa: E402
+
+BRANDS = ['华为', '小米', '苹果', '联想', '戴尔', '荣耀', '三星', 'vivo', 'OPPO', '索尼', 'Apple', 'Redmi']
+SERIES = ['Mate', 'Pro', 'Ultra', 'Max', 'Air', 'Nova', 'ThinkPad', 'XPS', 'Galaxy', 'MatePad', 'Reno', 'iPhone']
+NOUNS = ['手机', '平板', '笔记本电脑', '蓝牙耳机', '充电器', '智能手表', '显示器', '键盘', '鼠标', '移动电源']
+SUFFIX = ['旗舰版', '青春版', '标准版', '限量版', '套装', '', '', '']
+
+# 宽泛词命中约 5%~10% 的商品，精确词（品牌+系列+型号）只命中几百条，分开统计
+QUERIES = {
+    'broad': ['华为', '手机', '苹果', 'pro', '充电', '限量版', '旗舰', 'galaxy', '智能手表', '电源'],
+    'selective': ['华为mate60', 'xps 13', 'reno 8', 'thinkpad 42', '小米air 7', 'galaxy 21 手机',
+                  '荣耀nova 5', 'iphone 15 pro', '索尼max 88', 'redmi ultra 3'],
+}
+
+
+def product_name(rng):
+    return (f'{rng.choice(BRANDS)}{rng.choice(SERIES)}{rng.randint(1, 99)} '
+            f'{rng.choice(["", "Pro", "Max", "SE"])} {rng.choice(NOUNS)}{rng.choice(SUFFIX)}').strip()
+
+
+def build_catalog(path, count, batch=20000, seed=42):
+    conn = sqlite3.connect(path)
+    search.register_functions(conn)
+    conn.execute('PRAGMA journal_mode=OFF')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.execute('''CREATE TABLE product (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, name VARCHAR(200) NOT NULL, price FLOAT,
+        main_image VARCHAR(255), category_id INTEGER, stock INTEGER,
+        is_recommend INTEGER, is_sale INTEGER)''')
+    rng = random.Random(seed)
+    for start in range(0, count, batch):
+        rows = [(product_name(rng), round(rng.uniform(9, 19999), 2), '/assets/image/product1.png',
+                 rng.randint(1, 6), rng.randint(0, 500), rng.randint(0, 1), 1 if rng.random() < 0.95 else 0)
+                for _ in range(min(batch, count - start))]
+        conn.executemany('INSERT INTO product (name, price, main_image, category_id, stock, is_recommend, is_sale) '
+                         'VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+    conn.commit()
+
+    started = time.perf_counter()
+    for sql in search.SCHEMA_SQL + search.REBUILD_SQL:
+        conn.execute(sql)
+    conn.commit()
+    print(f'FTS 索引构建：{time.perf_counter() - started:.1f}s')
+    return conn
+
+
+def run_like(conn, keyword):
+    like = f'%{keyword}%'
+    conn.execute('SELECT COUNT(*) FROM product WHERE is_sale = 1 AND name LIKE ?', (like,)).fetchone()
+    conn.execute('SELECT id, name, price FROM product WHERE is_sale = 1 AND name LIKE ? '
+                 'ORDER BY id LIMIT 10', (like,)).fetchall()
+
+
+def run_fts(conn, keyword):
+    match = search.build_match_query(keyword)
+    fts = f'(SELECT rowid AS product_id, rank AS score FROM {search.FTS_TABLE} WHERE tokens MATCH ?) AS fts'
+    conn.execute(f'SELECT COUNT(*) FROM product JOIN {fts} ON fts.product_id = product.id '
+                 f'WHERE product.is_sale = 1', (match,)).fetchone()
+    conn.execute(f'SELECT product.id, product.name, product.price FROM product '
+                 f'JOIN {fts} ON fts.product_id = product.id WHERE product.is_sale = 1 '
+                 f'ORDER BY fts.score, product.id LIMIT 10', (match,)).fetchall()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def measure(conn, fn, queries):
+    samples = []
+    for keyword in queries:
+        started = time.perf_counter()
+        fn(conn, keyword)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--db', default=None, help='基准库路径，默认使用临时文件')
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), 'bench_search.db')
+    if os.path.exists(path):
+        os.remove(path)
+    print(f'生成 {args.products} 条商品 -> {path}')
+    conn = build_catalog(path, args.products)
+
+    rng = random.Random(7)
+    print(f'{"查询类型":<12}{"路径":<8}{"p50(ms)":>10}{"p99(ms)":>10}{"mean(ms)":>10}')
+    for kind, pool in QUERIES.items():
+        queries = [rng.choice(pool) for _ in range(args.queries)]
+        # 预热页缓存，避免首轮冷读影响结果
+        measure(conn, run_like, pool)
+        measure(conn, run_fts, pool)
+        for label, fn in (('LIKE', run_like), ('FTS5', run_fts)):
+            samples = measure(conn, fn, queries)
+            print(f'{kind:<12}{label:<8}{percentile(samples, 50):>10.2f}{percentile(samples, 99):>10.2f}'
+                  f'{sum(samples) / len(samples):>10.2f}')
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
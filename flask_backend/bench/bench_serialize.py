@@ -0,0 +1,101 @@
+"""
+列表接口序列化测量：每秒可输出的商品行数（查询 + 转字典 + JSON 编码）
+
+按 10 / 100 / 1000 行一页，对比：
+- orm+stdlib    ：加载完整 Product 对象，手动拷贝字段，标准库 json 编码（改造前的做法）；
+- columns+stdlib：只查询返回的列（行元组），标准库 json 编码；
+- columns+orjson：只查询返回的列，orjson 编码（未安装 orjson 时跳过）。
+同时单独给出纯编码阶段的每秒行数，区分 ORM 与编码器各自的开销。
+
+用法：
+    python bench/bench_serialize.py [--products 5000] [--seconds 1.0]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench_serialize.db')
+os.environ.setdefault('YOUGOU_DATABASE_URL', f'sqlite:///{DB_PATH}')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app as backend  # noqa: E402
+import fastjson  # noqa: E402
+
+Product = backend.Product
+PAGE_SIZES = (10, 100, 1000)
+
+
+def seed(products):
+    db = backend.db
+    db.create_all()
+    db.session.execute(Product.__table__.insert(), [
+        {'name': f'测试商品{i}', 'price': i * 1.5, 'main_image': f'/assets/image/product/{i}.png',
+         'category_id': i % 10 + 1, 'stock': 100, 'is_sale': 1, 'is_recommend': 0}
+        for i in range(1, products + 1)])
+    db.session.commit()
+
+
+def load_orm(size):
+    db = backend.db
+    products = Product.query.filter_by(is_sale=1).order_by(Product.id).limit(size).all()
+    data = [{'id': p.id, 'name': p.name, 'price': p.price, 'main_image': p.main_image, 'stock': p.stock}
+            for p in products]
+    db.session.expunge_all()
+    return data
+
+
+def load_columns(size):
+    rows = backend.db.session.query(Product.id, Product.name, Product.price, Product.main_image, Product.stock) \
+        .filter(Product.is_sale == 1).order_by(Product.id).limit(size).all()
+    return [row._asdict() for row in rows]
+
+
+def rate(fn, size, seconds):
+    """fn 在 seconds 秒内重复执行，返回每秒行数"""
+    count = 0
+    started = time.perf_counter()
+    while True:
+        fn()
+        count += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= seconds:
+            return count * size / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--seconds', type=float, default=1.0, help='每个组合的测量时长')
+    args = parser.parse_args()
+
+    app = backend.create_app()
+    encoders = {'stdlib': fastjson.FastJSONProvider(app, 'stdlib')}
+    if fastjson.orjson is not None:
+        encoders['orjson'] = fastjson.FastJSONProvider(app, 'orjson')
+    cases = [('orm+stdlib', load_orm, 'stdlib'), ('columns+stdlib', load_columns, 'stdlib')]
+    if 'orjson' in encoders:
+        cases.append(('columns+orjson', load_columns, 'orjson'))
+    else:
+        print('未安装 orjson，跳过 columns+orjson')
+
+    with app.app_context():
+        seed(args.products)
+        print(f'商品 {args.products} 条，单位：行/秒')
+        print(f'{"方式":<16}' + ''.join(f'{f"{size}行/页":>14}' for size in PAGE_SIZES) + f'{"编码(1000行)":>16}')
+        for label, loader, encoder_name in cases:
+            encoder = encoders[encoder_name]
+
+            def run(size):
+                return encoder.dumps_compact({'code': 200, 'data': {'list': loader(size)}, 'msg': '成功'})
+
+            rates = [rate(lambda: run(size), size, args.seconds) for size in PAGE_SIZES]
+            page = loader(1000)
+            encode_rate = rate(lambda: encoder.dumps_compact({'code': 200, 'data': {'list': page}, 'msg': '成功'}),
+                               len(page), args.seconds)
+            print(f'{label:<16}' + ''.join(f'{r:>14.0f}' for r in rates) + f'{encode_rate:>16.0f}')
+
+
+if __name__ == '__main__':
+    main()
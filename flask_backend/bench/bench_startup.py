@@ -0,0 +1,88 @@
+"""
+启动耗时测量：导入 app 模块、create_app()、首个请求，以及导入耗时最多的模块
+
+每一轮在新的子进程中执行（python -X importtime），取多轮中位数；
+导入明细列出 app 直接导入的各模块的累计耗时，用于发现新增的重量级依赖。
+
+用法：
+    python bench/bench_startup.py [--rounds 5] [--top 12]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import json, os, sys, time
+sys.path.insert(0, os.environ['BACKEND'])
+started = time.perf_counter()
+import app as backend
+imported = time.perf_counter()
+app = backend.create_app()
+created = time.perf_counter()
+with app.app_context():
+    backend.init_database()
+initialized = time.perf_counter()
+client = app.test_client()
+client.get('/api/banner/list')
+first = time.perf_counter()
+client.get('/api/banner/list')
+second = time.perf_counter()
+print(json.dumps({'import': imported - started, 'create_app': created - imported,
+                  'first_request': first - initialized, 'second_request': second - first}))
+'''
+
+
+def run_once():
+    env = dict(os.environ, BACKEND=BACKEND,
+               YOUGOU_DATABASE_URL=f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench_startup.db")}')
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD], env=env,
+                            capture_output=True, text=True, check=True)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    # importtime 输出：import time: self [us] | cumulative | imported package（缩进表示嵌套层级）
+    # 子模块先于父模块输出，先暂存第 1 层，遇到第 0 层的 app 时归入 app 的直接依赖
+    packages, pending = {}, []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            pending.append((name.strip(), int(cumulative) / 1e6))
+        elif depth == 0:
+            if name.strip() == 'app':
+                for module, seconds in pending:
+                    packages[module] = packages.get(module, 0.0) + seconds
+            pending = []
+    return timings, packages
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--top', type=int, default=12)
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.rounds)]
+    print(f'{args.rounds} 轮中位数（ms）')
+    for key in ('import', 'create_app', 'first_request', 'second_request'):
+        print(f'  {key:<16}{median([t[key] for t, _ in runs]) * 1000:>10.1f}')
+
+    names = set().union(*[p for _, p in runs])
+    totals = {name: median([p.get(name, 0.0) for _, p in runs]) for name in names}
+    print('\napp 直接导入的模块中耗时最多的（累计，ms，已被先导入的模块加载过的依赖不再计入）：')
+    for name, seconds in sorted(totals.items(), key=lambda item: -item[1])[:args.top]:
+        print(f'  {name:<24}{seconds * 1000:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
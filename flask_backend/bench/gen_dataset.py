@@ -0,0 +1,178 @@
+"""
+合成数据集生成器：按给定规模生成可复现（同一 seed 结果完全相同）的完整业务数据
+
+表结构来自 app.py 的模型与 migrations.upgrade()，数据用 Core executemany 分批写入；
+FTS 全文索引在商品写完后一次性重建。生成内容：
+- 分类：--categories 个，前 1/4 为一级分类，其余挂在一级分类下；
+- 商品：名称/价格/库存随机，约 5% 下架；
+- 用户：user1 ~ userN，密码统一为 123456（固定盐的 bcrypt 哈希，cost 由 --bcrypt-rounds 指定）；
+- 订单：每单 1~5 个商品，商品选择偏向热门（20% 的购买集中在 1% 的商品上），
+  状态为已支付/已发货/已完成/已取消，不生成待付款订单（避免启动后被超时扫描改写），
+  下单时间随订单ID递增、均匀分布在 2025 年全年（固定起点，保证可复现），已支付订单的支付时间在下单后 1~15 分钟；
+- 购物车：每个用户 --carts-per-user 行；
+- 商品销量：订单写完后按已支付订单统计（与迁移回填销量的方式相同）。
+
+用法：
+    python bench/gen_dataset.py --out /tmp/yougou_1m.db                     # 默认 1M 商品 / 100k 用户 / 10M 订单项
+    python bench/gen_dataset.py --out /tmp/small.db --products 10000 --users 1000 --order-items 50000
+    YOUGOU_DATABASE_URL=postgresql://... python bench/gen_dataset.py         # 写入服务端数据库
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+import bcrypt
+
+BATCH = 50000
+CATEGORY_NAMES = ['手机', '电脑', '平板', '配件', '耳机', '手表', '相机', '显示器', '键盘', '鼠标',
+                  '移动电源', '充电器', '音箱', '路由器', '存储', '打印机', '投影仪', '游戏机', '电视', '家电']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--out', help='SQLite 输出文件（已存在则报错）；不指定时使用 YOUGOU_DATABASE_URL')
+    parser.add_argument('--products', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--order-items', type=int, default=10000000,
+                        help='订单项目标条数（同一订单内重复的商品会合并，实际略少）')
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--carts-per-user', type=int, default=2)
+    parser.add_argument('--bcrypt-rounds', type=int, default=int(os.environ.get('YOUGOU_BCRYPT_ROUNDS', 12)))
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+
+args = parse_args() if __name__ == '__main__' else None
+if args is not None and args.out:
+    if os.path.exists(args.out):
+        sys.exit(f'{args.out} 已存在')
+    os.environ['YOUGOU_DATABASE_URL'] = f'sqlite:///{os.path.abspath(args.out)}'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app as backend  # noqa: E402
+import migrations  # noqa: E402
+import search  # noqa: E402
+from bench_search import product_name  # noqa: E402
+
+
+def insert_batches(conn, table, rows, label):
+    """rows 为生成器，按 BATCH 条一批 executemany，返回写入条数"""
+    started = time.perf_counter()
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH:
+            conn.execute(table.insert(), batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        conn.execute(table.insert(), batch)
+        total += len(batch)
+    elapsed = time.perf_counter() - started
+    print(f'{label:<8}{total:>12} 行  {elapsed:>7.1f}s  {total / elapsed if elapsed else 0:>10.0f} 行/秒')
+    return total
+
+
+def generate(conn, opts):
+    rng = random.Random(opts.seed)
+    tables = backend.db.metadata.tables
+
+    top_level = max(1, opts.categories // 4)
+    insert_batches(conn, tables['category'], (
+        {'id': i, 'name': CATEGORY_NAMES[(i - 1) % len(CATEGORY_NAMES)] + ('' if i <= len(CATEGORY_NAMES) else str(i)),
+         'icon': 'fa-mobile', 'is_show': 1, 'parent_id': 0 if i <= top_level else rng.randint(1, top_level)}
+        for i in range(1, opts.categories + 1)), '分类')
+
+    names, prices = [None], [0.0]  # 下标即商品ID
+
+    def products():
+        for i in range(1, opts.products + 1):
+            name, price = product_name(rng), round(rng.uniform(9, 19999), 2)
+            names.append(name)
+            prices.append(price)
+            yield {'id': i, 'name': name, 'price': price, 'main_image': '/assets/image/product1.png',
+                   'category_id': rng.randint(1, opts.categories), 'stock': rng.randint(500, 5000),
+                   'is_recommend': 1 if rng.random() < 0.1 else 0, 'is_sale': 1 if rng.random() < 0.95 else 0}
+    insert_batches(conn, tables['product'], products(), '商品')
+
+    # 固定盐，保证同一 seed 生成的哈希一致
+    salt = bcrypt.gensalt(rounds=opts.bcrypt_rounds)[:7] + b'yougoubenchmarkdataseu'
+    password = bcrypt.hashpw(b'123456', salt).decode('utf-8')
+    insert_batches(conn, tables['user'], (
+        {'id': i, 'username': f'user{i}', 'password': password, 'phone': f'138{i:08d}', 'token_version': 0}
+        for i in range(1, opts.users + 1)), '用户')
+
+    hot = max(1, opts.products // 100)
+
+    def pick_product():
+        return rng.randint(1, hot) if rng.random() < 0.2 else rng.randint(1, opts.products)
+
+    item_batches, items = [], []
+    # 订单数约为订单项数 / 3，下单时间按订单ID等间隔分布在一年内
+    started_at = datetime.datetime(2025, 1, 1)
+    interval = datetime.timedelta(days=365) / max(1, opts.order_items // 3)
+
+    def order_rows():
+        # 订单与订单项同时生成，订单项暂存后单独写入
+        order_id, remaining = 0, opts.order_items
+        while remaining > 0:
+            order_id += 1
+            lines = min(remaining, rng.randint(1, 5))
+            remaining -= lines
+            total = 0.0
+            for product_id in {pick_product() for _ in range(lines)}:
+                quantity = rng.randint(1, 3)
+                total += prices[product_id] * quantity
+                items.append({'order_id': order_id, 'product_id': product_id, 'product_name': names[product_id],
+                              'product_price': prices[product_id], 'quantity': quantity})
+            status = rng.choice((1, 2, 3, 3, 3, 4))
+            created_at = started_at + interval * order_id
+            paid_at = created_at + datetime.timedelta(minutes=rng.randint(1, 15)) if status != 4 else None
+            yield {'id': order_id, 'user_id': rng.randint(1, opts.users), 'total_price': round(total, 2),
+                   'status': status, 'expire_at': None, 'created_at': created_at, 'paid_at': paid_at}
+
+    def flush_items(rows):
+        for row in rows:
+            yield row
+            if len(items) >= BATCH:
+                conn.execute(tables['order_item'].insert(), items)
+                item_batches.append(len(items))
+                items.clear()
+
+    insert_batches(conn, tables['order'], flush_items(order_rows()), '订单')
+    if items:
+        conn.execute(tables['order_item'].insert(), items)
+        item_batches.append(len(items))
+    print(f'{"订单项":<8}{sum(item_batches):>12} 行')
+
+    insert_batches(conn, tables['cart'], (
+        {'user_id': user_id, 'product_id': product_id, 'quantity': rng.randint(1, 3)}
+        for user_id in range(1, opts.users + 1)
+        for product_id in sorted({pick_product() for _ in range(opts.carts_per_user)})), '购物车')
+
+    started = time.perf_counter()
+    updated = migrations.backfill_product_sales(conn)
+    print(f'{"销量":<8}{updated:>12} 行  {time.perf_counter() - started:>7.1f}s')
+
+
+def main():
+    db = backend.db
+    with backend.create_app().app_context():
+        db.create_all()
+        migrations.upgrade(db.engine)
+        started = time.perf_counter()
+        with db.engine.begin() as conn:
+            if conn.dialect.name == 'sqlite':
+                conn.exec_driver_sql('PRAGMA synchronous=OFF')
+            generate(conn, args)
+        # 商品写完后一次性建立全文索引（而不是逐行触发）
+        search.init_search(db)
+        print(f'完成，总耗时 {time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
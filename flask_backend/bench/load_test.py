@@ -0,0 +1,265 @@
+"""
+负载测试：多个虚拟用户按真实比例执行浏览、搜索、加购、下单、支付，统计每个接口的吞吐与 p50/p95/p99
+
+两种运行方式：
+- 进程内：--db 指向 gen_dataset.py 生成的 SQLite 文件（先复制到临时目录，原文件不被修改），
+  通过 Flask test client 直接调用视图，测的是服务端处理耗时；
+- HTTP：--url 指向已启动的服务，测的是包含网络与 WSGI 服务器在内的端到端耗时。
+
+场景权重（每个虚拟用户循环随机选择）：
+    浏览 50%（分类 → 商品列表 → 商品详情）、搜索 15%、加购 20%、下单并支付 10%、查看订单 5%
+
+--save-baseline 把结果写入 JSON；--compare 与之前的基线对比，任一接口 p95 变慢超过 --threshold 时退出码为 1。
+
+用法：
+    python bench/gen_dataset.py --out /tmp/yougou_small.db --products 100000 --users 10000 --order-items 500000
+    python bench/load_test.py --db /tmp/yougou_small.db --users 16 --duration 30 --save-baseline baseline.json
+    python bench/load_test.py --db /tmp/yougou_small.db --users 16 --duration 30 --compare baseline.json
+    python bench/load_test.py --url http://localhost:3000 --max-user 3 --users 8
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+from bench_search import QUERIES
+
+SCENARIOS = [('browse', 50), ('search', 15), ('add_to_cart', 20), ('checkout', 10), ('orders', 5)]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--db', help='gen_dataset.py 生成的 SQLite 文件（进程内模式）')
+    target.add_argument('--url', help='已启动服务的地址（HTTP 模式）')
+    parser.add_argument('--users', type=int, default=16, help='并发虚拟用户数')
+    parser.add_argument('--duration', type=float, default=30.0, help='压测时长（秒）')
+    parser.add_argument('--max-user', type=int, help='登录账号 user1 ~ userN 的 N（HTTP 模式必填）')
+    parser.add_argument('--max-product', type=int, help='商品ID上限（HTTP 模式必填）')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save-baseline', help='把结果保存为基线 JSON')
+    parser.add_argument('--compare', help='与基线 JSON 对比')
+    parser.add_argument('--threshold', type=float, default=0.2, help='p95 允许变慢的比例')
+    return parser.parse_args()
+
+
+# ===================== 客户端 =====================
+class InProcessClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, token=None):
+        headers = {'Authorization': token} if token else {}
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        return response.status_code, response.get_json(silent=True) or {}
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, body=None, token=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        req.add_header('Content-Type', 'application/json')
+        if token:
+            req.add_header('Authorization', token)
+        try:
+            with urllib.request.urlopen(req, timeout=30) as response:
+                return response.status, json.loads(response.read() or b'{}')
+        except urllib.error.HTTPError as e:
+            return e.code, {}
+
+
+# ===================== 统计 =====================
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def call(self, client, label, method, path, body=None, token=None):
+        started = time.perf_counter()
+        try:
+            status, payload = client.request(method, path, body, token)
+            ok = status == 200 and payload.get('code') == 200
+        except Exception:
+            payload, ok = {}, False
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.samples.setdefault(label, []).append(elapsed)
+            if not ok:
+                self.errors[label] = self.errors.get(label, 0) + 1
+        return payload if ok else None
+
+    def summary(self, duration):
+        result = {}
+        for label, samples in sorted(self.samples.items()):
+            samples = sorted(samples)
+
+            def pct(q):
+                return round(samples[int(q * (len(samples) - 1))] * 1000, 3)
+            result[label] = {
+                'count': len(samples),
+                'errors': self.errors.get(label, 0),
+                'rps': round(len(samples) / duration, 2),
+                'p50_ms': pct(0.50),
+                'p95_ms': pct(0.95),
+                'p99_ms': pct(0.99),
+            }
+        return result
+
+
+# ===================== 场景 =====================
+class VirtualUser:
+    def __init__(self, client, recorder, rng, username, max_product):
+        self.client = client
+        self.rec = recorder
+        self.rng = rng
+        self.username = username
+        self.max_product = max_product
+        self.token = None
+
+    def call(self, label, method, path, body=None, auth=False):
+        return self.rec.call(self.client, label, method, path, body, self.token if auth else None)
+
+    def login(self):
+        payload = self.call('POST /api/user/login', 'POST', '/api/user/login',
+                            {'username': self.username, 'password': '123456'})
+        self.token = payload['data']['token'] if payload else None
+        return self.token is not None
+
+    def browse(self):
+        categories = self.call('GET /api/category/list', 'GET', '/api/category/list')
+        category_id = self.rng.choice(categories['data'])['id'] if categories and categories['data'] else 0
+        page = self.rng.randint(1, 5)
+        listing = self.call('GET /api/product/list', 'GET',
+                            f'/api/product/list?category_id={category_id}&page={page}&size=10')
+        products = listing['data']['list'] if listing else []
+        product_id = self.rng.choice(products)['id'] if products else self.rng.randint(1, self.max_product)
+        self.call('GET /api/product/detail', 'GET', f'/api/product/detail?id={product_id}')
+
+    def search(self):
+        keyword = self.rng.choice(QUERIES[self.rng.choice(['broad', 'selective'])])
+        self.call('GET /api/product/list?keyword', 'GET',
+                  f'/api/product/list?keyword={urllib.request.quote(keyword)}&page=1&size=10')
+
+    def add_to_cart(self):
+        self.call('POST /api/cart/add', 'POST', '/api/cart/add',
+                  {'product_id': self.rng.randint(1, self.max_product), 'quantity': 1}, auth=True)
+
+    def checkout(self):
+        cart = self.call('GET /api/cart/list', 'GET', '/api/cart/list', auth=True)
+        if not cart or not cart['data']:
+            return
+        lines = self.rng.sample(cart['data'], min(3, len(cart['data'])))
+        order = self.call('POST /api/order/create', 'POST', '/api/order/create',
+                          {'cart_ids': [line['id'] for line in lines]}, auth=True)
+        if order:
+            self.call('POST /api/order/pay', 'POST', '/api/order/pay',
+                      {'order_id': order['data']['order_id']}, auth=True)
+
+    def orders(self):
+        self.call('GET /api/order/list', 'GET', '/api/order/list?page=1&size=5', auth=True)
+
+    def run(self, deadline):
+        if not self.login():
+            return
+        names = [name for name, _ in SCENARIOS]
+        weights = [weight for _, weight in SCENARIOS]
+        while time.perf_counter() < deadline:
+            getattr(self, self.rng.choices(names, weights)[0])()
+
+
+# ===================== 入口 =====================
+def prepare_in_process(db_path):
+    """复制数据集到临时目录后以其启动 app，返回 (client 工厂, 用户数, 商品数)"""
+    if not os.path.exists(db_path):
+        sys.exit(f'{db_path} 不存在，请先运行 bench/gen_dataset.py 生成数据集')
+    copy = os.path.join(tempfile.mkdtemp(), 'load_test.db')
+    shutil.copyfile(db_path, copy)
+    os.environ['YOUGOU_DATABASE_URL'] = f'sqlite:///{copy}'
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import app as backend
+    import migrations
+    import search
+
+    app = backend.create_app()
+    with app.app_context():
+        migrations.upgrade(backend.db.engine)
+        search.init_search(backend.db)
+        users = backend.db.session.query(backend.func.max(backend.User.id)).scalar() or 0
+        products = backend.db.session.query(backend.func.max(backend.Product.id)).scalar() or 0
+    return (lambda: InProcessClient(app)), users, products
+
+
+def compare(summary, baseline_path, threshold):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)['endpoints']
+    print(f'\n与基线 {baseline_path} 对比（p95）：')
+    regressed = []
+    for label, current in summary.items():
+        if label not in baseline:
+            continue
+        before, after = baseline[label]['p95_ms'], current['p95_ms']
+        change = (after - before) / before if before else 0.0
+        flag = '  <-- 变慢' if change > threshold else ''
+        print(f'  {label:<32}{before:>10.2f} -> {after:>10.2f} ms  {change:>+8.1%}{flag}')
+        if flag:
+            regressed.append(label)
+    return regressed
+
+
+def main():
+    args = parse_args()
+    if args.db:
+        make_client, max_user, max_product = prepare_in_process(args.db)
+    else:
+        if not args.max_user or not args.max_product:
+            sys.exit('HTTP 模式需要指定 --max-user 与 --max-product')
+        make_client, max_user, max_product = (lambda: HttpClient(args.url)), args.max_user, args.max_product
+    max_user = args.max_user or max_user
+
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    users = [VirtualUser(make_client(), recorder, random.Random(args.seed * 1000 + i),
+                         f'user{rng.randint(1, max_user)}', max_product) for i in range(args.users)]
+
+    started = time.perf_counter()
+    deadline = started + args.duration
+    threads = [threading.Thread(target=user.run, args=(deadline,)) for user in users]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duration = time.perf_counter() - started
+
+    summary = recorder.summary(duration)
+    total = sum(s['count'] for s in summary.values())
+    print(f'虚拟用户 {args.users}，时长 {duration:.1f}s，请求 {total}，总吞吐 {total / duration:.1f} req/s')
+    print(f'{"接口":<32}{"请求数":>8}{"错误":>6}{"req/s":>9}{"p50(ms)":>10}{"p95(ms)":>10}{"p99(ms)":>10}')
+    for label, s in summary.items():
+        print(f'{label:<32}{s["count"]:>8}{s["errors"]:>6}{s["rps"]:>9.1f}'
+              f'{s["p50_ms"]:>10.2f}{s["p95_ms"]:>10.2f}{s["p99_ms"]:>10.2f}')
+
+    if args.save_baseline:
+        meta = {'target': args.db or args.url, 'users': args.users, 'duration': round(duration, 3),
+                'seed': args.seed, 'created_at': time.strftime('%Y-%m-%d %H:%M:%S')}
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({'meta': meta, 'endpoints': summary}, f, ensure_ascii=False, indent=2)
+        print(f'\n基线已保存：{args.save_baseline}')
+
+    if args.compare:
+        regressed = compare(summary, args.compare, args.threshold)
+        sys.exit(1 if regressed else 0)
+
+
+if __name__ == '__main__':
+    main()
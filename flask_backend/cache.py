@@ -0,0 +1,296 @@
+"""
+读穿缓存：进程内 LRU（带 TTL），或共享后端（Redis，或本地替身 LocalBackend）
+
+- 缓存值为已序列化好的 JSON 字节，命中时直接返回，跳过 ORM 与 jsonify；
+- 写操作通过 SQLAlchemy Session 事件收集变更的模型与主键，提交成功后回调失效处理函数；
+- stats() 暴露命中、未命中、淘汰计数。
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+
+class LRUCache:
+    """线程安全的进程内 LRU，条目超过 ttl 秒视为过期"""
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            size = len(self._data)
+        return {
+            'size': size,
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+class LocalBackend:
+    """共享后端的本地替身：接口与 RedisBackend 一致，数据只在本进程内"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def size(self):
+        with self._lock:
+            return len(self._data)
+
+
+class RedisBackend:
+    """多进程/多机共享的 Redis 后端（需安装 redis 包）"""
+
+    def __init__(self, url, namespace='yougou:'):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._ns = namespace
+
+    def get(self, key):
+        return self._client.get(self._ns + key)
+
+    def set(self, key, value, ttl):
+        self._client.set(self._ns + key, value, ex=max(1, int(ttl)))
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*[self._ns + k for k in keys])
+
+    def delete_prefix(self, prefix):
+        keys = list(self._client.scan_iter(match=self._ns + prefix + '*'))
+        if keys:
+            self._client.delete(*keys)
+
+    def size(self):
+        # 条数需要扫描整个命名空间，不统计
+        return None
+
+
+class ResponseCache:
+    """
+    未配置共享后端时使用进程内 LRU；配置了共享后端时只查共享后端，不再经过进程内 LRU：
+    失效只能删除本进程的 LRU，其他进程的 LRU 会在 TTL 内继续返回旧数据。
+    clear()、stats() 同样只作用于当前使用的后端
+    """
+
+    def __init__(self, local, shared=None, shared_ttl=300):
+        self.local = local
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, loader):
+        """
+        loader() 返回 (bytes, cacheable)；cacheable 为 False 时结果不入缓存（如 404/500）。
+        """
+        if self.shared is None:
+            value = self.local.get(key)
+            if value is not None:
+                return value
+            value, cacheable = loader()
+            if cacheable:
+                self.local.set(key, value)
+            return value
+
+        value = self.shared.get(key)
+        with self._lock:
+            if value is not None:
+                self.shared_hits += 1
+            else:
+                self.shared_misses += 1
+        if value is not None:
+            return value
+        value, cacheable = loader()
+        if cacheable:
+            self.shared.set(key, value, self.shared_ttl)
+        return value
+
+    def delete(self, *keys):
+        if self.shared is None:
+            for key in keys:
+                self.local.delete(key)
+        else:
+            self.shared.delete(*keys)
+
+    def delete_prefix(self, prefix):
+        if self.shared is None:
+            self.local.delete_prefix(prefix)
+        else:
+            self.shared.delete_prefix(prefix)
+
+    def clear(self):
+        if self.shared is None:
+            self.local.clear()
+        else:
+            self.shared.delete_prefix('')
+
+    def stats(self):
+        """hits / misses 为本进程在当前后端上的命中计数；size 为当前后端的条数（Redis 为 None）"""
+        if self.shared is None:
+            data = self.local.stats()
+            data['backend'] = None
+            return data
+        with self._lock:
+            hits, misses = self.shared_hits, self.shared_misses
+        return {
+            'backend': type(self.shared).__name__,
+            'size': self.shared.size(),
+            'ttl': self.shared_ttl,
+            'hits': hits,
+            'misses': misses,
+        }
+
+
+def create_cache(config):
+    """按配置创建缓存：CACHE_BACKEND 为 'redis' / 'local' / 空（仅进程内）"""
+    local = LRUCache(config.get('CACHE_MAX_ENTRIES', 1024), config.get('CACHE_TTL', 300))
+    backend = config.get('CACHE_BACKEND')
+    shared = None
+    if backend == 'redis':
+        shared = RedisBackend(config['CACHE_REDIS_URL'])
+    elif backend == 'local':
+        shared = LocalBackend()
+    return ResponseCache(local, shared, config.get('CACHE_TTL', 300))
+
+
+# ===================== 模型变更通知 =====================
+# {模型类: [handler(ids)]}，ids 为变更行主键集合；批量 UPDATE/DELETE 无法得知主键时为 None
+_change_handlers = {}
+
+
+def on_model_change(model, handler):
+    _change_handlers.setdefault(model, []).append(handler)
+
+
+def mark_changed(session, model, ids=None):
+    """绕过 ORM 的写操作（Core UPDATE 等）手动登记变更，提交后同样触发失效回调"""
+    if ids is None:
+        _record(session, model, None)
+    else:
+        for ident in ids:
+            _record(session, model, ident)
+
+
+def _pending(session):
+    return session.info.setdefault('model_changes', {})
+
+
+def _record(session, model, ident):
+    ids = _pending(session).setdefault(model, set())
+    if ids is not None:
+        if ident is None:
+            _pending(session)[model] = None
+        else:
+            ids.add(ident)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_flush_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        model = type(obj)
+        if model in _change_handlers:
+            pk = inspect(obj).mapper.primary_key_from_instance(obj)
+            _record(session, model, pk[0] if len(pk) == 1 else None)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_changes(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete
+            or getattr(orm_execute_state, 'is_insert', False)):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in _change_handlers:
+        _record(orm_execute_state.session, mapper.class_, None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _dispatch_changes(session):
+    changes = session.info.pop('model_changes', None)
+    if not changes:
+        return
+    for model, ids in changes.items():
+        for handler in _change_handlers.get(model, []):
+            handler(ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('model_changes', None)
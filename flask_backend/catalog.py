@@ -0,0 +1,317 @@
+"""
+商品目录批量导入/导出（流式，内存占用与文件大小无关）
+
+导入：
+- iter_records() 逐行解析 CSV（首行为表头）或 JSONL（每行一个 JSON 对象），不整体读入；
+- import_products() 每 batch_size 行一批，带 id 且已存在的行只更新文件中给出的列，
+  其余行补齐默认值后插入；每批单独提交，格式错误的行跳过并记录行号；
+- ImportJob 在后台线程中执行导入，progress() 返回已处理行数、写入数、失败数等进度。
+
+导出：export_rows() 按主键 keyset 分批读取，export_csv() / export_jsonl() 逐行生成文本，
+配合 Flask 的流式响应使用。
+
+命令行：
+    python catalog.py import products.csv [--batch-size 1000]
+    python catalog.py import products.jsonl
+    python catalog.py export products.csv [--format csv|jsonl]
+"""
+import csv
+import io
+import json
+import os
+import threading
+import time
+import uuid
+
+from sqlalchemy import table, column, select, bindparam
+
+FIELDS = ['id', 'name', 'price', 'main_image', 'category_id', 'stock', 'is_recommend', 'is_sale']
+_TYPES = {'id': int, 'name': str, 'price': float, 'main_image': str, 'category_id': int,
+          'stock': int, 'is_recommend': int, 'is_sale': int}
+# 新插入的商品缺省列的取值（与模型默认值一致）
+_DEFAULTS = {'price': 0.0, 'main_image': '/assets/image/product1.png', 'category_id': 1,
+             'stock': 100, 'is_recommend': 1, 'is_sale': 1}
+
+product_table = table('product', *[column(name) for name in FIELDS])
+
+
+class ImportRowError(ValueError):
+    def __init__(self, line, message):
+        self.line = line
+        self.reason = message
+        super().__init__(f'第{line}行：{message}')
+
+
+def detect_format(filename=None, content_type=None, default='csv'):
+    name = (filename or '').lower()
+    if name.endswith(('.jsonl', '.ndjson', '.json')) or 'json' in (content_type or ''):
+        return 'jsonl'
+    if name.endswith('.csv') or 'csv' in (content_type or ''):
+        return 'csv'
+    return default
+
+
+def iter_records(stream, fmt):
+    """stream 为二进制文件对象，逐行产出 (行号, 字典)；JSONL 中无法解析的行产出 (行号, ImportRowError)"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_no, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_no, ImportRowError(line_no, 'JSON 格式错误')
+            continue
+        if not isinstance(record, dict):
+            yield line_no, ImportRowError(line_no, '每行必须是 JSON 对象')
+            continue
+        yield line_no, record
+
+
+def normalize(line_no, record):
+    """只保留已知列并转换类型；空字符串视为未提供。新商品（无 id）必须有 name，缺省列在写入时补默认值"""
+    row = {}
+    for name in FIELDS:
+        value = record.get(name)
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == '':
+            continue
+        try:
+            row[name] = _TYPES[name](value)
+        except (TypeError, ValueError):
+            raise ImportRowError(line_no, f'{name} 格式错误')
+    if 'id' not in row:
+        if not row.get('name'):
+            raise ImportRowError(line_no, '新商品必须提供 name')
+    elif len(row) == 1:
+        raise ImportRowError(line_no, '没有需要更新的列')
+    return row
+
+
+def write_batch(engine, rows):
+    """
+    一批行在一个事务中写入，返回涉及的已有商品ID。
+    带 id 的行先查出哪些已存在：已存在的按列集合分组 executemany UPDATE（只更新给出的列），
+    不存在的与不带 id 的行补齐默认值后一起 INSERT。
+    （不用 INSERT ... ON CONFLICT：SQLite 在判断冲突前就会检查 NOT NULL，只给部分列的更新行会失败）
+    """
+    with engine.begin() as conn:
+        given = [row['id'] for row in rows if 'id' in row]
+        existing = set()
+        if given:
+            existing = set(conn.execute(select(product_table.c.id)
+                                        .where(product_table.c.id.in_(given))).scalars())
+        updates, inserts = {}, []
+        for row in rows:
+            if row.get('id') in existing:
+                updates.setdefault(tuple(sorted(row)), []).append(row)
+            elif not row.get('name'):
+                raise ImportRowError(0, f'商品 {row["id"]} 不存在，新商品必须提供 name')
+            else:
+                inserts.append({**_DEFAULTS, **row})
+        for columns, group in updates.items():
+            stmt = product_table.update().where(product_table.c.id == bindparam('_id')) \
+                .values({c: bindparam(c) for c in columns if c != 'id'})
+            conn.execute(stmt, [{**row, '_id': row['id']} for row in group])
+        for columns in {tuple(sorted(row)) for row in inserts}:
+            conn.execute(product_table.insert(), [row for row in inserts if tuple(sorted(row)) == columns])
+    return sorted(existing)
+
+
+def import_products(engine, records, batch_size=1000, on_batch=None, progress=None, max_errors=100):
+    """
+    records 为 iter_records() 的输出。每批提交后调用 on_batch(ids)（用于失效缓存）；
+    progress 为字典，导入过程中原地更新，供其他线程读取进度。
+    """
+    progress = progress if progress is not None else {}
+    progress.update({'processed': 0, 'written': 0, 'failed': 0, 'batches': 0, 'errors': []})
+    batch = []
+
+    def fail(message):
+        progress['failed'] += 1
+        if len(progress['errors']) < max_errors:
+            progress['errors'].append(message)
+
+    def flush():
+        rows = [row for _, row in batch]
+        try:
+            ids = write_batch(engine, rows)
+            progress['written'] += len(rows)
+        except Exception:
+            # 整批失败（如不存在的 id 缺少 name）时逐行重试，定位出错的行
+            ids = []
+            for line_no, row in batch:
+                try:
+                    ids += write_batch(engine, [row])
+                    progress['written'] += 1
+                except ImportRowError as e:
+                    fail(f'第{line_no}行：{e.reason}')
+                except Exception as e:
+                    fail(f'第{line_no}行：写入失败 {e.__class__.__name__}')
+        progress['batches'] += 1
+        batch.clear()
+        if on_batch is not None:
+            on_batch(ids)
+
+    for line_no, record in records:
+        progress['processed'] += 1
+        try:
+            if isinstance(record, ImportRowError):
+                raise record
+            batch.append((line_no, normalize(line_no, record)))
+        except ImportRowError as e:
+            fail(str(e))
+            continue
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return progress
+
+
+# ===================== 后台导入任务 =====================
+class ImportJob:
+    """上传的文件先落盘，再在后台线程中导入；完成后删除临时文件"""
+    _jobs = {}
+    _lock = threading.Lock()
+    max_jobs = 100
+
+    def __init__(self, path, fmt, batch_size):
+        self.id = uuid.uuid4().hex
+        self.path = path
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.state = 'pending'
+        self.message = ''
+        self.started_at = None
+        self.finished_at = None
+        self.counters = {}
+
+    @classmethod
+    def start(cls, engine, path, fmt, batch_size, on_batch=None):
+        job = cls(path, fmt, batch_size)
+        with cls._lock:
+            if len(cls._jobs) >= cls.max_jobs:
+                # 只保留最近的任务记录
+                finished = [j for j in cls._jobs.values() if j.state in ('done', 'failed')]
+                for old in sorted(finished, key=lambda j: j.finished_at)[:len(cls._jobs) - cls.max_jobs + 1]:
+                    del cls._jobs[old.id]
+            cls._jobs[job.id] = job
+        threading.Thread(target=job._run, args=(engine, on_batch), name=f'import-{job.id[:8]}', daemon=True).start()
+        return job
+
+    @classmethod
+    def get(cls, job_id):
+        with cls._lock:
+            return cls._jobs.get(job_id)
+
+    def _run(self, engine, on_batch):
+        self.state = 'running'
+        self.started_at = time.time()
+        try:
+            with open(self.path, 'rb') as f:
+                import_products(engine, iter_records(f, self.fmt), self.batch_size, on_batch, self.counters)
+            self.state = 'done'
+        except Exception as e:
+            self.state = 'failed'
+            self.message = str(e)
+        finally:
+            self.finished_at = time.time()
+            os.remove(self.path)
+
+    def progress(self):
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        counters = dict(self.counters)
+        return {
+            'job_id': self.id,
+            'state': self.state,
+            'message': self.message,
+            'processed': counters.get('processed', 0),
+            'written': counters.get('written', 0),
+            'failed': counters.get('failed', 0),
+            'batches': counters.get('batches', 0),
+            'errors': list(counters.get('errors', []))[:20],
+            'elapsed': round(elapsed, 3),
+            'rows_per_sec': round(counters.get('processed', 0) / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+# ===================== 导出 =====================
+def export_rows(engine, batch_size=1000):
+    """按 id 分批读取全部商品，每批使用独立的短连接"""
+    last_id = 0
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(select(product_table).where(product_table.c.id > last_id)
+                                .order_by(product_table.c.id).limit(batch_size)).all()
+        if not rows:
+            return
+        for row in rows:
+            yield row._asdict()
+        last_id = rows[-1].id
+
+
+def export_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('action', choices=['import', 'export'])
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=['csv', 'jsonl'])
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    from app import create_app, db
+
+    fmt = args.format or detect_format(args.path)
+    with create_app().app_context():
+        if args.action == 'import':
+            counters = {}
+            stop = threading.Event()
+
+            def report():
+                while not stop.wait(1.0):
+                    print(f'已处理 {counters.get("processed", 0)} 行，写入 {counters.get("written", 0)}，'
+                          f'失败 {counters.get("failed", 0)}', file=sys.stderr)
+            threading.Thread(target=report, daemon=True).start()
+            started = time.perf_counter()
+            with open(args.path, 'rb') as f:
+                import_products(db.engine, iter_records(f, fmt), args.batch_size, progress=counters)
+            stop.set()
+            elapsed = time.perf_counter() - started
+            print(f'完成：处理 {counters["processed"]} 行，写入 {counters["written"]}，失败 {counters["failed"]}，'
+                  f'{elapsed:.1f}s（{counters["processed"] / elapsed if elapsed else 0:.0f} 行/秒）')
+            for error in counters['errors']:
+                print(f'  {error}')
+        else:
+            writer = export_csv if fmt == 'csv' else export_jsonl
+            with open(args.path, 'w', encoding='utf-8', newline='') as f:
+                for chunk in writer(export_rows(db.engine, args.batch_size)):
+                    f.write(chunk)
+            print(f'已导出到 {args.path}')
@@ -0,0 +1,130 @@
+"""
+分类树：从 category 表一次性构建，常驻内存，分类有写入时重建
+
+- descendants(id) 返回该分类及其全部后代分类的 ID（内存中的闭包表），
+  商品按父分类筛选时展开为 category_id IN (...)，走 (is_sale, category_id) 索引；
+- tree() 返回嵌套结构，只含 is_show=1 的分类（隐藏分类的子分类一并隐藏）；
+- parent_id 指向不存在的分类（或 0）的分类为顶级分类；形成环的分类从环中任取一个作为顶级分类。
+
+每次重建生成新的快照并整体替换引用，读取不加锁。invalidate() 只影响本进程，
+多进程部署时其他进程的分类树最多延迟 ttl 秒更新。
+"""
+import threading
+import time
+
+
+class _Snapshot:
+    __slots__ = ('generation', 'loaded_at', 'descendants', 'tree', 'size')
+
+    def __init__(self, rows, generation, loaded_at):
+        """rows 为 [(id, name, icon, parent_id, is_show)]"""
+        self.generation = generation
+        self.loaded_at = loaded_at
+        nodes = {row[0]: row for row in rows}
+        children = {}
+        for cid, _, _, parent_id, _ in sorted(rows):
+            if parent_id in nodes and parent_id != cid:
+                children.setdefault(parent_id, []).append(cid)
+
+        roots = [cid for cid in sorted(nodes) if nodes[cid][3] not in nodes or nodes[cid][3] == cid]
+        # 从顶级分类出发遍历，只保留实际走过的边（环上的回边被丢弃）
+        tree_children = {}
+        order = []  # 先序遍历顺序，逆序即为"子分类先于父分类"
+        visited = set()
+
+        def walk(root):
+            visited.add(root)
+            stack = [root]
+            while stack:
+                cid = stack.pop()
+                order.append(cid)
+                for child in reversed(children.get(cid, [])):
+                    if child not in visited:
+                        visited.add(child)
+                        tree_children.setdefault(cid, []).insert(0, child)
+                        stack.append(child)
+
+        for root in roots:
+            walk(root)
+        # 剩下的分类都在环上：断开环，把未访问的分类作为顶级分类
+        for cid in sorted(nodes):
+            if cid not in visited:
+                roots.append(cid)
+                walk(cid)
+
+        descendants = {}
+        for cid in reversed(order):
+            ids = [cid]
+            for child in tree_children.get(cid, []):
+                ids.extend(descendants[child])
+            descendants[cid] = tuple(ids)
+        self.descendants = descendants
+        self.size = len(nodes)
+
+        def build(cid):
+            _, name, icon, parent_id, _ = nodes[cid]
+            return {
+                'id': cid,
+                'name': name,
+                'icon': icon,
+                'parent_id': parent_id,
+                'children': [build(child) for child in tree_children.get(cid, []) if nodes[child][4] == 1]
+            }
+        self.tree = [build(cid) for cid in roots if nodes[cid][4] == 1]
+
+
+class CategoryTree:
+    """loader() 返回 [(id, name, icon, parent_id, is_show)]，在需要重建时于调用方的上下文中执行"""
+
+    def __init__(self, loader, ttl=60, clock=time.monotonic):
+        self.loader = loader
+        self.ttl = ttl
+        self.clock = clock
+        self.rebuilds = 0
+        self._generation = 0
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._generation += 1
+
+    def _current(self):
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.generation == self._generation \
+                and self.clock() - snapshot.loaded_at < self.ttl:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.generation != self._generation \
+                    or self.clock() - snapshot.loaded_at >= self.ttl:
+                # 先记下版本号再读取，读取期间发生的写入会让这次结果立即过期
+                generation = self._generation
+                snapshot = _Snapshot(self.loader(), generation, self.clock())
+                self._snapshot = snapshot
+                self.rebuilds += 1
+        return snapshot
+
+    def descendants(self, category_id):
+        """该分类及全部后代分类的 ID；未知分类只返回其自身"""
+        return self._current().descendants.get(category_id, (category_id,))
+
+    def tree(self):
+        return self._current().tree
+
+    def rollup(self, counts):
+        """把按分类 ID 的计数 {分类ID: 数量} 汇总为各分类（含全部后代分类）的计数，只返回非零项"""
+        totals = {}
+        for cid, ids in self._current().descendants.items():
+            total = sum(counts.get(i, 0) for i in ids)
+            if total:
+                totals[cid] = total
+        return totals
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            'categories': snapshot.size if snapshot else 0,
+            'rebuilds': self.rebuilds,
+            'age_seconds': round(self.clock() - snapshot.loaded_at, 3) if snapshot else None,
+            'ttl': self.ttl,
+        }
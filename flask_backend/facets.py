@@ -0,0 +1,220 @@
+"""
+商品筛选的分面计数：当前筛选条件下各分类、各价格区间的在售商品数
+
+FacetIndex 常驻内存，为每个分类保存在售商品价格的有序数组（array('d')），
+另按商品 ID 记录每个商品当前所在的分类与价格（用于增量更新时找到旧值）：
+- counts() 对每个分类做两次二分即可得到价格范围内的商品数，价格区间计数同理，
+  与商品总数无关，不需要每次请求执行聚合查询；count() 同样得到筛选结果的总数（近似值，见下文的延迟）；
+- 商品有写入时 mark_changed(ids) 只登记 ID，下次读取时按主键重新读取这些商品并调整有序数组；
+- 计数的口径：分类计数受价格范围限制、不受分类条件限制，价格区间计数受分类条件限制、不受价格范围限制，
+  这样前端可以显示切换到其他分类 / 价格区间后的商品数。
+
+价格区间由递增的分界点 edges 划分为 len(edges) + 1 个：(-, e0)、[e0, e1)、…、[eN, -)。
+价格范围 min_price <= price < max_price（不含上限），与区间划分一致。
+
+首次读取时同步构建；之后超过 ttl 秒或 mark_changed(None)（批量导入等）时在后台线程中整体重建，
+重建期间继续使用旧数据。mark_changed() 只收到本进程的写入，多进程部署时其他进程最多延迟 ttl 秒。
+100 万商品约占 20MB 内存（商品 ID 连续时）。
+"""
+import array
+import bisect
+import contextlib
+import threading
+import time
+
+_ABSENT = -(1 << 31)  # 商品不在索引中（已下架或不存在）
+_LOAD_CHUNK = 500  # 增量更新时每次按主键读取的商品数
+
+
+class _State:
+    __slots__ = ('prices', 'category', 'price', 'sparse', 'size', 'loaded_at')
+
+    def __init__(self, rows, loaded_at):
+        """rows 为 [(id, category_id, price)]，不要求按 ID 排序"""
+        # 按最大商品 ID 一次分配
+        capacity = min(max((row[0] for row in rows), default=-1) + 1, len(rows) * 2 + 1024)
+        self.category = array.array('i', [_ABSENT]) * capacity  # 下标为商品ID
+        self.price = array.array('d', [0.0]) * capacity
+        self.sparse = {}  # ID 远大于现有规模的商品：{商品ID: (分类ID, 价格)}
+        self.size = 0
+        self.loaded_at = loaded_at
+        buckets = {}
+        for product_id, category_id, price in rows:
+            price = float(price or 0.0)
+            self.set(product_id, (category_id, price))
+            buckets.setdefault(category_id, []).append(price)
+            self.size += 1
+        self.prices = {cid: array.array('d', sorted(prices)) for cid, prices in buckets.items()}  # 分类ID -> 有序价格
+
+    def get(self, product_id):
+        if 0 <= product_id < len(self.category):
+            category_id = self.category[product_id]
+            return None if category_id == _ABSENT else (category_id, self.price[product_id])
+        return self.sparse.get(product_id)
+
+    def set(self, product_id, value):
+        capacity = len(self.category)
+        if capacity <= product_id < capacity * 2 + 1024:
+            grow = max(product_id + 1, capacity * 2) - capacity
+            self.category.extend(array.array('i', [_ABSENT]) * grow)
+            self.price.extend(array.array('d', [0.0]) * grow)
+            capacity += grow
+        if 0 <= product_id < capacity:
+            self.category[product_id] = _ABSENT if value is None else value[0]
+            self.price[product_id] = 0.0 if value is None else value[1]
+        elif value is None:
+            self.sparse.pop(product_id, None)
+        else:
+            self.sparse[product_id] = value
+
+    def move(self, product_id, new):
+        """商品的 (分类, 价格) 变为 new（None 表示下架或删除），返回是否有变化"""
+        old = self.get(product_id)
+        if old == new:
+            return False
+        if old is not None:
+            prices = self.prices[old[0]]
+            del prices[bisect.bisect_left(prices, old[1])]
+            self.size -= 1
+        if new is not None:
+            prices = self.prices.setdefault(new[0], array.array('d'))
+            prices.insert(bisect.bisect_right(prices, new[1]), new[1])
+            self.size += 1
+        self.set(product_id, new)
+        return True
+
+    def memory(self):
+        return sum(len(a) * a.itemsize for a in (self.category, self.price, *self.prices.values()))
+
+
+def _range_count(prices, min_price, max_price):
+    lo = 0 if min_price is None else bisect.bisect_left(prices, min_price)
+    hi = len(prices) if max_price is None else bisect.bisect_left(prices, max_price)
+    return max(hi - lo, 0)
+
+
+class FacetIndex:
+    """
+    loader(ids) 返回 ids 中在售商品的 [(id, category_id, price)]，ids 为 None 时返回全部在售商品；
+    context() 为后台重建线程执行 loader 时进入的上下文（如 app.app_context）
+    """
+
+    def __init__(self, loader, edges, ttl=600, context=contextlib.nullcontext, clock=time.monotonic):
+        self.loader = loader
+        self.edges = tuple(edges)
+        self.ttl = ttl
+        self.context = context
+        self.clock = clock
+        self.rebuilds = 0
+        self.updates = 0
+        self._state = None
+        self._lock = threading.Lock()
+        # 登记变更只需要这把锁，不会被读取与增量更新阻塞
+        self._pending_lock = threading.Lock()
+        self._pending = set()
+        self._stale = False
+        self._rebuilding = False
+
+    def mark_changed(self, ids):
+        with self._pending_lock:
+            if ids is None:
+                self._stale = True
+            else:
+                self._pending.update(ids)
+
+    # ----- 构建与增量更新 -----
+    def _load_state(self):
+        """整体读取。先清空已登记的变更：它们已提交，会包含在这次读取的结果中"""
+        with self._pending_lock:
+            self._pending = set()
+            self._stale = False
+        state = _State(self.loader(None), self.clock())
+        self.rebuilds += 1
+        return state
+
+    def _rebuild_in_background(self):
+        try:
+            with self.context():
+                state = self._load_state()
+            with self._lock:
+                self._state = state
+        finally:
+            self._rebuilding = False
+
+    def _apply(self, state, ids):
+        ids = sorted(ids)
+        current = {}
+        for start in range(0, len(ids), _LOAD_CHUNK):
+            for product_id, category_id, price in self.loader(ids[start:start + _LOAD_CHUNK]):
+                current[product_id] = (category_id, float(price or 0.0))
+        for product_id in ids:
+            if state.move(product_id, current.get(product_id)):
+                self.updates += 1
+
+    def _current(self):
+        """调用方持有 self._lock"""
+        if self._state is None:
+            self._state = self._load_state()
+            return self._state
+        if not self._rebuilding:
+            with self._pending_lock:
+                expired = self._stale or self.clock() - self._state.loaded_at >= self.ttl
+                pending, self._pending = self._pending, set()
+            if expired:
+                # 后台重建期间登记的变更留在 _pending 中，换上新数据后再处理（重复处理同一商品是幂等的）
+                self._rebuilding = True
+                threading.Thread(target=self._rebuild_in_background, name='facet-index-rebuild',
+                                 daemon=True).start()
+            if pending:
+                self._apply(self._state, pending)
+        return self._state
+
+    # ----- 查询 -----
+    def counts(self, category_ids=None, min_price=None, max_price=None):
+        """
+        返回 ({分类ID: 价格范围内的商品数}, [各价格区间的商品数])；
+        category_ids 为 None 表示不限分类，分类计数未汇总到父分类
+        """
+        with self._lock:
+            state = self._current()
+            by_category = {}
+            for category_id, prices in state.prices.items():
+                count = _range_count(prices, min_price, max_price)
+                if count:
+                    by_category[category_id] = count
+
+            buckets = [0] * (len(self.edges) + 1)
+            for category_id in (state.prices if category_ids is None else category_ids):
+                prices = state.prices.get(category_id)
+                if not prices:
+                    continue
+                positions = [0] + [bisect.bisect_left(prices, edge) for edge in self.edges] + [len(prices)]
+                for i in range(len(buckets)):
+                    buckets[i] += positions[i + 1] - positions[i]
+            return by_category, buckets
+
+    def count(self, category_ids=None, min_price=None, max_price=None):
+        """同时满足分类与价格范围的在售商品数"""
+        with self._lock:
+            state = self._current()
+            selected = state.prices.keys() if category_ids is None else category_ids
+            return sum(_range_count(state.prices[cid], min_price, max_price)
+                       for cid in selected if cid in state.prices)
+
+    def ranges(self):
+        """各价格区间的 (下限, 上限)，不设限的一端为 None"""
+        return list(zip((None,) + self.edges, self.edges + (None,)))
+
+    def stats(self):
+        state = self._state
+        return {
+            'products': state.size if state else 0,
+            'categories': len(state.prices) if state else 0,
+            'memory_bytes': state.memory() if state else 0,
+            'rebuilds': self.rebuilds,
+            'updates': self.updates,
+            'pending': len(self._pending),
+            'rebuilding': self._rebuilding,
+            'age_seconds': round(self.clock() - state.loaded_at, 3) if state else None,
+            'ttl': self.ttl,
+        }
@@ -0,0 +1,49 @@
+"""
+可替换的 JSON 编码器（Flask JSON provider）
+
+jsonify() 与 cached_json() 的序列化都经过 app.json。这里的 FastJSONProvider：
+- 非 debug 模式（紧凑输出）下用 orjson 直接生成 UTF-8 字节，未安装 orjson 时回退到标准库 json；
+- debug 模式（缩进输出）沿用 Flask 默认实现；
+- 两种编码器输出逐字节一致：UTF-8 不转义中文（ensure_ascii=False），保持字典插入顺序（sort_keys=False），
+  分隔符为 ',' ':'，末尾换行；datetime、Decimal 等类型统一交给 Flask 的 default 处理。
+  仅 NaN/Infinity 与超大/超小浮点数的指数写法两者不同，接口不会输出这类值。
+
+YOUGOU_JSON_ENCODER=orjson / stdlib 可强制指定编码器，默认自动选择。
+"""
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    ensure_ascii = False
+    sort_keys = False
+
+    def __init__(self, app, backend=''):
+        super().__init__(app)
+        if not backend:
+            backend = 'orjson' if orjson is not None else 'stdlib'
+        if backend == 'orjson' and orjson is None:
+            raise RuntimeError('JSON 编码器指定为 orjson，但未安装 orjson')
+        if backend not in ('orjson', 'stdlib'):
+            raise RuntimeError(f'未知的 JSON 编码器：{backend}')
+        self.backend = backend
+
+    def dumps_compact(self, obj):
+        """紧凑格式的 UTF-8 JSON 字节"""
+        if self.backend == 'orjson':
+            return orjson.dumps(obj, default=self.default,
+                                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+        return json.dumps(obj, default=self.default, ensure_ascii=False, sort_keys=False,
+                          separators=(',', ':')).encode('utf-8')
+
+    def response(self, *args, **kwargs):
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_compact(obj) + b'\n', mimetype=self.mimetype)
@@ -0,0 +1,263 @@
+"""
+图片变体：按宽度与格式即时生成缩放后的 WebP / AVIF / JPEG，结果缓存在磁盘上
+
+- 源图由调用方给出（文件路径 + 内容哈希），这里不解析 URL；
+- 宽度向上取整到 widths 中的档位（超过最大档位按最大档位），不放大原图；
+  格式可指定，也可按 Accept 在已安装编码器支持的格式中选择（avif > webp > jpeg）；
+- 变体文件名由源图内容哈希 + 宽度 + 格式 + 质量得出，源图修改后自然换成新文件，旧文件随淘汰删除；
+- 编码在独立的有界线程池中执行（Pillow 的解码、缩放、编码期间释放 GIL），
+  正在执行 + 排队的任务超过上限时立即抛出 ImageBusy（接口返回 503）；
+- 同一变体的并发请求合并为一次编码，其余请求等待同一结果；
+- 磁盘缓存总大小超过 max_bytes 时按最近使用顺序淘汰。多进程可以共用同一目录：写入先写临时文件再原子改名，
+  各进程按自己的访问顺序淘汰，淘汰前若距上次扫描超过 rescan_interval 秒先重新扫描目录，计入其他进程写入的文件。
+
+Pillow 是可选依赖，首次需要编码时才导入；未安装时 available() 为假，由调用方返回原图。
+"""
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+MIMETYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+QUALITY = {'avif': 55, 'webp': 80, 'jpeg': 82}
+# 可作为源图的类型（SVG 等矢量图不缩放）
+SOURCE_TYPES = ('image/png', 'image/jpeg', 'image/webp', 'image/gif', 'image/bmp')
+
+_pillow = None
+_pillow_lock = threading.Lock()
+
+
+class ImageBusy(Exception):
+    """编码线程池排队已满"""
+
+
+class ImageError(Exception):
+    """源图无法解码或编码失败"""
+
+
+def _load_pillow():
+    """导入 Pillow，返回 (Image 模块, 支持的输出格式)；未安装时返回 (None, ())"""
+    global _pillow
+    if _pillow is None:
+        with _pillow_lock:
+            if _pillow is None:
+                try:
+                    from PIL import Image, features
+                except ImportError:  # 可选依赖
+                    _pillow = (None, ())
+                else:
+                    formats = ['jpeg']
+                    for name in ('webp', 'avif'):
+                        try:
+                            if features.check(name):
+                                formats.append(name)
+                        except ValueError:  # 旧版本 Pillow 不认识该特性名
+                            pass
+                    _pillow = (Image, tuple(formats))
+    return _pillow
+
+
+def _encode(source, target, width, fmt):
+    """把 source 缩放到不超过 width 的宽度，按 fmt 编码写入 target，返回文件大小"""
+    Image, _ = _load_pillow()
+    if Image is None:
+        raise ImageError('未安装 Pillow')
+    try:
+        with Image.open(source) as image:
+            # draft() 让 JPEG 在解码时直接按 1/2、1/4、1/8 缩小；thumbnail() 只缩小、保持比例
+            image.draft('RGB', (width, image.height * width // max(image.width, 1)))
+            image.thumbnail((width, image.height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            if fmt == 'jpeg':
+                if image.mode in ('RGBA', 'LA', 'P'):
+                    # JPEG 没有透明通道，铺在白底上
+                    rgba = image.convert('RGBA')
+                    image = Image.new('RGB', rgba.size, (255, 255, 255))
+                    image.paste(rgba, mask=rgba.getchannel('A'))
+                elif image.mode != 'RGB':
+                    image = image.convert('RGB')
+                options = {'quality': QUALITY[fmt], 'optimize': True, 'progressive': True}
+            else:
+                if image.mode not in ('RGB', 'RGBA'):
+                    image = image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+                options = {'quality': QUALITY[fmt]}
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    image.save(f, format=fmt.upper(), **options)
+                os.replace(tmp, target)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise ImageError(f'图片处理失败：{e}')
+    return os.path.getsize(target)
+
+
+class ImageVariants:
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024, widths=(160, 320, 480, 640, 960, 1280, 1920),
+                 workers=2, max_queue=16, rescan_interval=60):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.widths = tuple(sorted(widths))
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rescan_interval = rescan_interval
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image')
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._inflight = {}  # 变体文件名 -> 正在编码的 Future
+        self._files = None  # 变体文件名 -> 大小，按最近使用排序（最久未用的在前）
+        self._total = 0
+        self._scanned_at = 0.0
+        self.hits = 0
+        self.encodes = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.failures = 0
+        self.evictions = 0
+        self.encode_seconds = 0.0
+
+    # ----- 参数 -----
+    def available(self):
+        return _load_pillow()[0] is not None
+
+    def formats(self):
+        return _load_pillow()[1]
+
+    def snap_width(self, width):
+        for step in self.widths:
+            if step >= width:
+                return step
+        return self.widths[-1]
+
+    def choose_format(self, requested, accept_mimetypes):
+        """requested 为 'auto' 或格式名；未安装对应编码器的格式按 auto 处理，未知格式抛出 ValueError"""
+        if requested not in ('auto', *MIMETYPES):
+            raise ValueError('不支持的图片格式')
+        formats = self.formats()
+        if requested in formats:
+            return requested
+        # 只认明确列出的类型：*/* 不代表客户端能解码 avif / webp
+        accepted = {value for value, quality in accept_mimetypes if quality > 0}
+        for fmt in ('avif', 'webp'):
+            if fmt in formats and MIMETYPES[fmt] in accepted:
+                return fmt
+        return 'jpeg'
+
+    # ----- 变体 -----
+    def get(self, source, digest, width, fmt):
+        """
+        返回 (变体文件路径, 变体名)；source 为源图路径，digest 为源图内容哈希，width 已按档位取整。
+        变体不存在时编码（同一变体只编码一次），失败时抛出 ImageError / ImageBusy
+        """
+        name = f'{digest[:20]}-w{width}-q{QUALITY[fmt]}.{fmt}'
+        path = os.path.join(self.cache_dir, name[:2], name)
+        try:
+            size = os.stat(path).st_size
+        except FileNotFoundError:
+            size = None
+        with self._lock:
+            if self._files is None:
+                self._scan()
+            if size is not None:
+                # 可能是其他进程写入的文件，一并计入
+                if name not in self._files:
+                    self._add(name, size)
+                self._files.move_to_end(name)
+                self.hits += 1
+                return path, name
+            future = self._inflight.get(name)
+            if future is not None:
+                self.coalesced += 1
+            else:
+                future = self._submit(name, source, path, width, fmt)
+        future.result()
+        return path, name
+
+    def _submit(self, name, source, path, width, fmt):
+        """调用方持有 self._lock"""
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise ImageBusy('服务繁忙，请稍后重试')
+
+        def task():
+            started = time.perf_counter()
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                size = _encode(source, path, width, fmt)
+            except Exception:
+                with self._lock:
+                    self.failures += 1
+                raise
+            finally:
+                with self._lock:
+                    self._inflight.pop(name, None)
+                self._slots.release()
+            with self._lock:
+                self.encodes += 1
+                self.encode_seconds += time.perf_counter() - started
+                self._add(name, size)
+            return size
+
+        future = self._executor.submit(task)
+        self._inflight[name] = future
+        return future
+
+    # ----- 磁盘缓存 -----
+    def _scan(self):
+        """按文件修改时间重建访问顺序与总大小（调用方持有 self._lock）"""
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for sub in os.scandir(self.cache_dir):
+                if not sub.is_dir():
+                    continue
+                for entry in os.scandir(sub.path):
+                    if entry.is_file() and not entry.name.endswith('.tmp'):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, entry.name, stat.st_size))
+        entries.sort()
+        known = self._files or {}
+        # 本进程已知的文件保留原有的访问顺序，其余按修改时间排在前面
+        self._files = OrderedDict((name, size) for _, name, size in entries if name not in known)
+        for name, size in known.items():
+            if os.path.exists(os.path.join(self.cache_dir, name[:2], name)):
+                self._files[name] = size
+        self._total = sum(self._files.values())
+        self._scanned_at = time.monotonic()
+
+    def _add(self, name, size):
+        """调用方持有 self._lock"""
+        self._total += size - self._files.pop(name, 0)
+        self._files[name] = size
+        if self._total > self.max_bytes and time.monotonic() - self._scanned_at > self.rescan_interval:
+            self._scan()
+        while self._total > self.max_bytes and len(self._files) > 1:
+            victim, victim_size = self._files.popitem(last=False)
+            self._total -= victim_size
+            self.evictions += 1
+            try:
+                os.unlink(os.path.join(self.cache_dir, victim[:2], victim))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'available': self.available(),
+                'formats': list(self.formats()),
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'encoding': len(self._inflight),
+                'files': len(self._files or ()),
+                'bytes': self._total,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'encodes': self.encodes,
+                'coalesced': self.coalesced,
+                'rejected': self.rejected,
+                'failures': self.failures,
+                'evictions': self.evictions,
+                'encode_seconds': round(self.encode_seconds, 6),
+            }
@@ -0,0 +1,42 @@
+"""
+服务端组件拼装：展开页面 HTML 中的 include 标记
+
+    <header id="header-container"><!--#include virtual="/components/layout/header.html" --></header>
+
+标记被替换为组件文件内容（支持嵌套，最多 MAX_DEPTH 层）；被引用的文件路径记入 deps，
+资源表据此在组件修改后重建页面。未经后端拼装时（例如直接静态托管）标记只是注释，
+前端 loadComponent 仍会按原方式请求组件，作为兜底。
+"""
+import os
+import re
+
+INCLUDE_RE = re.compile(r'<!--#include\s+virtual="([^"]+)"\s*-->')
+MAX_DEPTH = 5
+
+
+class IncludeExpander:
+    def __init__(self, root):
+        self.root = os.path.realpath(root)
+
+    def _resolve(self, virtual):
+        path = os.path.realpath(os.path.join(self.root, virtual.lstrip('/')))
+        if not path.startswith(self.root + os.sep) or not os.path.isfile(path):
+            return None
+        return path
+
+    def expand(self, rel, text, deps, depth=0):
+        """展开 text 中的 include 标记，无法解析的标记原样保留"""
+        if depth >= MAX_DEPTH or '<!--#include' not in text:
+            return text
+
+        def replace(match):
+            path = self._resolve(match.group(1))
+            if path is None:
+                return match.group(0)
+            deps.append(path)
+            with open(path, 'r', encoding='utf-8') as f:
+                return self.expand(rel, f.read(), deps, depth + 1)
+
+        return INCLUDE_RE.sub(replace, text)
+
+    __call__ = expand
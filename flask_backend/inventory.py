@@ -0,0 +1,186 @@
+"""
+库存扣减与预留
+
+- deduct_stock()：一条带条件的 UPDATE（stock >= 购买数量）批量扣减一个订单的全部商品，
+  受影响行数不等于商品数即视为超卖，由调用方回滚整个事务；不做先读后写，不会超卖。
+- HotStockReserver：热门商品（秒杀）在内存计数器上预留库存，不争抢数据库写锁，
+  扣减量由后台线程按批次刷回数据库。计数器只在本进程内有效，
+  多进程部署时热门商品必须固定由单个进程处理，否则请不要配置热门商品。
+- restore_stock()：订单超时取消时归还库存。
+- add_sales()：订单支付时累加商品销量（商品列表按销量排序）。
+"""
+import threading
+
+from sqlalchemy import table, column, case, bindparam, select
+
+product_table = table('product', column('id'), column('stock'), column('sales'))
+
+
+class OutOfStock(Exception):
+    def __init__(self, product_ids):
+        self.product_ids = list(product_ids)
+        super().__init__('商品库存不足')
+
+
+def deduct_stock(conn, quantities):
+    """
+    quantities 为 {商品ID: 数量}。所有商品库存都足够时才全部扣减；
+    否则抛出 OutOfStock，此时部分行可能已更新，调用方必须回滚事务。
+    """
+    if not quantities:
+        return
+    qty = case(quantities, value=product_table.c.id)
+    stmt = product_table.update() \
+        .where(product_table.c.id.in_(list(quantities)), product_table.c.stock >= qty) \
+        .values(stock=product_table.c.stock - qty)
+    result = conn.execute(stmt)
+    if result.rowcount != len(quantities):
+        raise OutOfStock(quantities)
+
+
+def restore_stock(conn, quantities):
+    """归还库存（executemany）"""
+    if not quantities:
+        return
+    stmt = product_table.update() \
+        .where(product_table.c.id == bindparam('pid')) \
+        .values(stock=product_table.c.stock + bindparam('qty'))
+    conn.execute(stmt, [{'pid': pid, 'qty': q} for pid, q in quantities.items()])
+
+
+def add_sales(conn, quantities):
+    """累加销量（executemany）"""
+    if not quantities:
+        return
+    stmt = product_table.update() \
+        .where(product_table.c.id == bindparam('pid')) \
+        .values(sales=product_table.c.sales + bindparam('qty'))
+    conn.execute(stmt, [{'pid': pid, 'qty': q} for pid, q in quantities.items()])
+
+
+class HotStockReserver:
+    """
+    热门商品的内存库存计数器。首次访问某商品时从数据库读取库存，之后的预留/归还只改内存，
+    累计的变化量每隔 flush_interval 秒（或积压超过 flush_batch 次变更时）批量写回数据库。
+    on_flush(ids) 在写回后回调，用于失效商品详情缓存等。
+    """
+
+    def __init__(self, product_ids=(), flush_interval=0.2, flush_batch=200, on_flush=None):
+        self.product_ids = set(product_ids)
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.on_flush = on_flush
+        self._engine = None
+        self._available = {}
+        self._pending = {}
+        self._pending_ops = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.reserved = 0
+        self.rejected = 0
+        self.flushes = 0
+
+    def is_hot(self, product_id):
+        return product_id in self.product_ids
+
+    def start(self, engine):
+        if not self.product_ids or self._thread is not None:
+            return
+        self._engine = engine
+        self._thread = threading.Thread(target=self._run, name='hot-stock-flusher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _load(self, product_ids):
+        missing = [pid for pid in product_ids if pid not in self._available]
+        if not missing:
+            return
+        with self._engine.connect() as conn:
+            rows = conn.execute(select(product_table.c.id, product_table.c.stock)
+                                .where(product_table.c.id.in_(missing))).all()
+        for pid, stock in rows:
+            # 尚未写回的变化量（如先于加载发生的归还）需要计入
+            self._available.setdefault(pid, (stock or 0) - self._pending.get(pid, 0))
+
+    def reserve(self, quantities):
+        """全部预留成功或抛出 OutOfStock（不做任何预留）"""
+        if not quantities:
+            return
+        with self._lock:
+            self._load(quantities)
+            short = [pid for pid, q in quantities.items() if self._available.get(pid, 0) < q]
+            if short:
+                self.rejected += 1
+                raise OutOfStock(short)
+            for pid, q in quantities.items():
+                self._available[pid] -= q
+                self._pending[pid] = self._pending.get(pid, 0) + q
+            self._pending_ops += 1
+            self.reserved += 1
+            if self._pending_ops >= self.flush_batch:
+                self._wakeup.set()
+
+    def release(self, quantities):
+        if not quantities:
+            return
+        with self._lock:
+            for pid, q in quantities.items():
+                if pid in self._available:
+                    self._available[pid] += q
+                self._pending[pid] = self._pending.get(pid, 0) - q
+            self._pending_ops += 1
+
+    def available(self, product_id):
+        with self._lock:
+            return self._available.get(product_id)
+
+    def flush(self):
+        """把累计的扣减量写回数据库"""
+        with self._lock:
+            pending = {pid: delta for pid, delta in self._pending.items() if delta}
+            self._pending = {}
+            self._pending_ops = 0
+        if not pending or self._engine is None:
+            return
+        stmt = product_table.update() \
+            .where(product_table.c.id == bindparam('pid')) \
+            .values(stock=product_table.c.stock - bindparam('delta'))
+        try:
+            with self._engine.begin() as conn:
+                conn.execute(stmt, [{'pid': pid, 'delta': delta} for pid, delta in pending.items()])
+        except Exception:
+            # 写回失败时把变化量放回，下一轮重试
+            with self._lock:
+                for pid, delta in pending.items():
+                    self._pending[pid] = self._pending.get(pid, 0) + delta
+            return
+        self.flushes += 1
+        if self.on_flush is not None:
+            self.on_flush(list(pending))
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hot_products': sorted(self.product_ids),
+                'available': dict(self._available),
+                'pending': dict(self._pending),
+                'reserved': self.reserved,
+                'rejected': self.rejected,
+                'flushes': self.flushes,
+            }
+
@@ -0,0 +1,264 @@
+"""
+请求级监控：每个接口的耗时分布、SQL 条数与耗时、响应大小，Prometheus 文本格式输出
+
+- install(app, engine) 注册 before/after/teardown_request 钩子与 SQLAlchemy 游标事件；
+  每个请求在线程局部变量上压入一个计数帧，游标事件只做一次 perf_counter 与累加，
+  请求结束时在一把锁内更新直方图，开销为每请求数微秒；
+- /api/batch 的子请求各自压帧，SQL 同时计入子请求与外层请求；
+- phase(name) 用于统计请求内的其他耗时阶段（如 bcrypt）；
+- Server-Timing 响应头默认只有总耗时，SQL 条数与耗时、各阶段耗时只在 debug 模式或 detailed_timing=True 时写入
+  （这些数据会发给所有客户端）；
+- 耗时或 SQL 条数超过阈值的请求记一条 warning 日志（用于发现 N+1 查询）；
+- render() 输出 Prometheus 文本格式，add_collector() 可追加缓存、线程池等组件的统计。
+
+指标只在本进程内累计，多进程部署时由 Prometheus 分别抓取各进程或按实例汇总。
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class _Frame:
+    __slots__ = ('started', 'queries', 'sql_time', 'sql_started', 'phases')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.sql_started = 0.0
+        self.phases = None
+
+
+class Histogram:
+    """累计直方图：counts[i] 为落在 (buckets[i-1], buckets[i]] 的次数，最后一格为 +Inf"""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+
+class _EndpointStats:
+    __slots__ = ('latency', 'queries', 'sql_seconds', 'response_bytes', 'statuses')
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.sql_seconds = 0.0
+        self.response_bytes = 0
+        self.statuses = {}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+class RequestMetrics:
+    def __init__(self, slow_seconds=0.5, slow_queries=20, logger=None, exclude=('get_metrics',),
+                 detailed_timing=False):
+        self.slow_seconds = slow_seconds
+        self.detailed_timing = detailed_timing
+        self.slow_queries = slow_queries
+        self.logger = logger
+        self.exclude = set(exclude)
+        self.started_at = time.time()
+        self.slow_requests = 0
+        self._endpoints = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # ----- 安装 -----
+    def install(self, app, engine):
+        if self.logger is None:
+            self.logger = app.logger
+        # 插到最前面，耗时包含其他 before_request 钩子
+        app.before_request_funcs.setdefault(None, []).insert(0, self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(engine, 'handle_error', self._handle_error)
+
+    def add_collector(self, collector):
+        """collector() 返回 [(指标名, 类型, 说明, [(标签字典, 值), ...]), ...]"""
+        self._collectors.append(collector)
+
+    def _frames(self):
+        frames = getattr(self._local, 'frames', None)
+        if frames is None:
+            frames = self._local.frames = []
+        return frames
+
+    # ----- 请求钩子 -----
+    def _before_request(self):
+        self._frames().append(_Frame())
+
+    def _after_request(self, response):
+        frames = self._frames()
+        if not frames:
+            return response
+        frame = frames[-1]
+        elapsed = time.perf_counter() - frame.started
+        timings = []
+        if self.detailed_timing or current_app.debug:
+            timings.append(f'sql;dur={frame.sql_time * 1000:.1f};desc="{frame.queries} queries"')
+            for name, seconds in (frame.phases or {}).items():
+                timings.append(f'{name};dur={seconds * 1000:.1f}')
+        timings.append(f'total;dur={elapsed * 1000:.1f}')
+        response.headers['Server-Timing'] = ', '.join(timings)
+
+        endpoint = request.endpoint or 'unmatched'
+        if endpoint in self.exclude:
+            return response
+        size = response.content_length or 0
+        self._record(endpoint, request.method, response.status_code, elapsed, frame, size)
+        if elapsed >= self.slow_seconds or frame.queries >= self.slow_queries:
+            with self._lock:
+                self.slow_requests += 1
+            self.logger.warning('慢请求 %s %s %d %.1fms，SQL %d 条 %.1fms，响应 %d 字节%s',
+                                request.method, request.full_path.rstrip('?'), response.status_code,
+                                elapsed * 1000, frame.queries, frame.sql_time * 1000, size,
+                                ''.join(f'，{k} {v * 1000:.1f}ms' for k, v in (frame.phases or {}).items()))
+        return response
+
+    def _teardown_request(self, exc=None):
+        frames = self._frames()
+        if frames:
+            frames.pop()
+
+    def _record(self, endpoint, method, status, elapsed, frame, size):
+        key = (endpoint, method)
+        with self._lock:
+            stats = self._endpoints.get(key)
+            if stats is None:
+                stats = self._endpoints[key] = _EndpointStats()
+            stats.latency.observe(elapsed)
+            stats.queries.observe(frame.queries)
+            stats.sql_seconds += frame.sql_time
+            stats.response_bytes += size
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    # ----- SQL 事件 -----
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        frames = getattr(self._local, 'frames', None)
+        if frames:
+            frames[-1].sql_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        frames = getattr(self._local, 'frames', None)
+        if frames:
+            elapsed = time.perf_counter() - frames[-1].sql_started
+            for frame in frames:
+                frame.queries += 1
+                frame.sql_time += elapsed
+
+    def _handle_error(self, context):
+        # 出错的语句不会触发 after_cursor_execute，同样计入
+        frames = getattr(self._local, 'frames', None)
+        if frames and frames[-1].sql_started:
+            elapsed = time.perf_counter() - frames[-1].sql_started
+            for frame in frames:
+                frame.queries += 1
+                frame.sql_time += elapsed
+
+    # ----- 其他耗时阶段 -----
+    @contextmanager
+    def phase(self, name):
+        frames = getattr(self._local, 'frames', None)
+        if not frames:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            for frame in frames:
+                if frame.phases is None:
+                    frame.phases = {}
+                frame.phases[name] = frame.phases.get(name, 0.0) + elapsed
+
+    # ----- 输出 -----
+    def snapshot(self):
+        with self._lock:
+            return {key: (list(stats.latency.cumulative()), stats.latency.sum, stats.latency.count,
+                          list(stats.queries.cumulative()), stats.queries.sum,
+                          stats.sql_seconds, stats.response_bytes, dict(stats.statuses))
+                    for key, stats in self._endpoints.items()}, self.slow_requests
+
+    def render(self):
+        endpoints, slow_requests = self.snapshot()
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        def histogram(name, help_text, index):
+            header(name, 'histogram', help_text)
+            for (endpoint, method), data in sorted(endpoints.items()):
+                labels = {'endpoint': endpoint, 'method': method}
+                buckets, total, count = data[index], data[index + 1], data[2]
+                for bound, cumulative in buckets:
+                    lines.append(f'{name}_bucket{_labels({**labels, "le": _number(bound)})} {cumulative}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(total)}')
+                lines.append(f'{name}_count{_labels(labels)} {count}')
+
+        histogram('yougou_http_request_duration_seconds', '请求处理耗时', 0)
+        header('yougou_http_requests_total', 'counter', '请求数（按 HTTP 状态码）')
+        for (endpoint, method), data in sorted(endpoints.items()):
+            for status, count in sorted(data[7].items()):
+                lines.append(f'yougou_http_requests_total'
+                             f'{_labels({"endpoint": endpoint, "method": method, "status": status})} {count}')
+        histogram('yougou_http_request_sql_queries', '每个请求执行的 SQL 条数', 3)
+        for name, help_text, index in (('yougou_http_request_sql_seconds_total', 'SQL 执行总耗时', 5),
+                                       ('yougou_http_response_bytes_total', '响应体总字节数', 6)):
+            header(name, 'counter', help_text)
+            for (endpoint, method), data in sorted(endpoints.items()):
+                lines.append(f'{name}{_labels({"endpoint": endpoint, "method": method})} {_number(data[index])}')
+        header('yougou_http_slow_requests_total', 'counter', '超过耗时或 SQL 条数阈值的请求数')
+        lines.append(f'yougou_http_slow_requests_total {slow_requests}')
+        header('yougou_process_start_time_seconds', 'gauge', '进程启动时间')
+        lines.append(f'yougou_process_start_time_seconds {_number(self.started_at)}')
+
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                header(name, kind, help_text)
+                for labels, value in samples:
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
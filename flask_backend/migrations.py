@@ -0,0 +1,236 @@
+"""
+版本化的数据库迁移
+
+schema_version 表记录已执行的迁移版本；upgrade() 按版本号顺序执行尚未执行的迁移，
+每个迁移在独立事务中完成。迁移会先检查现状（列/索引是否已存在），
+因此对 create_all() 新建的库和旧版本的 yougou.db 都可以安全执行。
+
+新增迁移：在文件末尾用 @migration(版本号, 说明) 注册一个 fn(conn)，版本号递增，已发布的迁移不要修改。
+
+命令行（对现有数据库执行，不删除数据）：
+    python migrations.py            # 升级到最新版本
+    python migrations.py --status   # 查看当前版本与待执行的迁移
+"""
+import datetime
+import os
+
+from sqlalchemy import (MetaData, Table, Column, Integer, String, DateTime, Index,
+                        bindparam, inspect, select, text)
+
+import search
+
+MIGRATIONS = []
+
+version_table = Table(
+    'schema_version', MetaData(),
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+def migration(version, description):
+    def decorator(fn):
+        assert all(v != version for v, _, _ in MIGRATIONS), f'迁移版本重复：{version}'
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return decorator
+
+
+def applied_versions(conn):
+    version_table.create(conn, checkfirst=True)
+    return set(conn.execute(select(version_table.c.version)).scalars())
+
+
+def pending(engine):
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+    return [(v, d) for v, d, _ in MIGRATIONS if v not in done]
+
+
+def upgrade(engine):
+    """执行所有待执行的迁移，返回本次执行的版本号列表"""
+    applied = []
+    for version, description, fn in MIGRATIONS:
+        with engine.begin() as conn:
+            if version in applied_versions(conn):
+                continue
+            fn(conn)
+            conn.execute(version_table.insert().values(
+                version=version, description=description, applied_at=datetime.datetime.now()))
+        applied.append(version)
+    return applied
+
+
+# ===================== 迁移辅助 =====================
+def _quote(conn, name):
+    return conn.dialect.identifier_preparer.quote(name)
+
+
+def add_column(conn, table_name, column):
+    """列不存在时 ALTER TABLE ADD COLUMN"""
+    existing = {c['name'] for c in inspect(conn).get_columns(table_name)}
+    if column.name in existing:
+        return False
+    ddl = f'ALTER TABLE {_quote(conn, table_name)} ADD COLUMN {_quote(conn, column.name)} ' \
+          f'{column.type.compile(dialect=conn.dialect)}'
+    if column.server_default is not None:
+        ddl += f' DEFAULT {column.server_default.arg}'
+    if not column.nullable:
+        ddl += ' NOT NULL'
+    conn.execute(text(ddl))
+    return True
+
+
+def create_index(conn, table_name, name, columns, unique=False):
+    """索引不存在时创建（按索引名判断）；列名后加 ' DESC' 表示降序"""
+    existing = {ix['name'] for ix in inspect(conn).get_indexes(table_name)}
+    if name in existing:
+        return False
+    table = Table(table_name, MetaData(), autoload_with=conn)
+    expressions = [table.c[c[:-5]].desc() if c.endswith(' DESC') else table.c[c] for c in columns]
+    Index(name, *expressions, unique=unique).create(conn)
+    return True
+
+
+def drop_index(conn, table_name, name):
+    """索引存在时删除"""
+    existing = {ix['name'] for ix in inspect(conn).get_indexes(table_name)}
+    if name not in existing:
+        return False
+    table = Table(table_name, MetaData(), autoload_with=conn)
+    Index(name, _table=table).drop(conn)
+    return True
+
+
+# ===================== 迁移列表 =====================
+@migration(1, '补齐 user.token_version 与 order.expire_at 列')
+def _add_token_version_and_expire_at(conn):
+    add_column(conn, 'user', Column('token_version', Integer, nullable=False, server_default='0'))
+    add_column(conn, 'order', Column('expire_at', DateTime, nullable=True))
+
+
+@migration(2, '热点查询的二级索引与购物车 (user_id, product_id) 唯一约束')
+def _hot_query_indexes(conn):
+    # 建唯一索引前合并重复的购物车行：数量累加到 id 最小的一行，删除其余行
+    cart = _quote(conn, 'cart')
+    duplicates = conn.execute(text(
+        f'SELECT user_id, product_id, MIN(id), SUM(quantity) FROM {cart} '
+        f'GROUP BY user_id, product_id HAVING COUNT(*) > 1')).all()
+    for user_id, product_id, keep_id, quantity in duplicates:
+        conn.execute(text(f'UPDATE {cart} SET quantity = :q WHERE id = :id'), {'q': quantity, 'id': keep_id})
+        conn.execute(text(f'DELETE FROM {cart} WHERE user_id = :u AND product_id = :p AND id != :id'),
+                     {'u': user_id, 'p': product_id, 'id': keep_id})
+
+    create_index(conn, 'cart', 'uq_cart_user_product', ['user_id', 'product_id'], unique=True)
+    create_index(conn, 'order', 'ix_order_user_id', ['user_id'])
+    create_index(conn, 'order', 'ix_order_status_expire_at', ['status', 'expire_at'])
+    create_index(conn, 'order_item', 'ix_order_item_order_id', ['order_id'])
+    create_index(conn, 'product', 'ix_product_sale_category', ['is_sale', 'category_id'])
+
+
+def backfill_product_sales(conn):
+    """按已支付（含已发货、已完成）订单的订单项重新统计商品销量，一次聚合后批量更新"""
+    order, order_item, product = _quote(conn, 'order'), _quote(conn, 'order_item'), _quote(conn, 'product')
+    rows = conn.execute(text(
+        f'SELECT oi.product_id, SUM(oi.quantity) FROM {order_item} oi JOIN {order} o ON o.id = oi.order_id '
+        f'WHERE o.status IN (1, 2, 3) GROUP BY oi.product_id')).all()
+    if rows:
+        conn.execute(text(f'UPDATE {product} SET sales = :sales WHERE id = :id'),
+                     [{'sales': int(quantity), 'id': product_id} for product_id, quantity in rows])
+    return len(rows)
+
+
+@migration(3, 'product.sales 销量列，商品列表价格筛选与排序的索引')
+def _product_sales_and_sort_indexes(conn):
+    if add_column(conn, 'product', Column('sales', Integer, nullable=False, server_default='0')):
+        backfill_product_sales(conn)
+    # 按分类 + 价格范围 / 价格排序
+    create_index(conn, 'product', 'ix_product_sale_category_price', ['is_sale', 'category_id', 'price', 'id'])
+    # 不限分类时按价格、销量排序
+    create_index(conn, 'product', 'ix_product_sale_price', ['is_sale', 'price', 'id'])
+    create_index(conn, 'product', 'ix_product_sale_sales', ['is_sale', 'sales', 'id'])
+
+
+def backfill_order_timestamps(conn, batch=10000):
+    """
+    补齐 created_at 为空的订单的下单 / 支付时间。历史订单没有记录时间，只能估算：
+    有支付截止时间的订单按 expire_at - 支付超时时长（YOUGOU_ORDER_PAY_TIMEOUT）计算下单时间；
+    更早的订单（没有 expire_at）记为已知最早的下单时间；已支付的订单支付时间记为下单时间
+    """
+    order = _quote(conn, 'order')
+    timeout = datetime.timedelta(minutes=int(os.environ.get('YOUGOU_ORDER_PAY_TIMEOUT', 15)))
+    earliest = conn.execute(text(f'SELECT MIN(expire_at) FROM {order} WHERE expire_at IS NOT NULL')).scalar()
+    if isinstance(earliest, str):  # SQLite 对聚合结果不做类型转换
+        earliest = datetime.datetime.fromisoformat(earliest)
+    fallback = earliest - timeout if earliest else datetime.datetime.now()
+
+    orders = Table('order', MetaData(), autoload_with=conn)
+    last_id, updated = 0, 0
+    while True:
+        rows = conn.execute(select(orders.c.id, orders.c.expire_at)
+                            .where(orders.c.created_at.is_(None), orders.c.id > last_id)
+                            .order_by(orders.c.id).limit(batch)).all()
+        if not rows:
+            break
+        conn.execute(orders.update().where(orders.c.id == bindparam('_id')).values(created_at=bindparam('created_at')),
+                     [{'_id': order_id, 'created_at': expire_at - timeout if expire_at else fallback}
+                      for order_id, expire_at in rows])
+        last_id, updated = rows[-1][0], updated + len(rows)
+    conn.execute(text(f'UPDATE {order} SET paid_at = created_at WHERE status IN (1, 2, 3) AND paid_at IS NULL'))
+    return updated
+
+
+@migration(4, 'order.created_at / paid_at 列，按用户 + 状态 + 下单时间查询订单历史的索引')
+def _order_timestamps(conn):
+    add_column(conn, 'order', Column('created_at', DateTime, nullable=True))
+    add_column(conn, 'order', Column('paid_at', DateTime, nullable=True))
+    backfill_order_timestamps(conn)
+    # 按状态筛选（订单列表的状态标签页）与不限状态两种查询，都按下单时间倒序
+    create_index(conn, 'order', 'ix_order_user_status_created', ['user_id', 'status', 'created_at DESC', 'id DESC'])
+    create_index(conn, 'order', 'ix_order_user_created', ['user_id', 'created_at DESC', 'id DESC'])
+    # (user_id) 是上面索引的前缀，不再需要
+    drop_index(conn, 'order', 'ix_order_user_id')
+
+
+
+@migration(5, 'user.cart_version / order_version 列，购物车与订单列表条件请求的版本号')
+def _user_state_versions(conn):
+    add_column(conn, 'user', Column('cart_version', Integer, nullable=False, server_default='0'))
+    add_column(conn, 'user', Column('order_version', Integer, nullable=False, server_default='0'))
+
+
+@migration(6, '商品全文检索的 FTS5 表与同步触发器')
+def _product_fts(conn):
+    # 只用于 SQLite；未编译 FTS5 时跳过（关键字搜索回退到 LIKE），不影响其他迁移
+    if conn.dialect.name != 'sqlite':
+        return
+    try:
+        with conn.begin_nested():
+            search.build_index(conn)
+    except Exception:
+        pass
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--status', action='store_true', help='只显示待执行的迁移')
+    args = parser.parse_args()
+
+    from app import create_app, db
+
+    with create_app().app_context():
+        todo = pending(db.engine)
+        if args.status:
+            for version, description in todo:
+                print(f'待执行 {version:>4}  {description}')
+            print('已是最新版本' if not todo else f'共 {len(todo)} 个待执行')
+        else:
+            # create_all 只创建缺失的表，不影响已有数据
+            db.create_all()
+            for version in upgrade(db.engine):
+                print(f'已执行迁移 {version}')
+            print('数据库已是最新版本')
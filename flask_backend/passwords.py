@@ -0,0 +1,105 @@
+"""
+bcrypt 密码哈希：在独立的有界线程池中执行，避免占满请求线程
+
+- 池大小与排队上限可配置，正在执行 + 排队的任务超过上限时立即抛出 HasherBusy（接口返回 503）；
+- bcrypt 计算期间释放 GIL，线程池即可并行利用多核；
+- rounds（cost）可配置，needs_rehash() 用于登录成功后把低 cost 的旧哈希透明升级；
+- stats() 提供哈希耗时与排队等待时间统计。
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+
+class HasherBusy(Exception):
+    """哈希线程池排队已满"""
+
+
+class _Timing:
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'max_ms': round(self.max * 1000, 3),
+            'total_seconds': round(self.total, 6),
+        }
+
+
+class PasswordHasher:
+    def __init__(self, rounds=12, workers=4, max_queue=32):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self.rejected = 0
+        self.hash_time = _Timing()
+        self.wait_time = _Timing()
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HasherBusy('服务繁忙，请稍后重试')
+
+        enqueued = time.perf_counter()
+        with self._lock:
+            self._inflight += 1
+
+        def task():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self.wait_time.observe(started - enqueued)
+                    self.hash_time.observe(finished - started)
+                    self._inflight -= 1
+                self._slots.release()
+
+        return self._executor.submit(task).result()
+
+    def hash(self, password):
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return self._run(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+    def verify(self, password, hashed):
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def needs_rehash(self, hashed):
+        """哈希格式为 $2b$<cost>$...，cost 低于当前配置时需要重新哈希"""
+        try:
+            return int(hashed.split('$')[2]) < self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rounds': self.rounds,
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'inflight': self._inflight,
+                'queued': max(0, self._inflight - self.workers),
+                'rejected': self.rejected,
+                'hash_time': self.hash_time.as_dict(),
+                'queue_wait': self.wait_time.as_dict(),
+            }
@@ -0,0 +1,146 @@
+"""
+商品推荐：按销量计算的热度分，随时间指数衰减，增量维护
+
+- 订单支付时 record() 把购买数量累加到商品分与分类分上，不需要聚合查询 order_item；
+- 衰减使用"前向衰减"：分数按固定基准时间放大存储（quantity × 2^((t - t0) / half_life)），
+  所有商品按同一比例衰减，排名只在有新销量时变化，读取时再换算为当前分值；
+- 全站和每个分类的前 top_n 名保存在内存中，分数只增不减，因此只需在更新时调整该商品所在的榜单，
+  top() 直接返回已排好序的列表。
+
+榜单只在本进程内有效，多进程部署时每个进程启动时各自 load() 一次，之后只看到本进程处理的支付。
+load() 在锁外构建新的分数与榜单，完成后整体替换，重建期间读取方看到的始终是完整的旧榜单。
+商品修改分类后，旧分类榜单中的记录保留到下次 load()。
+"""
+import heapq
+import itertools
+import math
+import threading
+import time
+
+# 放大倍数的指数超过该值时整体缩小，防止浮点溢出
+_RESCALE_EXPONENT = 512
+
+
+class PopularityIndex:
+    def __init__(self, half_life=72 * 3600, top_n=50, clock=time.time):
+        self.half_life = half_life
+        self.top_n = top_n
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._t0 = self.clock()
+        self._product_scores = {}
+        self._product_category = {}
+        self._category_scores = {}
+        self._top = {None: ()}  # 分类ID（None 为全站）-> ((商品ID, 存储分), ...) 按分数降序
+        self.updates = 0
+
+    def _weight(self, at):
+        exponent = (at - self._t0) / self.half_life
+        if exponent > _RESCALE_EXPONENT:
+            self._rescale(at)
+            exponent = 0.0
+        return math.pow(2.0, exponent)
+
+    def _rescale(self, at):
+        factor = math.pow(2.0, -(at - self._t0) / self.half_life)
+        self._t0 = at
+        self._product_scores = {pid: s * factor for pid, s in self._product_scores.items()}
+        self._category_scores = {cid: s * factor for cid, s in self._category_scores.items()}
+        self._top = {key: tuple((pid, s * factor) for pid, s in ranked) for key, ranked in self._top.items()}
+
+    def _promote(self, key, product_id, score):
+        """商品分数增加后调整榜单，返回榜单是否变化"""
+        ranked = [item for item in self._top.get(key, ()) if item[0] != product_id]
+        if len(ranked) >= self.top_n and score <= ranked[-1][1]:
+            return False
+        ranked.append((product_id, score))
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        self._top[key] = tuple(ranked[:self.top_n])
+        return True
+
+    def record(self, items, at=None):
+        """items 为 [(商品ID, 分类ID, 数量)]，返回是否有榜单发生变化"""
+        at = self.clock() if at is None else at
+        changed = False
+        with self._lock:
+            weight = self._weight(at)
+            for product_id, category_id, quantity in items:
+                score = self._product_scores.get(product_id, 0.0) + quantity * weight
+                self._product_scores[product_id] = score
+                self._product_category[product_id] = category_id
+                self._category_scores[category_id] = self._category_scores.get(category_id, 0.0) + quantity * weight
+                changed = self._promote(None, product_id, score) | changed
+                changed = self._promote(category_id, product_id, score) | changed
+            self.updates += 1
+        return changed
+
+    def load(self, rows):
+        """
+        用 [(商品ID, 分类ID, 数量, 时间戳)] 重建全部分数与榜单，同一商品可以有多行（如按小时汇总的销量），
+        时间戳为 None 的按当前时间计。每个时间戳只计算一次衰减权重，榜单在全部累加完后一次选出
+        """
+        t0 = self.clock()
+        weights = {}
+        product_scores, product_category, category_scores = {}, {}, {}
+        for product_id, category_id, quantity, at in rows:
+            at = t0 if at is None else at
+            weight = weights.get(at)
+            if weight is None:
+                weight = weights[at] = math.pow(2.0, (at - t0) / self.half_life)
+            product_scores[product_id] = product_scores.get(product_id, 0.0) + quantity * weight
+            product_category[product_id] = category_id
+            category_scores[category_id] = category_scores.get(category_id, 0.0) + quantity * weight
+
+        by_category = {None: list(product_scores.items())}
+        for product_id, score in product_scores.items():
+            by_category.setdefault(product_category[product_id], []).append((product_id, score))
+        top = {key: tuple(heapq.nsmallest(self.top_n, items, key=lambda item: (-item[1], item[0])))
+               for key, items in by_category.items()}
+
+        with self._lock:
+            self._t0 = t0
+            self._product_scores = product_scores
+            self._product_category = product_category
+            self._category_scores = category_scores
+            self._top = top
+            self.updates = 0
+
+    def _current(self, stored, t0):
+        return stored * math.pow(2.0, -(self.clock() - t0) / self.half_life)
+
+    def top(self, category_id=None, n=None):
+        """返回 [(商品ID, 当前分)]，按分数降序"""
+        with self._lock:
+            ranked, t0 = self._top.get(category_id, ()), self._t0
+        ranked = ranked if n is None else ranked[:n]
+        return [(pid, self._current(score, t0)) for pid, score in ranked]
+
+    def top_in(self, category_ids, n=None):
+        """多个分类（如父分类及其子分类）合并后的榜单，各分类榜单已有序，归并即可"""
+        with self._lock:
+            lists, t0 = [self._top.get(cid, ()) for cid in category_ids], self._t0
+        merged = heapq.merge(*lists, key=lambda item: (-item[1], item[0]))
+        # 商品改过分类时旧榜单中可能还有它，只保留一次
+        seen = set()
+        ranked = ((pid, score) for pid, score in merged if not (pid in seen or seen.add(pid)))
+        ranked = ranked if n is None else itertools.islice(ranked, n)
+        return [(pid, self._current(score, t0)) for pid, score in ranked]
+
+    def top_categories(self, n=10):
+        with self._lock:
+            ranked = sorted(self._category_scores.items(), key=lambda item: (-item[1], item[0]))[:n]
+            t0 = self._t0
+        return [(cid, self._current(score, t0)) for cid, score in ranked]
+
+    def stats(self):
+        return {
+            'half_life_hours': round(self.half_life / 3600, 3),
+            'top_n': self.top_n,
+            'products': len(self._product_scores),
+            'updates': self.updates,
+            'top_products': [{'id': pid, 'score': round(s, 4)} for pid, s in self.top(n=10)],
+            'top_categories': [{'id': cid, 'score': round(s, 4)} for cid, s in self.top_categories()],
+        }
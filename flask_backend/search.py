@@ -0,0 +1,167 @@
+"""
+商品全文检索：SQLite FTS5 虚拟表 + 中英文混合分词
+
+- 中文按二元分词（bigram），每段末尾再补一个单字，保证任意单字都能前缀命中；
+- 英文/数字按字母段、数字段切分并转小写（'Mate60' -> 'mate' '60'）；
+- 分词结果以空格拼接写入 product_fts.tokens，由 FTS5 的 unicode61 分词器按空格切分；
+- product 表上的触发器调用自定义 SQL 函数 fts_tokens() 维护索引，
+  ORM 写入与批量 SQL 写入都会同步，无需在业务代码里手动更新。
+
+fts_tokens() 是 Python 函数，只存在于注册过它的连接上。导入本模块后，进程内所有引擎的新连接都会注册；
+app.py、migrations.py 导入了本模块，catalog.py 命令行与 bench 脚本经由 app.py 导入。
+不经过这些代码的写入方（sqlite3 命令行、其他程序）插入商品或修改商品名时会报 no such function: fts_tokens，
+需要先在连接上注册同名函数（见 register_functions()）。
+
+非 SQLite 数据库或 SQLite 未编译 FTS5 时 enabled() 返回 False，调用方回退到 LIKE。
+FTS 表由迁移 6（init-db / migrate / python migrations.py）与 init_search() 创建；服务进程不执行 init_search()，
+首次调用 enabled(engine) 时检查 sqlite_master 中是否已有 FTS 表，结果在本进程内保留。
+"""
+import re
+
+from sqlalchemy import event, text, table, column, select
+from sqlalchemy.engine import Engine
+
+FTS_TABLE = 'product_fts'
+FTS_FUNCTION = 'fts_tokens'
+
+_CJK = r'\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+_TOKEN_RE = re.compile(f'[{_CJK}]+|[a-z]+|[0-9]+')
+_CJK_RE = re.compile(f'[{_CJK}]')
+
+SCHEMA_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(tokens, tokenize='unicode61')",
+    f"""CREATE TRIGGER IF NOT EXISTS product_fts_ai AFTER INSERT ON product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, tokens) VALUES (new.id, {FTS_FUNCTION}(new.name));
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS product_fts_ad AFTER DELETE ON product BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS product_fts_au AFTER UPDATE OF id, name ON product BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE}(rowid, tokens) VALUES (new.id, {FTS_FUNCTION}(new.name));
+    END""",
+]
+
+REBUILD_SQL = [
+    f"DELETE FROM {FTS_TABLE}",
+    f"INSERT INTO {FTS_TABLE}(rowid, tokens) SELECT id, {FTS_FUNCTION}(name) FROM product",
+]
+
+product_fts = table(FTS_TABLE, column('rowid'), column('tokens'), column('rank'))
+
+_state = {'enabled': None}  # None 表示本进程尚未检查
+
+
+def tokenize(value):
+    """把商品名切分为索引词列表"""
+    tokens = []
+    for run in _TOKEN_RE.findall((value or '').lower()):
+        if _CJK_RE.match(run):
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            tokens.append(run[-1])
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def index_text(value):
+    """写入 FTS 表的文本（fts_tokens() 的 Python 实现）"""
+    return ' '.join(tokenize(value))
+
+
+def _quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def build_match_query(keyword):
+    """
+    把搜索关键字转换为 FTS5 MATCH 表达式，无有效词时返回 None。
+    中文段转为相邻二元词短语（单字用前缀查询），英文/数字段用前缀查询，各段之间为 AND。
+    """
+    parts = []
+    for run in _TOKEN_RE.findall((keyword or '').lower()):
+        if _CJK_RE.match(run) and len(run) > 1:
+            bigrams = [run[i:i + 2] for i in range(len(run) - 1)]
+            parts.append(' + '.join(_quote(b) for b in bigrams))
+        else:
+            parts.append(_quote(run) + ' *')
+    if not parts:
+        return None
+    return ' AND '.join(parts)
+
+
+def register_functions(dbapi_connection):
+    """在原生 sqlite3 连接上注册 fts_tokens()，触发器依赖此函数"""
+    dbapi_connection.create_function(FTS_FUNCTION, 1, index_text, deterministic=True)
+
+
+@event.listens_for(Engine, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    if hasattr(dbapi_connection, 'create_function'):
+        register_functions(dbapi_connection)
+
+
+def build_index(conn):
+    """在 conn 上创建 FTS 表与同步触发器；索引行数与商品表不一致时重建。SQLite 未编译 FTS5 时抛出异常"""
+    for sql in SCHEMA_SQL:
+        conn.execute(text(sql))
+    indexed = conn.execute(text(f'SELECT COUNT(*) FROM {FTS_TABLE}')).scalar()
+    products = conn.execute(text('SELECT COUNT(*) FROM product')).scalar()
+    if indexed != products:
+        for sql in REBUILD_SQL:
+            conn.execute(text(sql))
+
+
+def init_search(db):
+    """创建 FTS 表与同步触发器；索引为空而商品表有数据时重建。需在 app context 中调用"""
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        _state['enabled'] = False
+        return False
+
+    try:
+        with engine.begin() as conn:
+            build_index(conn)
+    except Exception:
+        # SQLite 未编译 FTS5
+        _state['enabled'] = False
+        return False
+
+    _state['enabled'] = True
+    return True
+
+
+def detect(engine):
+    """FTS 表已存在（由 init_search 创建）时启用全文检索，不建表、不重建索引"""
+    if engine.dialect.name != 'sqlite':
+        return False
+    try:
+        with engine.connect() as conn:
+            found = conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                                 {'name': FTS_TABLE}).first()
+    except Exception:
+        return False
+    return found is not None
+
+
+def enabled(engine=None):
+    """是否使用 FTS 检索；本进程首次调用时若未执行过 init_search()，用 engine 检查一次 FTS 表"""
+    if _state['enabled'] is None:
+        if engine is None:
+            return False
+        _state['enabled'] = detect(engine)
+    return _state['enabled']
+
+
+def search_subquery(keyword):
+    """
+    返回 (product_id, score) 子查询，score 为 bm25 相关度（越小越相关）；
+    关键字无有效词时返回 None。
+    """
+    match = build_match_query(keyword)
+    if match is None:
+        return None
+    return select(
+        product_fts.c.rowid.label('product_id'),
+        product_fts.c.rank.label('score')
+    ).where(product_fts.c.tokens.op('MATCH')(match)).subquery('fts')
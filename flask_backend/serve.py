@@ -0,0 +1,140 @@
+"""
+生产环境启动入口：预加载应用后 fork 多个 worker 进程，共用同一个监听端口
+
+    python serve.py                                   # 1 个进程，多线程
+    python serve.py --workers 4                       # 预加载后 fork 4 个进程，每个进程多线程
+    python serve.py --workers 4 --worker-class gevent # 每个进程使用 gevent 协程（需安装 gevent）
+    python serve.py --bind 0.0.0.0:8000
+
+启动前需要先初始化数据库（只需执行一次，之后每次发布执行 migrate）：
+
+    flask --app app init-db [--seed]
+    flask --app app migrate
+
+父进程只负责：创建应用（导入代码、构建静态资源表）、绑定端口、fork 并看护 worker，
+worker 异常退出时自动重启；收到 SIGTERM / SIGINT 时通知全部 worker 退出。
+create_app() 注册了 fork 回调，子进程会丢弃继承的数据库连接池并各自重新连接，
+后台线程（超时订单扫描、热门库存刷写）在每个 worker 的首个请求时启动。
+
+也可以用 gunicorn 以同样的方式运行（fork 后的处理由 create_app() 完成，不需要额外的钩子）：
+
+    gunicorn --preload -w 4 -b 0.0.0.0:3000 'app:create_app()'
+
+注意：配置了 YOUGOU_HOT_PRODUCT_IDS（热门商品内存预留库存）时只能使用单个 worker。
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bind', default=os.environ.get('YOUGOU_BIND', '0.0.0.0:3000'), help='监听地址 host:port')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('YOUGOU_WORKERS', 1)), help='worker 进程数')
+    parser.add_argument('--worker-class', choices=['thread', 'gevent'],
+                        default=os.environ.get('YOUGOU_WORKER_CLASS', 'thread'),
+                        help='thread：每个连接一个线程；gevent：协程（需安装 gevent）')
+    parser.add_argument('--backlog', type=int, default=2048)
+    return parser.parse_args()
+
+
+def serve_forever(app, sock, worker_class):
+    """在已绑定的 socket 上处理请求，直到进程收到 SIGTERM"""
+    if worker_class == 'gevent':
+        from gevent.pywsgi import WSGIServer
+        server = WSGIServer(sock, app, log=None)
+        signal.signal(signal.SIGTERM, lambda *_: server.stop(timeout=5))
+        server.serve_forever()
+        return
+
+    from werkzeug.serving import make_server
+    host, port = sock.getsockname()[:2]
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    # 信号处理函数在主线程（serve_forever 所在线程）中执行，抛出 SystemExit 即退出循环
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def spawn(app, sock, worker_class):
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        try:
+            serve_forever(app, sock, worker_class)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def supervise(app, sock, args):
+    workers = {spawn(app, sock, args.worker_class) for _ in range(args.workers)}
+    stopping = False
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            print(f'worker {pid} 异常退出（状态 {status}），重新启动', file=sys.stderr)
+            time.sleep(0.5)
+            workers.add(spawn(app, sock, args.worker_class))
+
+
+def main():
+    args = parse_args()
+    if args.worker_class == 'gevent':
+        # 必须在导入应用（以及 threading、socket 的使用方）之前打补丁
+        from gevent import monkey
+        monkey.patch_all()
+
+    started = time.perf_counter()
+    import app as backend
+    import migrations
+
+    app = backend.create_app()
+    with app.app_context():
+        todo = migrations.pending(backend.db.engine)
+        # 父进程不保留数据库连接
+        backend.db.engine.dispose()
+    if todo:
+        sys.exit(f'数据库有 {len(todo)} 个待执行的迁移，请先运行 flask --app app migrate（或 init-db）')
+    if app.config['HOT_PRODUCT_IDS'] and args.workers > 1:
+        sys.exit('配置了 YOUGOU_HOT_PRODUCT_IDS 时只能使用单个 worker')
+    # 静态资源表在 fork 之前构建，worker 之间共享（写时复制）
+    backend.asset_store.build()
+
+    host, port = args.bind.rsplit(':', 1)
+    sock = socket.create_server((host, int(port)), backlog=args.backlog)
+    sock.set_inheritable(True)
+    print(f'✅ 应用加载完成 {(time.perf_counter() - started) * 1000:.0f}ms，'
+          f'监听 http://{args.bind}，{args.workers} 个 worker（{args.worker_class}）')
+
+    if args.workers <= 1:
+        serve_forever(app, sock, args.worker_class)
+    else:
+        supervise(app, sock, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+存储配置：按环境变量选择数据库 profile
+
+YOUGOU_DB_PROFILE=sqlite（默认）
+    SQLite 文件库，每个连接设置 WAL、busy_timeout、synchronous=NORMAL、mmap_size、cache_size，
+    WAL 模式下读不阻塞写、写不阻塞读。可用 YOUGOU_SQLITE_* 覆盖各项 PRAGMA。
+YOUGOU_DB_PROFILE=server
+    MySQL / PostgreSQL 等服务端数据库，YOUGOU_DATABASE_URL 必填；
+    连接池大小、溢出、超时、回收时间与 pre-ping 通过 YOUGOU_DB_POOL_* 配置。
+
+任一 profile 下都可以用 YOUGOU_DATABASE_URL 指定连接串。
+"""
+import os
+import sqlite3
+
+from sqlalchemy import event
+
+DEFAULT_SQLITE_URL = 'sqlite:///yougou.db'
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def sqlite_pragmas():
+    """每个 SQLite 连接建立时执行的 PRAGMA（顺序执行）"""
+    return [
+        ('journal_mode', os.environ.get('YOUGOU_SQLITE_JOURNAL_MODE', 'WAL')),
+        ('busy_timeout', _env_int('YOUGOU_SQLITE_BUSY_TIMEOUT', 5000)),            # 毫秒
+        ('synchronous', os.environ.get('YOUGOU_SQLITE_SYNCHRONOUS', 'NORMAL')),
+        ('mmap_size', _env_int('YOUGOU_SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),      # 字节
+        ('cache_size', _env_int('YOUGOU_SQLITE_CACHE_SIZE', -64 * 1024)),           # 负数单位为 KiB
+        ('temp_store', 'MEMORY'),
+    ]
+
+
+def server_engine_options():
+    return {
+        'pool_size': _env_int('YOUGOU_DB_POOL_SIZE', 10),
+        'max_overflow': _env_int('YOUGOU_DB_POOL_MAX_OVERFLOW', 20),
+        'pool_timeout': _env_int('YOUGOU_DB_POOL_TIMEOUT', 30),
+        'pool_recycle': _env_int('YOUGOU_DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': os.environ.get('YOUGOU_DB_POOL_PRE_PING', '1') == '1',
+    }
+
+
+def configure(config):
+    """根据环境变量写入 SQLALCHEMY_DATABASE_URI / SQLALCHEMY_ENGINE_OPTIONS，返回 profile 名称"""
+    profile = os.environ.get('YOUGOU_DB_PROFILE', 'sqlite')
+    url = os.environ.get('YOUGOU_DATABASE_URL')
+
+    if profile == 'server':
+        if not url:
+            raise RuntimeError('YOUGOU_DB_PROFILE=server 时必须设置 YOUGOU_DATABASE_URL')
+        config['SQLALCHEMY_DATABASE_URI'] = url
+        config['SQLALCHEMY_ENGINE_OPTIONS'] = server_engine_options()
+    elif profile == 'sqlite':
+        config['SQLALCHEMY_DATABASE_URI'] = url or DEFAULT_SQLITE_URL
+        # busy_timeout 由 PRAGMA 控制，驱动层的 timeout 保持一致（秒）
+        timeout = _env_int('YOUGOU_SQLITE_BUSY_TIMEOUT', 5000) / 1000
+        config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': timeout}}
+    else:
+        raise RuntimeError(f'未知的数据库 profile：{profile}')
+
+    config['DB_PROFILE'] = profile
+    return profile
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas:
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def install(engine, pragmas=None):
+    """为 SQLite engine 注册 connect 事件，在每个新连接上执行 PRAGMA；其他数据库不做处理"""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas() if pragmas is None else pragmas
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        if isinstance(dbapi_connection, sqlite3.Connection):
+            apply_sqlite_pragmas(dbapi_connection, pragmas)
@@ -0,0 +1,108 @@
+"""
+测试夹具：临时 SQLite 库（create_all + migrations.upgrade + 全文索引 + 测试数据），整个测试会话共用一个应用
+
+测试数据：分类 1~5 与分类 2 的子分类 6，商品 1~500（价格与 ID 相同），用户 user1~user3（密码 123456）。
+
+用法（在 flask_backend 目录下）：
+    python -m pytest -q tests
+"""
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import event
+
+DB_DIR = tempfile.mkdtemp()
+os.environ['YOUGOU_DATABASE_URL'] = f'sqlite:///{os.path.join(DB_DIR, "test.db")}'
+os.environ.setdefault('YOUGOU_BCRYPT_ROUNDS', '4')
+os.environ.setdefault('YOUGOU_IMAGE_CACHE_DIR', os.path.join(DB_DIR, 'images'))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app as backend  # noqa: E402
+import migrations  # noqa: E402
+import search  # noqa: E402
+
+PRODUCTS = 500
+_new_users = itertools.count(1)
+
+
+def seed():
+    db = backend.db
+    db.session.add_all([backend.Category(name=f'分类{i}', parent_id=0) for i in range(1, 6)])
+    # 分类 6 是分类 2 的子分类，按分类 2 筛选时展开为 IN (2, 6)
+    db.session.add(backend.Category(name='子分类', parent_id=2))
+    db.session.add_all([backend.Product(name=f'测试商品{i}', price=i, category_id=i % 6 + 1, stock=1000)
+                        for i in range(1, PRODUCTS + 1)])
+    db.session.add_all([backend.User(username=f'user{i}', password=backend.encrypt_password('123456'))
+                        for i in range(1, 4)])
+    db.session.commit()
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = backend.create_app()
+    with app.app_context():
+        backend.db.create_all()
+        migrations.upgrade(backend.db.engine)
+        search.init_search(backend.db)
+        seed()
+    yield app
+    with app.app_context():
+        backend.db.engine.dispose()
+    shutil.rmtree(DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(client):
+    """login(用户名) 返回带 Token 的请求头"""
+    def login(username, password='123456'):
+        response = client.post('/api/user/login', json={'username': username, 'password': password})
+        return {'Authorization': response.json['data']['token']}
+    return login
+
+
+@pytest.fixture
+def new_user(app, login):
+    """new_user() 新建一个空购物车、无订单的用户（密码 123456），返回带 Token 的请求头"""
+    def new_user():
+        username = f'tester{next(_new_users)}'
+        with app.app_context():
+            backend.db.session.add(backend.User(username=username, password=backend.encrypt_password('123456')))
+            backend.db.session.commit()
+        return login(username)
+    return new_user
+
+
+class StatementRecorder:
+    """记录 with 块内引擎执行的 SQL：statements 为 [(语句, 参数)]"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+
+
+@pytest.fixture
+def record_statements(app):
+    """record_statements() 返回 StatementRecorder，用作 with 块"""
+    def record():
+        with app.app_context():
+            return StatementRecorder(backend.db.engine)
+    return record
@@ -0,0 +1,80 @@
+"""
+批量接口：/api/cart/batch 先校验全部操作再执行，任一操作失败整批回滚；
+/api/batch 的子请求携带外层请求的 Authorization，各自返回自己的状态码
+"""
+import pytest
+
+BATCH_PATH = '/api/cart/batch'
+
+
+def cart_lines(client, headers):
+    lines = client.get('/api/cart/list', headers=headers).json['data']
+    return sorted((line['product']['id'], line['quantity']) for line in lines)
+
+
+@pytest.fixture
+def cart(client, new_user):
+    """新用户，购物车中有商品 5（2 件）、商品 6（1 件）；返回 (请求头, {商品ID: 购物车项ID})"""
+    headers = new_user()
+    for pid, quantity in ((5, 2), (6, 1)):
+        client.post('/api/cart/add', json={'product_id': pid, 'quantity': quantity}, headers=headers)
+    lines = {line['product']['id']: line['id'] for line in client.get('/api/cart/list', headers=headers).json['data']}
+    return headers, lines
+
+
+def test_batch_cart_applies_every_op(client, cart):
+    headers, lines = cart
+    ops = [{'op': 'add', 'product_id': 7, 'quantity': 3}, {'op': 'add', 'product_id': 5},
+           {'op': 'set', 'id': lines[6], 'quantity': 4}, {'op': 'remove', 'id': lines[6]},
+           {'op': 'add', 'product_id': 6, 'quantity': 2}]
+    response = client.post(BATCH_PATH, json={'ops': ops}, headers=headers).json
+    assert response['code'] == 200 and response['data']['applied'] == 5
+    assert cart_lines(client, headers) == [(5, 3), (6, 2), (7, 3)]
+
+
+@pytest.mark.parametrize('bad_op, code, msg', [
+    ({'op': 'set', 'id': 'LINE5', 'quantity': 0}, 400, '第3个操作参数错误'),
+    ({'op': 'add', 'product_id': '7'}, 400, '第3个操作参数错误'),
+    ({'op': 'add', 'product_id': 7, 'quantity': True}, 400, '第3个操作参数错误'),
+    ({'op': 'clear'}, 400, '第3个操作类型错误'),
+    ('add', 400, '第3个操作类型错误'),
+    ({'op': 'remove', 'id': 10 ** 9}, 404, '购物车项1000000000不存在'),
+    ({'op': 'add', 'product_id': 10 ** 9}, 404, '商品ID1000000000不存在'),
+])
+def test_batch_cart_bad_op_leaves_cart_untouched(client, cart, bad_op, code, msg):
+    headers, lines = cart
+    if isinstance(bad_op, dict) and bad_op.get('id') == 'LINE5':
+        bad_op = dict(bad_op, id=lines[5])
+    before = cart_lines(client, headers)
+    # 前两个操作合法：参数错误时一个都不执行，执行中途失败时已执行的回滚
+    ops = [{'op': 'add', 'product_id': 8, 'quantity': 1}, {'op': 'set', 'id': lines[5], 'quantity': 9}, bad_op]
+    response = client.post(BATCH_PATH, json={'ops': ops}, headers=headers).json
+    assert (response['code'], response['msg']) == (code, msg)
+    assert cart_lines(client, headers) == before
+
+
+def test_batch_cart_does_not_touch_other_users_lines(client, cart, new_user):
+    _, lines = cart
+    other = new_user()
+    response = client.post(BATCH_PATH, json={'ops': [{'op': 'remove', 'id': lines[5]}]}, headers=other).json
+    assert response['code'] == 404
+    assert cart_lines(client, cart[0]) == [(5, 2), (6, 1)]
+
+
+def test_batch_requests_forward_auth_and_status(client, cart, new_user):
+    headers, _ = cart
+    paths = ['/api/cart/list', '/api/product/detail?id=5', '/api/no-such-api', '/api/batch', '/pages/index.html']
+    response = client.post('/api/batch', json={'requests': [{'path': p} for p in paths]}, headers=headers).json
+    assert response['code'] == 200
+    results = response['data']
+    assert [r['path'] for r in results] == paths
+    assert [r['status'] for r in results] == [200, 200, 404, 400, 400]
+    assert sorted(line['product']['id'] for line in results[0]['body']['data']) == [5, 6]
+    assert results[1]['body']['data']['id'] == 5
+
+    # 子请求只能看到本次请求的 Token 对应的用户
+    other = client.post('/api/batch', json={'requests': [{'path': '/api/cart/list'}]}, headers=new_user()).json
+    assert other['data'][0]['body']['data'] == []
+    anonymous = client.post('/api/batch', json={'requests': [{'path': '/api/cart/list'}]}).json
+    assert anonymous['data'][0]['status'] == 200
+    assert anonymous['data'][0]['body']['code'] == 401
@@ -0,0 +1,51 @@
+"""
+接口缓存：配置了共享后端时 stats() 报告共享后端上的命中计数，clear() 清空共享后端
+"""
+import threading
+
+import cache
+
+
+def load(value):
+    return lambda: (value, True)
+
+
+def test_shared_backend_stats_and_clear():
+    responses = cache.ResponseCache(cache.LRUCache(), cache.LocalBackend(), shared_ttl=60)
+    assert responses.get_or_load('a', load(b'1')) == b'1'
+    assert responses.get_or_load('a', load(b'2')) == b'1'
+    responses.get_or_load('b', lambda: (b'error', False))
+    assert responses.stats() == {'backend': 'LocalBackend', 'size': 1, 'ttl': 60, 'hits': 1, 'misses': 2}
+    assert responses.local.stats()['size'] == 0
+
+    responses.clear()
+    assert responses.stats()['size'] == 0
+    assert responses.get_or_load('a', load(b'3')) == b'3'
+
+
+def test_shared_counters_are_not_lost_across_threads():
+    responses = cache.ResponseCache(cache.LRUCache(), cache.LocalBackend())
+    responses.get_or_load('key', load(b'value'))
+
+    def worker():
+        for _ in range(2000):
+            responses.get_or_load('key', load(b'other'))
+            responses.get_or_load('missing', lambda: (b'', False))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = responses.stats()
+    assert (stats['hits'], stats['misses']) == (16000, 16001)
+
+
+def test_local_only_stats_and_clear():
+    responses = cache.ResponseCache(cache.LRUCache(max_entries=10))
+    responses.get_or_load('a', load(b'1'))
+    responses.get_or_load('a', load(b'1'))
+    stats = responses.stats()
+    assert (stats['backend'], stats['size'], stats['hits'], stats['misses']) == (None, 1, 1, 1)
+    responses.clear()
+    assert responses.stats()['size'] == 0
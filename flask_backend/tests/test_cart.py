@@ -0,0 +1,34 @@
+"""
+购物车列表与下单共用 load_cart_lines()：列表不返回商品已删除的行，结算这样的行时报商品不存在，
+订单总价与列表中的价格、数量一致
+"""
+import app as backend
+
+
+def test_cart_list_and_checkout_share_lines(app, client, new_user):
+    headers = new_user()
+    with app.app_context():
+        product = backend.Product(name='即将下架的商品', price=9.5, category_id=1, stock=10)
+        backend.db.session.add(product)
+        backend.db.session.commit()
+        removed_id = product.id
+    for pid, quantity in ((20, 2), (removed_id, 1), (21, 3)):
+        client.post('/api/cart/add', json={'product_id': pid, 'quantity': quantity}, headers=headers)
+    with app.app_context():
+        removed_line = backend.Cart.query.filter_by(product_id=removed_id).one().id
+        backend.db.session.delete(backend.db.session.get(backend.Product, removed_id))
+        backend.db.session.commit()
+
+    lines = client.get('/api/cart/list', headers=headers).json['data']
+    assert [(line['product']['id'], line['product']['price'], line['quantity']) for line in lines] == \
+        [(20, 20.0, 2), (21, 21.0, 3)]
+
+    response = client.post('/api/order/create', json={'cart_ids': [line['id'] for line in lines] + [removed_line]},
+                           headers=headers).json
+    assert (response['code'], response['msg']) == (404, f'商品ID{removed_id}不存在')
+
+    order_id = client.post('/api/order/create', json={'cart_ids': [line['id'] for line in lines]},
+                           headers=headers).json['data']['order_id']
+    order = client.get('/api/order/list', headers=headers).json['data']['list'][0]
+    assert order['id'] == order_id and order['total_price'] == 20.0 * 2 + 21.0 * 3
+    assert [(item['product']['id'], item['quantity']) for item in order['items']] == [(20, 2), (21, 3)]
@@ -0,0 +1,90 @@
+"""
+游标（keyset）分页：逐页翻到底与一次性按页码取出的结果顺序一致，不跳过、不重复；
+排序值相同的行按 ID 继续排序，翻页期间插入新行也不会让后面的页重复或漏掉已有的行
+"""
+import datetime
+
+import pytest
+
+import app as backend
+
+SIZE = 7
+
+
+def walk(client, url, headers=None, on_page=None):
+    """从第一页翻到最后一页，返回全部 ID"""
+    ids, cursor = [], ''
+    for _ in range(1000):
+        data = client.get(f'{url}&cursor={cursor}&size={SIZE}', headers=headers).json['data']
+        assert len(data['list']) <= SIZE
+        ids += [row['id'] for row in data['list']]
+        cursor = data['next_cursor']
+        if cursor is None:
+            return ids
+        if on_page is not None:
+            on_page()
+    raise AssertionError('翻页没有结束')
+
+
+@pytest.mark.parametrize('query', [
+    '',
+    'sort=newest',
+    'sort=price_desc',
+    'sort=price_asc&category_id=2&min_price=100&max_price=400',
+    # 大部分商品销量为 0，依靠 ID 区分先后
+    'sort=sales',
+    'sort=sales&category_id=3',
+])
+def test_product_cursor_matches_page_order(client, query):
+    expected = [row['id'] for row in client.get(f'/api/product/list?{query}&page=1&size=1000').json['data']['list']]
+    ids = walk(client, f'/api/product/list?{query}')
+    assert len(ids) == len(set(ids))
+    assert ids == expected and len(ids) > SIZE * 2
+
+
+@pytest.fixture
+def orders(app, new_user):
+    """新用户与 30 个订单：下单时间每 3 个相同（时间相同时按 ID 区分），状态 0 / 1 交替；返回 (请求头, 用户ID)"""
+    headers = new_user()
+    with app.app_context():
+        user_id = backend.verify_token(headers['Authorization'])
+        base = datetime.datetime(2026, 1, 1, 12, 0, 0)
+        backend.db.session.add_all([backend.Order(user_id=user_id, total_price=1.0, status=i % 2,
+                                                  created_at=base + datetime.timedelta(minutes=i // 3))
+                                    for i in range(30)])
+        backend.db.session.commit()
+    return headers, user_id
+
+
+@pytest.mark.parametrize('query', ['', 'status=1', 'status=0&start_date=2026-01-01&end_date=2026-01-01'])
+def test_order_cursor_matches_page_order(client, orders, query):
+    headers, _ = orders
+    expected = [row['id'] for row in
+                client.get(f'/api/order/list?{query}&page=1&size=100', headers=headers).json['data']['list']]
+    ids = walk(client, f'/api/order/list?{query}', headers)
+    assert len(ids) == len(set(ids))
+    assert ids == expected and len(ids) > SIZE
+
+
+def test_order_cursor_unaffected_by_new_orders(app, client, orders):
+    headers, user_id = orders
+    expected = [row['id'] for row in client.get('/api/order/list?page=1&size=100', headers=headers).json['data']['list']]
+
+    def add_order():
+        # 新订单排在最前面，已经翻过的位置不受影响
+        with app.app_context():
+            backend.db.session.add(backend.Order(user_id=user_id, total_price=1.0, status=0,
+                                                 created_at=datetime.datetime(2026, 6, 1)))
+            backend.db.session.commit()
+
+    assert walk(client, '/api/order/list?', headers, on_page=add_order) == expected
+
+
+@pytest.mark.parametrize('url', [
+    '/api/product/list?cursor=not-a-cursor',
+    f'/api/product/list?sort=price_asc&cursor={backend.encode_cursor(["10", 5])}',
+    f'/api/product/list?cursor={backend.encode_cursor([None, 0])}',
+    f'/api/order/list?cursor={backend.encode_cursor([1, 5])}',
+])
+def test_invalid_cursor_is_rejected(client, login, url):
+    assert client.get(url, headers=login('user1')).json['code'] == 400
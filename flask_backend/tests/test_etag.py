@@ -0,0 +1,77 @@
+"""
+购物车、订单列表的条件请求：If-None-Match 与当前 ETag 一致时返回 304，购物车 / 订单有写入后 ETag 变化
+"""
+
+
+def get(client, url, headers, etag=None):
+    if etag:
+        headers = dict(headers, **{'If-None-Match': etag})
+    return client.get(url, headers=headers)
+
+
+def assert_not_modified(client, url, headers, etag):
+    response = get(client, url, headers, etag)
+    assert response.status_code == 304 and response.data == b''
+    assert response.headers['ETag'] == etag
+
+
+def assert_modified(client, url, headers, etag):
+    response = get(client, url, headers, etag)
+    assert response.status_code == 200 and response.json['code'] == 200
+    assert response.headers['ETag'] != etag
+    return response
+
+
+def test_cart_list_revalidates_until_cart_changes(client, new_user):
+    headers = new_user()
+    client.post('/api/cart/add', json={'product_id': 10, 'quantity': 1}, headers=headers)
+    response = get(client, '/api/cart/list', headers)
+    etag = response.headers['ETag']
+    assert etag.startswith('W/') and response.headers['Cache-Control'] == 'private, no-cache'
+    assert_not_modified(client, '/api/cart/list', headers, etag)
+
+    client.post('/api/cart/add', json={'product_id': 11, 'quantity': 1}, headers=headers)
+    response = assert_modified(client, '/api/cart/list', headers, etag)
+    assert len(response.json['data']) == 2
+    etag = response.headers['ETag']
+
+    line_id = response.json['data'][0]['id']
+    client.post('/api/cart/update', json={'id': line_id, 'quantity': 5}, headers=headers)
+    etag = assert_modified(client, '/api/cart/list', headers, etag).headers['ETag']
+    client.post('/api/cart/batch', json={'ops': [{'op': 'remove', 'id': line_id}]}, headers=headers)
+    etag = assert_modified(client, '/api/cart/list', headers, etag).headers['ETag']
+    assert_not_modified(client, '/api/cart/list', headers, etag)
+
+
+def test_etag_is_per_user_and_per_query(client, new_user):
+    headers, other = new_user(), new_user()
+    etag = get(client, '/api/order/list?page=1&size=5', headers).headers['ETag']
+    assert get(client, '/api/order/list?page=1&size=5', other, etag).status_code == 200
+    assert get(client, '/api/order/list?page=2&size=5', headers, etag).status_code == 200
+    assert_not_modified(client, '/api/order/list?page=1&size=5', headers, etag)
+
+
+def test_order_writes_change_order_and_cart_etags(client, new_user):
+    headers = new_user()
+    client.post('/api/cart/add', json={'product_id': 12, 'quantity': 1}, headers=headers)
+    cart_etag = get(client, '/api/cart/list', headers).headers['ETag']
+    order_etag = get(client, '/api/order/list', headers).headers['ETag']
+    line_ids = [line['id'] for line in client.get('/api/cart/list', headers=headers).json['data']]
+
+    # 下单同时修改购物车与订单
+    order_id = client.post('/api/order/create', json={'cart_ids': line_ids}, headers=headers).json['data']['order_id']
+    assert assert_modified(client, '/api/cart/list', headers, cart_etag).json['data'] == []
+    response = assert_modified(client, '/api/order/list', headers, order_etag)
+    assert [order['id'] for order in response.json['data']['list']] == [order_id]
+    order_etag = response.headers['ETag']
+
+    client.post('/api/order/pay', json={'order_id': order_id}, headers=headers)
+    response = assert_modified(client, '/api/order/list', headers, order_etag)
+    assert response.json['data']['list'][0]['status'] == 1
+    assert_not_modified(client, '/api/order/list', headers, response.headers['ETag'])
+
+
+def test_error_responses_have_no_etag(client, new_user):
+    response = client.get('/api/order/list?status=9', headers=new_user())
+    assert response.json['code'] == 400
+    assert 'ETag' not in response.headers
@@ -0,0 +1,124 @@
+"""
+库存不超卖：deduct_stock() 的条件 UPDATE、HotStockReserver 的内存预留在并发下都不会扣成负数，
+下单时库存不足整单回滚
+"""
+import os
+import threading
+
+import pytest
+from sqlalchemy import create_engine, select
+
+import app as backend
+import inventory
+
+THREADS = 8
+
+
+@pytest.fixture
+def stock_engine(tmp_path):
+    """独立的临时库，只有商品表；stock_engine(库存...) 写入商品 1、2、… 并返回引擎"""
+    engines = []
+
+    def stock_engine(*stocks):
+        engine = create_engine(f'sqlite:///{os.path.join(tmp_path, "stock.db")}', connect_args={'timeout': 30})
+        engines.append(engine)
+        backend.Product.__table__.create(engine)
+        with engine.begin() as conn:
+            conn.execute(backend.Product.__table__.insert(),
+                         [{'id': pid, 'name': f'商品{pid}', 'stock': stock} for pid, stock in enumerate(stocks, 1)])
+        return engine
+    yield stock_engine
+    for engine in engines:
+        engine.dispose()
+
+
+def stocks(engine):
+    with engine.connect() as conn:
+        return dict(conn.execute(select(inventory.product_table.c.id, inventory.product_table.c.stock)).all())
+
+
+def run_concurrently(attempts, buy):
+    """THREADS 个线程共执行 attempts 次 buy()，返回成功次数"""
+    succeeded = []
+    lock = threading.Lock()
+    remaining = iter(range(attempts))
+
+    def worker():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            try:
+                buy()
+            except inventory.OutOfStock:
+                continue
+            with lock:
+                succeeded.append(1)
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(succeeded)
+
+
+def test_deduct_stock_never_oversells(stock_engine):
+    engine = stock_engine(25, 1000)
+
+    def buy():
+        with engine.begin() as conn:
+            inventory.deduct_stock(conn, {1: 2, 2: 1})
+
+    assert run_concurrently(40, buy) == 12
+    assert stocks(engine) == {1: 1, 2: 988}
+
+
+def test_deduct_stock_is_all_or_nothing(stock_engine):
+    engine = stock_engine(5, 1)
+    with pytest.raises(inventory.OutOfStock):
+        with engine.begin() as conn:
+            inventory.deduct_stock(conn, {1: 1, 2: 2})
+    assert stocks(engine) == {1: 5, 2: 1}
+
+
+def test_hot_stock_reserver_never_oversells(stock_engine):
+    engine = stock_engine(30, 1000)
+    reserver = inventory.HotStockReserver([1], flush_interval=0.01)
+    reserver.start(engine)
+    try:
+        assert run_concurrently(100, lambda: reserver.reserve({1: 1})) == 30
+        assert reserver.available(1) == 0
+        # 归还后可以再次预留，但总量不超过库存
+        reserver.release({1: 3})
+        assert run_concurrently(10, lambda: reserver.reserve({1: 1})) == 3
+    finally:
+        reserver.stop()
+    assert stocks(engine) == {1: 0, 2: 1000}
+    assert reserver.stats()['rejected'] == 77
+
+
+def test_create_order_rolls_back_when_stock_runs_out(app, client, new_user):
+    product_id = 498
+    with app.app_context():
+        backend.Product.query.filter_by(id=product_id).update({'stock': 3})
+        backend.db.session.commit()
+    try:
+        results = []
+        for quantity in (2, 2, 1):
+            headers = new_user()
+            client.post('/api/cart/add', json={'product_id': product_id, 'quantity': quantity}, headers=headers)
+            client.post('/api/cart/add', json={'product_id': 1, 'quantity': 1}, headers=headers)
+            cart_ids = [line['id'] for line in client.get('/api/cart/list', headers=headers).json['data']]
+            results.append(client.post('/api/order/create', json={'cart_ids': cart_ids}, headers=headers).json['code'])
+            if results[-1] == 409:
+                # 整单回滚：订单未创建，购物车保留
+                assert client.get('/api/order/list', headers=headers).json['data']['list'] == []
+                assert len(client.get('/api/cart/list', headers=headers).json['data']) == 2
+        assert results == [200, 409, 200]
+        with app.app_context():
+            assert backend.db.session.get(backend.Product, product_id).stock == 0
+    finally:
+        with app.app_context():
+            backend.Product.query.filter_by(id=product_id).update({'stock': 1000})
+            backend.db.session.commit()
@@ -0,0 +1,16 @@
+"""
+Server-Timing 响应头：默认只有总耗时，SQL 条数等细节只在 debug 模式或开启 SERVER_TIMING_DETAIL 时返回
+"""
+import app as backend
+
+
+def test_server_timing_hides_sql_by_default(client):
+    timing = client.get('/api/product/list?page=1&size=5').headers['Server-Timing']
+    assert timing.startswith('total;dur=')
+    assert 'sql' not in timing
+
+
+def test_server_timing_details_when_enabled(client, monkeypatch):
+    monkeypatch.setattr(backend.request_metrics, 'detailed_timing', True)
+    timing = client.get('/api/product/list?page=1&size=5').headers['Server-Timing']
+    assert timing.startswith('sql;dur=') and 'queries' in timing
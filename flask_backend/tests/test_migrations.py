@@ -0,0 +1,34 @@
+"""
+迁移在独立的引擎上执行（flask migrate / python migrations.py / serve.py 的待执行迁移检查），
+不经过 init_search() 也会建立全文索引，触发器在该引擎的连接上可用
+"""
+import os
+
+from sqlalchemy import create_engine, select, text
+
+import app as backend
+import migrations
+import search
+
+
+def test_upgrade_creates_fts_index(tmp_path):
+    engine = create_engine(f'sqlite:///{os.path.join(tmp_path, "migrate.db")}')
+    try:
+        backend.db.metadata.create_all(engine)
+        product = backend.Product.__table__
+        with engine.begin() as conn:
+            conn.execute(product.insert().values(name='华为 Mate60 手机', price=1, category_id=1, stock=1))
+        assert migrations.pending(engine)
+
+        migrations.upgrade(engine)
+        assert migrations.pending(engine) == []
+        with engine.begin() as conn:
+            # 已有商品在迁移时建立索引；迁移后的写入由触发器同步
+            conn.execute(product.insert().values(name='小米手机', price=2, category_id=1, stock=1))
+            conn.execute(product.update().where(product.c.id == 1).values(name='华为平板'))
+            found = conn.execute(select(search.product_fts.c.rowid).where(
+                search.product_fts.c.tokens.op('MATCH')(search.build_match_query('手机')))).scalars().all()
+            assert found == [2]
+            assert conn.execute(text(f'SELECT COUNT(*) FROM {search.FTS_TABLE}')).scalar() == 2
+    finally:
+        engine.dispose()
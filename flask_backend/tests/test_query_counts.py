@@ -0,0 +1,54 @@
+"""
+购物车、订单列表执行的 SQL 条数与条目数无关（没有 N+1 查询）：1 / 10 / 50 个条目时条数相同
+"""
+import datetime
+
+import pytest
+
+import app as backend
+
+SIZES = (1, 10, 50)
+
+
+def create_user(username, items):
+    """新建用户，购物车放入 items 个不同商品，另有 items 个订单（每个订单 2 个订单项）"""
+    db = backend.db
+    user = backend.User(username=username, password=backend.encrypt_password('123456'))
+    db.session.add(user)
+    db.session.flush()
+    db.session.add_all([backend.Cart(user_id=user.id, product_id=pid, quantity=1) for pid in range(1, items + 1)])
+    now = datetime.datetime.now()
+    for i in range(items):
+        order = backend.Order(user_id=user.id, total_price=3.0, status=1, created_at=now - datetime.timedelta(minutes=i),
+                              paid_at=now - datetime.timedelta(minutes=i))
+        db.session.add(order)
+        db.session.flush()
+        db.session.add_all([backend.OrderItem(order_id=order.id, product_id=pid, product_name=f'测试商品{pid}',
+                                              product_price=float(pid), quantity=1) for pid in (1, 2)])
+    db.session.commit()
+
+
+def count_statements(client, record_statements, url, headers):
+    # 先请求一次：Token 校验等按用户缓存的查询不计入
+    assert client.get(url, headers=headers).json['code'] == 200
+    with record_statements() as recorder:
+        response = client.get(url, headers=headers)
+    assert response.json['code'] == 200
+    return len(recorder.statements), response.json['data']
+
+
+@pytest.mark.parametrize('name, url, listed', [
+    ('cart', '/api/cart/list', lambda data: data),
+    ('order-page', '/api/order/list?page=1&size=50', lambda data: data['list']),
+    ('order-cursor', '/api/order/list?cursor=&size=50', lambda data: data['list']),
+])
+def test_list_statement_count_independent_of_items(app, client, login, record_statements, name, url, listed):
+    counts = {}
+    for items in SIZES:
+        username = f'{name}-{items}'
+        with app.app_context():
+            create_user(username, items)
+        count, data = count_statements(client, record_statements, url, login(username))
+        assert len(listed(data)) == items
+        counts[items] = count
+    assert counts[SIZES[0]] > 0 and len(set(counts.values())) == 1, f'SQL 条数随条目数变化：{counts}'
@@ -0,0 +1,140 @@
+"""
+查询计划检查：对接口执行的每条 SQL 运行 EXPLAIN QUERY PLAN
+
+- 购物车、订单列表、商品列表的查询必须经由为它们建立的索引访问对应的表；
+- 完整的下单流程（商品列表各种筛选 / 排序 / 分面计数、商品详情、购物车、下单、支付、订单列表、超时订单扫描）中，
+  带 WHERE 条件的语句不能对表做全表扫描（SCAN 且未使用索引）。banner、category 是整表返回的小表，不在检查范围内。
+"""
+import re
+
+import pytest
+
+import app as backend
+
+SMALL_TABLES = {'banner', 'category', 'schema_version'}
+SCAN_RE = re.compile(r'^SCAN (\w+)(?! VIRTUAL)(.*)$')
+WHERE_RE = re.compile(r'\bWHERE\b', re.I)
+ACCESS_RE = re.compile(r'^(?:SEARCH|SCAN) (\w+)(?: USING (?:COVERING )?INDEX (\w+))?')
+
+PRODUCT_INDEXES = {'ix_product_sale_category', 'ix_product_sale_category_price', 'ix_product_sale_price',
+                   'ix_product_sale_sales'}
+
+
+def explain(conn, statement, parameters):
+    if isinstance(parameters, (list, tuple)) and parameters and isinstance(parameters[0], (list, tuple, dict)):
+        parameters = parameters[0]  # executemany 只检查第一组参数
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {statement}', parameters or ())]
+
+
+@pytest.fixture
+def explain_plans(app):
+    """explain_plans(statements) 返回 [(语句, 查询计划行)]，只包含 SELECT / UPDATE / DELETE"""
+    def explain_plans(statements):
+        plans = []
+        with app.app_context():
+            raw = backend.db.engine.raw_connection()
+            try:
+                for statement, parameters in statements:
+                    head = statement.lstrip().split(None, 1)[0].upper()
+                    if head in ('SELECT', 'UPDATE', 'DELETE', 'WITH'):
+                        plans.append((statement, explain(raw.driver_connection, statement, parameters)))
+            finally:
+                raw.close()
+        return plans
+    return explain_plans
+
+
+@pytest.fixture
+def auth(client, login):
+    """user2 的购物车有 3 个商品，并有一个待付款订单"""
+    headers = login('user2')
+    if not client.get('/api/order/list', headers=headers).json['data']['list']:
+        for pid in (1, 2, 3):
+            client.post('/api/cart/add', json={'product_id': pid, 'quantity': 1}, headers=headers)
+        lines = client.get('/api/cart/list', headers=headers).json['data']
+        client.post('/api/order/create', json={'cart_ids': [line['id'] for line in lines[:2]]}, headers=headers)
+    return headers
+
+
+@pytest.mark.parametrize('url, table, indexes', [
+    ('/api/cart/list', 'cart', {'uq_cart_user_product'}),
+    ('/api/order/list?page=1&size=10', 'order', {'ix_order_user_created', 'ix_order_user_status_created'}),
+    ('/api/order/list?cursor=&size=10', 'order', {'ix_order_user_created', 'ix_order_user_status_created'}),
+    ('/api/order/list?page=1&size=10&status=0', 'order', {'ix_order_user_status_created'}),
+    ('/api/order/list?cursor=&size=10&status=0&start_date=2025-01-01', 'order', {'ix_order_user_status_created'}),
+    ('/api/order/list?page=1&size=10', 'order_item', {'ix_order_item_order_id'}),
+    ('/api/product/list?page=2&size=10', 'product', PRODUCT_INDEXES),
+    ('/api/product/list?category_id=2&page=2&size=10', 'product',
+     {'ix_product_sale_category', 'ix_product_sale_category_price'}),
+    ('/api/product/list?cursor=&category_id=3&size=10', 'product',
+     {'ix_product_sale_category', 'ix_product_sale_category_price'}),
+    ('/api/product/list?sort=price_desc&page=2&size=10', 'product', {'ix_product_sale_price'}),
+    ('/api/product/list?category_id=2&min_price=10&max_price=200&sort=price_asc', 'product',
+     {'ix_product_sale_price', 'ix_product_sale_category_price'}),
+    ('/api/product/list?cursor=&sort=price_asc&category_id=3&size=10', 'product',
+     {'ix_product_sale_price', 'ix_product_sale_category_price'}),
+    ('/api/product/list?sort=sales&size=10', 'product', {'ix_product_sale_sales'}),
+])
+def test_list_queries_use_indexes(client, auth, record_statements, explain_plans, url, table, indexes):
+    with record_statements() as recorder:
+        assert client.get(url, headers=auth).json['code'] == 200
+    accesses = [(statement, line, match.group(2))
+                for statement, plan in explain_plans(recorder.statements)
+                for line in plan
+                for match in [ACCESS_RE.match(line)] if match and match.group(1) == table]
+    assert accesses, f'{url} 没有访问 {table} 表'
+    for statement, line, index in accesses:
+        assert index in indexes, f'{url}：{line}（期望 {sorted(indexes)}）\n{" ".join(statement.split())}'
+
+
+def exercise(client, auth):
+    client.get('/api/product/list?page=1&size=10')
+    client.get('/api/category/tree')
+    client.get('/api/product/list?category_id=2&page=2&size=10')
+    client.get('/api/product/list?keyword=测试商品&page=1&size=10')
+    next_cursor = client.get('/api/product/list?cursor=&size=10').json['data'].get('next_cursor')
+    client.get(f'/api/product/list?cursor={next_cursor}&size=10&category_id=2')
+    client.get('/api/product/list?category_id=2&min_price=10&max_price=200&sort=price_asc&facets=1')
+    client.get('/api/product/list?min_price=100&sort=price_desc&page=2&size=10')
+    client.get('/api/product/list?sort=sales&size=10')
+    next_cursor = client.get('/api/product/list?cursor=&sort=price_desc&size=10').json['data'].get('next_cursor')
+    client.get(f'/api/product/list?cursor={next_cursor}&sort=price_desc&size=10&category_id=3')
+    client.get('/api/product/list?keyword=测试商品&min_price=50&facets=1')
+    client.get('/api/product/detail?id=3')
+    client.get('/api/user/info', headers=auth)
+    for pid in (1, 2, 3):
+        client.post('/api/cart/add', json={'product_id': pid, 'quantity': 1}, headers=auth)
+    client.post('/api/cart/add', json={'product_id': 1, 'quantity': 1}, headers=auth)
+    lines = client.get('/api/cart/list', headers=auth).json['data']
+    client.post('/api/cart/update', json={'id': lines[0]['id'], 'quantity': 3}, headers=auth)
+    order_id = client.post('/api/order/create', json={'cart_ids': [line['id'] for line in lines]},
+                           headers=auth).json['data']['order_id']
+    client.post('/api/order/pay', json={'order_id': order_id}, headers=auth)
+    # 下单改了库存，分面索引按主键重新读取这几个商品
+    client.get('/api/product/list?facets=1&size=10')
+    client.get('/api/order/list?page=1&size=10', headers=auth)
+    client.get('/api/order/list?cursor=&size=10', headers=auth)
+    client.get('/api/order/list?page=1&size=10&status=1', headers=auth)
+    client.get('/api/order/list?page=1&size=10&start_date=2025-01-01&end_date=2030-12-31', headers=auth)
+    cursor = client.get('/api/order/list?cursor=&size=1&status=1', headers=auth).json['data']['next_cursor']
+    client.get(f'/api/order/list?cursor={cursor or ""}&size=1&status=1&start_date=2025-01-01', headers=auth)
+
+
+def test_no_full_table_scans(app, client, login, record_statements, explain_plans):
+    auth = login('user1')
+    with record_statements() as recorder:
+        exercise(client, auth)
+        with app.app_context():
+            backend.release_expired_orders()
+    # 同一语句只检查第一次执行的参数
+    statements = list({statement: parameters for statement, parameters in reversed(recorder.statements)}.items())
+    tables = set(backend.db.metadata.tables) - SMALL_TABLES
+    failures = []
+    for statement, plan in explain_plans(statements):
+        # 只关心真实的表；子查询（anon_1 等）的 SCAN 不算
+        scans = [m.group(1) for m in map(SCAN_RE.match, plan)
+                 if m and 'INDEX' not in m.group(2) and m.group(1) in tables]
+        if WHERE_RE.search(statement) and scans:
+            failures.append(f'全表扫描 {", ".join(scans)}：{" ".join(statement.split())[:160]}')
+    assert len(statements) > 20
+    assert not failures, '\n'.join(failures)
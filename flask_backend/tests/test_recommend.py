@@ -0,0 +1,77 @@
+"""
+商品推荐热度分：load() 重建的结果与逐笔 record() 一致；启动加载按小时汇总销量，加载后推荐缓存失效
+"""
+import datetime
+import threading
+
+import pytest
+
+import app as backend
+import recommend
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def assert_same_ranking(actual, expected):
+    assert [key for key, _ in actual] == [key for key, _ in expected]
+    assert [score for _, score in actual] == pytest.approx([score for _, score in expected])
+
+
+def test_load_matches_incremental_record():
+    hour = 3600
+    events = [(1, 10, 3, 0), (2, 10, 1, 5 * hour), (3, 20, 2, 30 * hour), (1, 10, 1, 70 * hour),
+              (4, 20, 5, 71 * hour), (2, 10, 2, 71 * hour)]
+    clock = Clock(0)
+    incremental = recommend.PopularityIndex(half_life=24 * hour, top_n=3, clock=clock)
+    for product_id, category_id, quantity, at in events:
+        clock.now = at
+        incremental.record([(product_id, category_id, quantity)], at=at)
+
+    loaded = recommend.PopularityIndex(half_life=24 * hour, top_n=3, clock=clock)
+    loaded.load(list(reversed(events)))
+
+    for category_id in (None, 10, 20):
+        assert_same_ranking(loaded.top(category_id), incremental.top(category_id))
+    assert_same_ranking(loaded.top_in([10, 20]), incremental.top_in([10, 20]))
+    assert_same_ranking(loaded.top_categories(), incremental.top_categories())
+
+
+def wait_for_startup_load():
+    for thread in threading.enumerate():
+        if thread.name == 'recommend-load':
+            thread.join()
+
+
+def test_load_recommendations_groups_by_hour_and_refreshes_cache(app, client, monkeypatch):
+    client.get('/api/product/recommend?size=1')
+    wait_for_startup_load()
+
+    # 同一小时内支付的两个订单汇总为一行
+    hour = datetime.datetime.now().replace(minute=0, second=0, microsecond=0) - datetime.timedelta(hours=1)
+    with app.app_context():
+        user = backend.User.query.filter_by(username='user3').one()
+        for minutes, quantity in ((5, 300), (40, 400)):
+            order = backend.Order(user_id=user.id, total_price=1.0, status=1,
+                                  created_at=hour + datetime.timedelta(minutes=minutes),
+                                  paid_at=hour + datetime.timedelta(minutes=minutes))
+            backend.db.session.add(order)
+            backend.db.session.flush()
+            backend.db.session.add(backend.OrderItem(order_id=order.id, product_id=499, product_name='测试商品499',
+                                                     product_price=499.0, quantity=quantity))
+        backend.db.session.commit()
+
+        loaded = []
+        load = backend.recommender.load
+        monkeypatch.setattr(backend.recommender, 'load', lambda rows: (loaded.extend(rows), load(rows)))
+        backend.load_recommendations()
+
+    rows = [row for row in loaded if row[0] == 499]
+    assert len(rows) == 1 and rows[0][2] == 700
+    assert rows[0][3] == pytest.approx(hour.timestamp())
+    assert client.get('/api/product/recommend?size=1').json['data'][0]['id'] == 499
@@ -0,0 +1,65 @@
+"""
+Token 吊销：修改密码递增 token_version，之前签发的 Token 全部失效；
+其他进程递增的版本号在本进程的版本缓存过期（TOKEN_VERSION_TTL）后生效
+"""
+import time
+
+import jwt
+
+import app as backend
+
+
+def user_info(client, token):
+    return client.get('/api/user/info', headers={'Authorization': token}).json
+
+
+def test_password_change_revokes_old_tokens(client, login, new_user):
+    first = new_user()['Authorization']
+    username = user_info(client, first)['data']['username']
+    second = login(username)['Authorization']
+    assert user_info(client, first)['code'] == 200 and user_info(client, second)['code'] == 200
+
+    response = client.post('/api/user/update', json={'password': 'changed-654321'},
+                           headers={'Authorization': first}).json
+    assert response['code'] == 200
+    renewed = response['data']['token']
+
+    # 已验证过的 Token（在 Token 缓存中）同样失效，'Bearer ' 前缀不影响结果
+    assert user_info(client, first)['code'] == 401
+    assert user_info(client, second)['code'] == 401
+    assert user_info(client, f'Bearer {second}')['code'] == 401
+    assert user_info(client, renewed)['data']['username'] == username
+    assert client.post('/api/user/login', json={'username': username, 'password': '123456'}).json['code'] != 200
+    assert user_info(client, login(username, 'changed-654321')['Authorization'])['code'] == 200
+
+
+def test_version_bump_from_another_process_applies_after_cache_ttl(app, client, new_user):
+    token = new_user()['Authorization']
+    assert user_info(client, token)['code'] == 200
+    with app.app_context():
+        user_id = backend.verify_token(token)
+        backend.User.query.filter_by(id=user_id).update({'token_version': backend.User.token_version + 1})
+        backend.db.session.commit()
+
+    # 本进程缓存的版本号在 TTL 内仍然有效，过期后重新读取
+    assert user_info(client, token)['code'] == 200
+    backend.token_versions.delete(user_id)
+    assert user_info(client, token)['code'] == 401
+
+
+def test_tokens_without_matching_version_or_signature_are_rejected(app, client, new_user):
+    token = new_user()['Authorization']
+    with app.app_context():
+        user_id = backend.verify_token(token)
+        secret = app.config['SECRET_KEY']
+    expires = int(time.time()) + 3600
+    # 没有 ver 字段的旧 Token 视为版本 0
+    legacy = jwt.encode({'user_id': user_id, 'exp': expires}, secret, algorithm='HS256')
+    assert user_info(client, legacy)['code'] == 200
+    future = jwt.encode({'user_id': user_id, 'ver': 1, 'exp': expires}, secret, algorithm='HS256')
+    assert user_info(client, future)['code'] == 401
+    forged = jwt.encode({'user_id': user_id, 'ver': 0, 'exp': expires}, 'another-secret-key-of-32-bytes!!',
+                        algorithm='HS256')
+    assert user_info(client, forged)['code'] == 401
+    expired = jwt.encode({'user_id': user_id, 'ver': 0, 'exp': int(time.time()) - 10}, secret, algorithm='HS256')
+    assert user_info(client, expired)['code'] == 401
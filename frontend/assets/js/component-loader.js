@@ -3,6 +3,12 @@
  * 极简版组件加载：直接请求组件路径（无前缀）
  */
 function loadComponent(componentPath, targetSelector, callback) {
+  // 后端已在服务端拼装好组件（容器内已有元素）时不再发起请求，直接执行回调
+  const existing = document.querySelector(targetSelector);
+  if (existing && existing.children.length > 0) {
+    callback && callback();
+    return;
+  }
   // 组件路径直接是 /components/xxx（后端能访问）
   const fullPath = `/components/${componentPath}`;
   fetch(fullPath)
@@ -74,6 +80,12 @@ if (!window.renderPagination) {
   };
 }
 window.imgErrorFallback = function(imgElement, fallbackUrl = '/assets/image/banner/banner-default.png') {
+  imgElement.removeAttribute('srcset');
   imgElement.src = fallbackUrl;
   imgElement.style.objectFit = 'cover';
+};
+// 图片变体：站内 /assets/ 图片经 /api/image 按宽度缩放并转为 avif / webp / jpeg，返回 srcset（外链图片返回空串）
+window.imageSrcset = function(src, widths) {
+  if (!src || !src.startsWith('/assets/')) return '';
+  return widths.map(w => `/api/image?src=${encodeURIComponent(src)}&w=${w} ${w}w`).join(', ');
 };
\ No newline at end of file